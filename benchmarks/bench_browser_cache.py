@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Byte tải qua mạng và thời gian load trang Maps có / không có AssetCache (BROWSER_CACHE_DIR)
+Chạy từ thư mục gốc (cần Chromium của Playwright và mạng):
+    python -m benchmarks.bench_browser_cache                 # URL đầu tiên trong urls/*.csv
+    python -m benchmarks.bench_browser_cache URL [URL ...]
+
+Mỗi chế độ dùng một context mới và mở các URL hai lượt trong cùng context, vì route tắt HTTP
+cache của Chromium: lượt 2 của "no cache" được HTTP cache phục vụ, của AssetCache thì không.
+  no cache      context không có route
+  cache cold    AssetCache với thư mục rỗng
+  cache warm    context mới, cùng thư mục (như sau một lần restart)
+Byte mạng = tổng request.sizes() (header + body) trừ byte được AssetCache trả từ đĩa.
+"""
+
+import asyncio
+import csv
+import glob
+import statistics
+import sys
+import tempfile
+import time
+
+from playwright.async_api import async_playwright
+
+from browser_cache import AssetCache
+
+PASSES = 2
+
+
+def _default_urls():
+    for path in sorted(glob.glob("urls/*.csv")):
+        with open(path, encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if row and row[0].startswith("http"):
+                    return [row[0]]
+    sys.exit("Không có URL: truyền URL hoặc thêm urls/*.csv")
+
+
+async def _run(browser, urls, cache=None):
+    context = await browser.new_context(locale="vi-VN", timezone_id="Asia/Ho_Chi_Minh")
+    if cache:
+        await cache.attach(context)
+    finished = []
+
+    async def on_finished(request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        finished.append(sizes["responseHeadersSize"] + sizes["responseBodySize"])
+
+    context.on("requestfinished", on_finished)
+    rows = []
+    try:
+        for _ in range(PASSES):
+            finished.clear()
+            saved = cache.stats["bytes_saved"] if cache else 0
+            timings = []
+            page = await context.new_page()
+            for url in urls:
+                start = time.perf_counter()
+                await page.goto(url, wait_until="load", timeout=60000)
+                timings.append(time.perf_counter() - start)
+            # Chờ các requestfinished còn lại
+            await page.wait_for_timeout(2000)
+            await page.close()
+            network = sum(finished) - ((cache.stats["bytes_saved"] - saved) if cache else 0)
+            rows.append((len(finished), network, statistics.median(timings)))
+    finally:
+        await context.close()
+    return rows
+
+
+async def main():
+    urls = sys.argv[1:] or _default_urls()
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        with tempfile.TemporaryDirectory() as root:
+            cache = AssetCache(root)
+            modes = [("no cache", None), ("cache cold", cache), ("cache warm", cache)]
+            print(f"{'mode':<12} {'pass':>4} {'requests':>9} {'network MB':>11} {'load s':>7}")
+            for label, mode_cache in modes:
+                for number, (count, network, load) in enumerate(await _run(browser, urls, mode_cache), start=1):
+                    print(f"{label:<12} {number:>4} {count:>9} {network / 1e6:>11.2f} {load:>7.2f}")
+            print(f"AssetCache: {cache.stats}")
+        await browser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
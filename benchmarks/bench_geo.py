@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Latency của truy vấn bbox / bán kính / kNN trong geo.py
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_geo                      # bảng place hiện tại (~2k place)
+    python -m benchmarks.bench_geo --synthetic 1000000  # 1M place giả trong schema bench_geo
+    python -m benchmarks.bench_geo --in-memory [N]      # không cần database: toạ độ từ urls/*.csv
+                                                        # (hoặc N điểm giả), index = list geohash đã sort
+
+Chế độ --synthetic tạo bench_geo.place (cùng cột, generated column và index với place), chạy
+truy vấn qua search_path rồi xoá schema (giữ lại với --keep).
+"""
+
+import argparse
+import bisect
+import csv
+import glob
+import random
+import statistics
+import time
+from typing import Callable, List
+
+import geo
+from parsing import parse_coordinates
+
+# Khung quanh TP.HCM cho điểm giả và điểm truy vấn
+HCMC_BBOX = (10.65, 106.55, 10.90, 106.85)
+RUNS = 200
+
+
+def _random_point(rng: random.Random):
+    min_lat, min_lng, max_lat, max_lng = HCMC_BBOX
+    return rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)
+
+
+def _timed(label: str, fn: Callable[[], List], runs: int = RUNS) -> None:
+    timings, sizes = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        sizes.append(len(fn()))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"{label:<28} avg {statistics.mean(sizes):8.1f} rows  p50 {statistics.median(timings):7.3f} ms  "
+          f"p95 {timings[int(len(timings) * 0.95) - 1]:7.3f} ms")
+
+
+def _run_queries(fetch_bbox, rng: random.Random) -> None:
+    points = [_random_point(rng) for _ in range(RUNS)]
+    it = iter(points * 4)
+    for radius in (500, 2000):
+        _timed(f"within {radius} m", lambda: geo.within_radius(fetch_bbox, *next(it), radius))
+    for k in (10, 50):
+        _timed(f"{k} nearest", lambda: geo.nearest(fetch_bbox, *next(it), k))
+
+
+class SortedGeohashIndex:
+    """Mô phỏng B-tree trên cột geohash: list đã sort + bisect cho mỗi range"""
+
+    def __init__(self, points):
+        rows = sorted((geo.geohash_encode(lat, lng), lat, lng) for lat, lng in points)
+        self.keys = [row[0] for row in rows]
+        self.rows = [{"lat": lat, "lng": lng} for _, lat, lng in rows]
+
+    def fetch_bbox(self, bbox: geo.BBox) -> List[dict]:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        found = []
+        for lo, hi in geo.cell_ranges(bbox):
+            for i in range(bisect.bisect_left(self.keys, lo), bisect.bisect_left(self.keys, hi)):
+                row = self.rows[i]
+                if min_lat <= row["lat"] <= max_lat and min_lng <= row["lng"] <= max_lng:
+                    found.append(row)
+        return found
+
+
+def run_in_memory(count: int | None, rng: random.Random) -> None:
+    if count:
+        points = [_random_point(rng) for _ in range(count)]
+    else:
+        points = []
+        for path in sorted(glob.glob("urls/*.csv")):
+            with open(path, "r", encoding="utf-8") as f:
+                points += [c for c in (parse_coordinates(row.get("url")) for row in csv.DictReader(f)) if c]
+    start = time.perf_counter()
+    index = SortedGeohashIndex(points)
+    print(f"📊 {len(points)} points, index built in {time.perf_counter() - start:.2f}s")
+
+    # Kiểm tra với quét toàn bộ trước khi đo
+    brute = lambda bbox: [{"lat": lat, "lng": lng} for lat, lng in points
+                          if bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]]
+    for _ in range(20):
+        lat, lng = _random_point(rng)
+        expected = [row["distance_m"] for row in geo.nearest(brute, lat, lng, 10)]
+        assert [row["distance_m"] for row in geo.nearest(index.fetch_bbox, lat, lng, 10)] == expected
+    print("=" * 72)
+    _run_queries(index.fetch_bbox, rng)
+    if len(points) <= 100_000:
+        _timed("within 500 m (full scan)", lambda: geo.within_radius(brute, *_random_point(rng), 500), runs=20)
+
+
+def _connect():
+    import psycopg2
+    from main import get_db_config
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        return psycopg2.connect(db_config['connection_string'])
+    return psycopg2.connect(**db_config)
+
+
+def _create_synthetic(conn, count: int) -> None:
+    cursor = conn.cursor()
+    cursor.execute("DROP SCHEMA IF EXISTS bench_geo CASCADE")
+    cursor.execute("CREATE SCHEMA bench_geo")
+    cursor.execute("CREATE TABLE bench_geo.place (LIKE public.place INCLUDING DEFAULTS INCLUDING GENERATED)")
+    min_lat, min_lng, max_lat, max_lng = HCMC_BBOX
+    start = time.perf_counter()
+    cursor.execute("""
+        INSERT INTO bench_geo.place (id, url, name, lat, lng)
+        SELECT i, 'synthetic:' || i, 'Place ' || i,
+               %s + random() * %s, %s + random() * %s
+        FROM generate_series(1, %s) AS i
+    """, (min_lat, max_lat - min_lat, min_lng, max_lng - min_lng, count))
+    cursor.execute("CREATE INDEX ON bench_geo.place (geohash) WHERE geohash IS NOT NULL")
+    cursor.execute("ANALYZE bench_geo.place")
+    conn.commit()
+    cursor.close()
+    print(f"🧪 {count} synthetic places loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+
+def run_database(synthetic: int | None, keep: bool, rng: random.Random) -> None:
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        if synthetic:
+            _create_synthetic(conn, synthetic)
+            cursor.execute("SET search_path = bench_geo, public")
+        cursor.execute("SELECT COUNT(*), COUNT(geohash) FROM place")
+        total, located = cursor.fetchone()
+        print(f"📊 place rows: {total}, with coordinates: {located}")
+        print("=" * 72)
+        _run_queries(lambda bbox: geo.places_in_bbox(conn, bbox), rng)
+
+        bbox = geo.bbox_around(*_random_point(rng), 500)
+        ranges = geo.cell_ranges(bbox)
+        cursor.execute("EXPLAIN ANALYZE " + geo.BBOX_QUERY, {
+            "lo": [lo for lo, _ in ranges], "hi": [hi for _, hi in ranges],
+            "min_lat": bbox[0], "min_lng": bbox[1], "max_lat": bbox[2], "max_lng": bbox[3]})
+        print("\n" + "\n".join(row[0] for row in cursor.fetchall()))
+    finally:
+        conn.rollback()
+        if synthetic and not keep:
+            cursor.execute("DROP SCHEMA IF EXISTS bench_geo CASCADE")
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spatial place queries")
+    parser.add_argument("--synthetic", type=int, help="Benchmark on N synthetic places in schema bench_geo")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench_geo schema afterwards")
+    parser.add_argument("--in-memory", nargs="?", type=int, const=0, metavar="N",
+                        help="Run without a database (URL coordinates, or N synthetic points)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.in_memory is not None:
+        run_in_memory(args.in_memory, rng)
+    else:
+        run_database(args.synthetic, args.keep, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Corpus giờ mở cửa và tốc độ parse (parsing.parse_hours_text / weekly_open_intervals)
+Chạy từ thư mục gốc: python -m benchmarks.bench_hours [so_place]
+Corpus nằm trong tests/test_opening_hours.py; mọi mẫu phải parse đúng trước khi đo.
+"""
+
+import random
+import sys
+import time
+
+from parsing import parse_hours_text, weekly_open_intervals
+from tests.test_opening_hours import CORPUS, WEEKLY_CORPUS
+
+DAYS = ["Thứ Hai", "Thứ Ba", "Thứ Tư", "Thứ Năm", "Thứ Sáu", "Thứ Bảy", "Chủ Nhật"]
+
+
+def check_corpus() -> None:
+    failures = [(text, expected, parse_hours_text(text)) for text, expected in CORPUS
+                if parse_hours_text(text) != expected]
+    failures += [(hours, expected, weekly_open_intervals(hours)) for hours, expected in WEEKLY_CORPUS
+                 if weekly_open_intervals(hours) != expected]
+    for value, expected, actual in failures:
+        print(f"❌ {value!r}: expected {expected}, got {actual}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ {len(CORPUS) + len(WEEKLY_CORPUS)} corpus cases parsed as expected")
+
+
+def main():
+    check_corpus()
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    texts = [text for text, expected in CORPUS if expected]
+    places = [{day: rng.choice(texts) for day in DAYS} for _ in range(count)]
+
+    start = time.perf_counter()
+    intervals = sum(len(weekly_open_intervals(hours)) for hours in places)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {count} places x 7 days -> {intervals} intervals in {elapsed * 1000:.1f} ms "
+          f"({elapsed / count * 1e6:.1f} µs/place)")
+
+
+if __name__ == "__main__":
+    main()
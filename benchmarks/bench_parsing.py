@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark cho parsing.py ở quy mô 100k reviews
+Chạy từ thư mục gốc: python -m benchmarks.bench_parsing [so_review]
+"""
+
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+import parsing
+
+TIME_SAMPLES = [
+    "2 tháng trước", "3 ngày trước", "một tuần trước", "một năm trước",
+    "5 năm trước", "11 giờ trước", "Thời gian chỉnh sửa: 4 tuần trước", "",
+]
+TEXT_SAMPLES = [
+    "Đồ ăn: 5 Dịch vụ: 4 Bầu không khí: 5 Món phở bò rất ngon, nước dùng đậm đà.",
+    "Quán sạch sẽ, nhân viên thân thiện. Giá mỗi người 100–200 N ₫",
+    "Ngon!",
+]
+RATING_SAMPLES = ["5 sao", "4,5", "Được xếp hạng 4.0 trên 5", ""]
+COUNT_SAMPLES = ["1.234 bài đánh giá", "(87)", "12,345 reviews", ""]
+
+
+def _legacy_parse_relative_time(time_text):
+    """Bản cũ trong crawler: dựng lại dict/regex và gọi datetime.now() mỗi lần"""
+    if not time_text:
+        return None
+    time_text = time_text.strip().lower()
+    if "thời gian chỉnh sửa:" in time_text:
+        time_text = time_text.replace("thời gian chỉnh sửa:", "").strip()
+    now = datetime.now()
+    time_mapping = {'giây': 'seconds', 'phút': 'minutes', 'giờ': 'hours', 'ngày': 'days',
+                    'tuần': 'weeks', 'tháng': 'month', 'năm': 'year'}
+    patterns = [
+        (r'(\d+)\s+(giây|phút|giờ|ngày|tuần|tháng|năm)\s+trước', 1),
+        (r'một\s+(giây|phút|giờ|ngày|tuần|tháng|năm)\s+trước', 2),
+    ]
+    for pattern, group_num in patterns:
+        match = re.search(pattern, time_text)
+        if match:
+            number, unit = (int(match.group(1)), match.group(2)) if group_num == 1 else (1, match.group(1))
+            unit = time_mapping[unit]
+            if unit == 'month':
+                return now - timedelta(days=number * 30)
+            if unit == 'year':
+                return now - timedelta(days=number * 365)
+            return now - timedelta(**{unit: number})
+    return None
+
+
+def _legacy_strip(text, snippets):
+    if not text:
+        return text
+    cleaned = text
+    for s in snippets:
+        if s:
+            cleaned = cleaned.replace(s, " ")
+    for k in parsing.DETAIL_LABELS:
+        cleaned = re.sub(rf"{re.escape(k)}\s*", " ", cleaned)
+    return re.sub(r"\s{2,}", " ", cleaned).strip()
+
+
+def _bench(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms  {elapsed / n * 1e6:7.2f} µs/review")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rnd = random.Random(42)
+    times = [rnd.choice(TIME_SAMPLES) for _ in range(n)]
+    texts = [rnd.choice(TEXT_SAMPLES) for _ in range(n)]
+    snippets = [["Đồ ăn: 5", "Dịch vụ: 4"]] * n
+    ratings = [rnd.choice(RATING_SAMPLES) for _ in range(n)]
+    counts = [rnd.choice(COUNT_SAMPLES) for _ in range(n)]
+    anchor = datetime.now()
+
+    print(f"📊 Parsing microbenchmark: {n} reviews")
+    print("=" * 72)
+    _bench("relative_time (legacy, per call)", lambda: [_legacy_parse_relative_time(t) for t in times], n)
+    _bench("relative_time (parse_relative_time)", lambda: [parsing.parse_relative_time(t, anchor) for t in times], n)
+    _bench("relative_time (parse_relative_times)", lambda: parsing.parse_relative_times(times, anchor), n)
+    _bench("strip_details (legacy)", lambda: [_legacy_strip(t, s) for t, s in zip(texts, snippets)], n)
+    _bench("strip_details (batch)", lambda: parsing.strip_detail_snippets_batch(texts, snippets), n)
+    _bench("parse_floats", lambda: parsing.parse_floats(ratings), n)
+    _bench("parse_reviews_counts", lambda: parsing.parse_reviews_counts(counts), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+So sánh đọc review_rollup với quét + parse JSONB trên bảng review
+Chạy từ thư mục gốc: python -m benchmarks.bench_rollups [so_place]
+Kiểm tra luôn rollup khớp với kết quả tính trực tiếp (lệch => chạy python rollups.py --recompute).
+"""
+
+import random
+import statistics
+import sys
+import time
+
+import psycopg2
+
+from main import get_db_config
+from rollups import METRICS, place_summaries
+
+RUNS = 20
+
+# Cách dashboard tính trước đây: quét review và parse review_details mỗi request
+SCAN_QUERY = """
+    SELECT place_id, count(*) AS review_count,
+           avg(rating) FILTER (WHERE rating BETWEEN 1 AND 5) AS rating_avg,
+           avg(parse_score(review_details->>'Đồ ăn')) AS food_avg,
+           avg(parse_score(review_details->>'Dịch vụ')) AS service_avg,
+           avg(parse_score(review_details->>'Bầu không khí')) AS atmosphere_avg,
+           score_hist(CASE WHEN rating BETWEEN 1 AND 5 THEN rating END) AS rating_hist
+    FROM review
+    WHERE place_id = ANY(%s)
+    GROUP BY place_id
+"""
+
+
+def _timed(label: str, fn) -> None:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<36} p50 {statistics.median(timings):9.2f} ms  max {max(timings):9.2f} ms")
+
+
+def main():
+    sample_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM review")
+    reviews = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM review_rollup")
+    rollup_rows = cursor.fetchone()[0]
+    cursor.execute("SELECT DISTINCT place_id FROM review_rollup")
+    place_ids = [row[0] for row in cursor.fetchall()]
+    print(f"📊 review rows: {reviews}, rollup rows: {rollup_rows}, places: {len(place_ids)}")
+    print("=" * 72)
+
+    one = random.sample(place_ids, 1) if place_ids else []
+    sample = random.sample(place_ids, min(sample_size, len(place_ids)))
+    for label, ids in (("1 place", one), (f"{len(sample)} places", sample), (f"all {len(place_ids)} places", place_ids)):
+        _timed(f"scan review ({label})", lambda: (cursor.execute(SCAN_QUERY, (ids,)), cursor.fetchall()))
+        _timed(f"review_rollup ({label})", lambda: place_summaries(conn, ids))
+
+    # Rollup phải khớp với tính trực tiếp
+    cursor.execute(SCAN_QUERY, (sample,))
+    direct = {row[0]: row for row in cursor.fetchall()}
+    mismatched = []
+    for place_id, summary in place_summaries(conn, sample).items():
+        row = direct.get(place_id)
+        expected = [row[1]] + [None if v is None else round(float(v), 2) for v in row[2:6]] + [row[6]]
+        actual = [summary["review_count"]] + [summary[f"{m}_avg"] for m in METRICS] + [summary["rating_hist"]]
+        if expected != actual:
+            mismatched.append(place_id)
+    print(f"\n{'✅ Rollups match' if not mismatched else f'❌ Rollups differ for places {mismatched}'}")
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Query plan trước/sau migration cho các truy vấn chính
+Chạy từ thư mục gốc, ví dụ so sánh trước và sau index + partition:
+    python migrate.py --to 2 && python -m benchmarks.bench_schema > before.txt
+    python migrate.py        && python -m benchmarks.bench_schema > after.txt
+"""
+
+import psycopg2
+
+from main import get_db_config
+from migrate import applied_versions
+
+QUERIES = {
+    "reviews of one place": (
+        "SELECT * FROM review WHERE place_id = (SELECT id FROM place ORDER BY id LIMIT 1)", None),
+    "recent reviews (30 days)": (
+        "SELECT place_id, rating, time_datetime FROM review "
+        "WHERE time_datetime >= now() - INTERVAL '30 days' ORDER BY time_datetime DESC LIMIT 100", None),
+    "place by url": (
+        "SELECT id, name FROM place WHERE url = (SELECT url FROM place ORDER BY id DESC LIMIT 1)", None),
+    "review dedup lookup": (
+        "SELECT 1 FROM review WHERE review_id = (SELECT review_id FROM review LIMIT 1)", None),
+}
+
+
+def main():
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+
+    print(f"📊 Applied migrations: {sorted(applied_versions(conn))}")
+    cursor = conn.cursor()
+    for label, (sql, params) in QUERIES.items():
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+        plan = [row[0] for row in cursor.fetchall()]
+        print(f"\n=== {label} ===")
+        print("\n".join(plan))
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Đo latency của review_search trên database đã cấu hình (DATABASE_URL / DB_*)
+Chạy từ thư mục gốc: python -m benchmarks.bench_search ["phở bò" ...]
+"""
+
+import statistics
+import sys
+import time
+
+import psycopg2
+
+from main import get_db_config
+from review_search import FTS_QUERY, search_reviews
+
+DEFAULT_QUERIES = ["phở bò", "pho bo", "nhân viên thân thiện", "giá hợp lý", "bún chả"]
+RUNS = 20
+
+
+def main():
+    queries = sys.argv[1:] or DEFAULT_QUERIES
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM review")
+    print(f"📊 review rows: {cursor.fetchone()[0]}")
+    print("=" * 72)
+
+    for mode in ("fts", "substring"):
+        for query in queries:
+            timings = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                results = search_reviews(conn, query, limit=20, mode=mode)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{mode:<10} {query!r:<28} {len(results):3d} hits  "
+                  f"p50 {statistics.median(timings):7.2f} ms  max {max(timings):7.2f} ms")
+
+    cursor.execute("EXPLAIN ANALYZE " + FTS_QUERY, {"query": queries[0], "limit": 20, "offset": 0})
+    print("\n" + "\n".join(row[0] for row in cursor.fetchall()))
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Cache trên đĩa cho JS / CSS / font tĩnh của Google Maps, dùng chung cho mọi context
+Mỗi context mới của Chromium có HTTP cache rỗng, nên sau mỗi lần restart (hoặc relaunch
+browser, context riêng của trace, mỗi process của supervisor) các bundle JS nhiều MB của Maps
+bị tải lại. AssetCache chặn request tới asset tĩnh bằng context.route: hit được trả thẳng từ
+đĩa, miss được tải qua route.fetch rồi lưu nếu Cache-Control cho phép. Thư mục cache có
+giới hạn dung lượng, file ít được dùng gần đây nhất (mtime) bị xoá trước.
+
+Lưu ý: Playwright tắt HTTP cache của Chromium cho context có route, nên request không khớp
+cũng bị tải lại trong cùng context. Route chỉ đăng ký cho các glob trong CACHEABLE_URL_GLOBS
+(Playwright so khớp glob ở phía driver, request khác không đi vòng qua Python), và cache là
+opt-in: chỉ bật khi benchmarks/bench_browser_cache.py cho thấy ít byte / thời gian load hơn.
+Bật bằng BROWSER_CACHE_DIR; giới hạn BROWSER_CACHE_MAX_MB (mặc định 512).
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("crawler.browser_cache")
+
+# Asset tĩnh có URL theo phiên bản: gstatic, font, bundle JS/CSS của Maps (/maps/_/js/k=...)
+# Không dùng {a,b}: URLMatcher phía Python của Playwright không hỗ trợ
+CACHEABLE_URL_GLOBS = (
+    "https://maps.gstatic.com/**",
+    "https://www.gstatic.com/**",
+    "https://ssl.gstatic.com/**",
+    "https://fonts.gstatic.com/**",
+    "https://fonts.googleapis.com/**",
+    "https://www.google.com/maps/_/js/**",
+    "https://www.google.com/maps/_/ss/**",
+    "https://www.google.com.vn/maps/_/js/**",
+    "https://www.google.com.vn/maps/_/ss/**",
+)
+_MAX_AGE_RE = re.compile(r"(?:s-maxage|max-age)=(\d+)")
+# Body được lưu đã giải nén nên không trả lại các header mô tả cách truyền
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _max_age(headers: Dict[str, str]) -> int:
+    """Số giây được cache theo Cache-Control; 0 = không cache"""
+    cache_control = headers.get("cache-control", "").lower()
+    if any(directive in cache_control for directive in ("no-store", "no-cache", "private")):
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class AssetCache:
+    """<root>/ab/<sha256 của URL>: một dòng JSON (url, status, headers, expires) rồi tới body"""
+
+    def __init__(self, root: str = "browser_cache", max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._bytes: Optional[int] = None  # ước lượng dung lượng trên đĩa, quét lại khi evict
+        self._evicting = False
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "bytes_saved": 0, "bytes_fetched": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["AssetCache"]:
+        root = os.getenv("BROWSER_CACHE_DIR")
+        if not root:
+            return None
+        return cls(root, max_bytes=int(float(os.getenv("BROWSER_CACHE_MAX_MB", 512)) * 1024 * 1024))
+
+    def path_for(self, url: str) -> str:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.root, key[:2], key)
+
+    async def attach(self, context) -> None:
+        """Phục vụ asset tĩnh của `context` qua cache (chỉ URL khớp CACHEABLE_URL_GLOBS)"""
+        for pattern in CACHEABLE_URL_GLOBS:
+            await context.route(pattern, self._handle)
+
+    # Đọc/ghi đĩa chạy trong thread để không chặn event loop
+
+    def _read(self, url: str) -> Optional[Tuple[dict, bytes]]:
+        path = self.path_for(url)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get("url") != url or meta.get("expires", 0) < time.time():
+            return None
+        # mtime = lần dùng gần nhất, cho LRU
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return meta, body
+
+    def _write(self, url: str, status: int, headers: Dict[str, str], body: bytes, max_age: int) -> int:
+        path = self.path_for(url)
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS}
+        meta = {"url": url, "status": status, "headers": headers, "expires": time.time() + max_age}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(meta).encode() + b"\n")
+                f.write(body)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.path.getsize(path)
+
+    def _scan(self) -> list:
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> Tuple[int, int]:
+        """Xoá file dùng lâu nhất tới khi còn 90% giới hạn; trả về (số file xoá, dung lượng còn lại)"""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        target = self.max_bytes * 0.9
+        while entries and total > target:
+            _, size, path = entries.pop(0)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                removed += 1
+            total -= size
+        return removed, total
+
+    async def _handle(self, route) -> None:
+        request = route.request
+        if request.method != "GET":
+            await route.continue_()
+            return
+        url = request.url
+        cached = await asyncio.to_thread(self._read, url)
+        if cached:
+            meta, body = cached
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(body)
+            await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+            return
+
+        self.stats["misses"] += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # Để Chromium tự tải (hoặc báo lỗi) như khi không có cache
+            logger.debug("Cache fetch failed for %s: %s", url, e)
+            await route.continue_()
+            return
+        self.stats["bytes_fetched"] += len(body)
+        await route.fulfill(response=response, body=body)
+
+        max_age = _max_age(response.headers)
+        if response.status != 200 or not max_age:
+            return
+        try:
+            size = await asyncio.to_thread(self._write, url, response.status, response.headers, body, max_age)
+        except OSError as e:
+            logger.warning("Could not store %s in browser cache: %s", url, e)
+            return
+        self.stats["stored"] += 1
+        await self._account(size)
+
+    async def _account(self, size: int) -> None:
+        if self._bytes is None:
+            self._bytes = sum(entry[1] for entry in await asyncio.to_thread(self._scan))
+        else:
+            self._bytes += size
+        if self._bytes > self.max_bytes and not self._evicting:
+            self._evicting = True
+            try:
+                removed, self._bytes = await asyncio.to_thread(self._evict)
+                self.stats["evicted"] += removed
+            finally:
+                self._evicting = False
+
+    def report(self) -> None:
+        requests_seen = self.stats["hits"] + self.stats["misses"]
+        if not requests_seen:
+            return
+        logger.info("🗄️  Browser cache: hit ratio %.1f%% (%d/%d), %.1f MB saved, %.1f MB fetched, "
+                    "%d stored, %d evicted (%s)",
+                    100 * self.stats["hits"] / requests_seen, self.stats["hits"], requests_seen,
+                    self.stats["bytes_saved"] / 1e6, self.stats["bytes_fetched"] / 1e6,
+                    self.stats["stored"], self.stats["evicted"], self.root)
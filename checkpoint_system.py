@@ -8,7 +8,8 @@ import os
 from datetime import datetime
 from typing import List, Dict, Optional
 
-CHECKPOINT_FILE = "crawl_checkpoint.json"
+# Job crawl theo profile riêng (ví dụ làm mới rating) nên dùng file checkpoint riêng
+CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", "crawl_checkpoint.json")
 
 class CrawlCheckpoint:
     def __init__(self):
@@ -0,0 +1,248 @@
+"""
+AIMD auto-tuning cho số worker crawl song song
+Tăng dần (additive) khi throughput còn cải thiện và tỉ lệ lỗi thấp,
+giảm mạnh (multiplicative) khi gặp timeout, bị chặn, CPU hoặc RAM quá tải.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("crawler.concurrency")
+
+
+_CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+_CGROUP_CPU_STAT = '/sys/fs/cgroup/cpu.stat'
+
+# (monotonic giây, usage_usec) của lần đọc cpu.stat trước
+_cpu_sample: Optional[Tuple[float, int]] = None
+
+
+def _cgroup_cpu_usage() -> Optional[int]:
+    """usage_usec trong cpu.stat của cgroup v2; None nếu không có cgroup"""
+    try:
+        with open(_CGROUP_CPU_STAT, 'r') as f:
+            for line in f:
+                key, _, value = line.partition(' ')
+                if key == 'usage_usec':
+                    return int(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def cpu_count() -> float:
+    """Số CPU của container: quota trong cpu.max, hoặc số core được phép chạy (cpuset), không phải của host"""
+    try:
+        with open(_CGROUP_CPU_MAX, 'r') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except (OSError, AttributeError):
+        return os.cpu_count() or 1
+
+
+def _cpu_load() -> Optional[float]:
+    """CPU đã dùng chia cho số CPU của container (1.0 = bão hoà)
+
+    Có cgroup: delta usage_usec từ lần gọi trước (lần đầu trả None); không có cgroup: load average 1 phút.
+    """
+    global _cpu_sample
+    usage = _cgroup_cpu_usage()
+    if usage is not None:
+        now = time.monotonic()
+        previous, _cpu_sample = _cpu_sample, (now, usage)
+        if previous is None or now <= previous[0]:
+            return None
+        return (usage - previous[1]) / 1e6 / (now - previous[0]) / cpu_count()
+    try:
+        return os.getloadavg()[0] / cpu_count()
+    except (OSError, AttributeError):
+        return None
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path, 'r') as f:
+            value = f.read().strip()
+        return None if value == 'max' else int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def _memory_usage() -> Optional[float]:
+    """Tỉ lệ RAM đã dùng; ưu tiên giới hạn cgroup của container"""
+    limit = _read_int('/sys/fs/cgroup/memory.max')
+    current = _read_int('/sys/fs/cgroup/memory.current')
+    if limit and current is not None:
+        return current / limit
+
+    try:
+        meminfo = {}
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                meminfo[key] = int(value.split()[0])
+        return 1 - meminfo['MemAvailable'] / meminfo['MemTotal']
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+
+class AIMDController:
+    def __init__(self, min_workers: int = 1, max_workers: int = 4, initial_workers: Optional[int] = None,
+                 increase_step: int = 1, decrease_factor: float = 0.5, interval_seconds: float = 120,
+                 min_samples: int = 2, max_error_rate: float = 0.2, max_timeout_rate: float = 0.1,
+                 cpu_threshold: float = 0.9, memory_threshold: float = 0.85):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.limit = min(max(initial_workers or self.min_workers, self.min_workers), self.max_workers)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.interval_seconds = interval_seconds
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.max_timeout_rate = max_timeout_rate
+        self.cpu_threshold = cpu_threshold
+        self.memory_threshold = memory_threshold
+
+        self._active = 0
+        self._cond = asyncio.Condition()
+        self._events: List[Dict] = []
+        self._window_started = time.monotonic()
+        self._last_throughput: Optional[float] = None
+        self.decisions: List[Dict] = []
+
+    @classmethod
+    def from_env(cls) -> "AIMDController":
+        """CRAWL_CONCURRENCY=auto (AIMD) hoặc một số cố định; CRAWL_MIN_WORKERS/CRAWL_MAX_WORKERS giới hạn"""
+        mode = os.getenv('CRAWL_CONCURRENCY', 'auto').strip().lower()
+        interval = float(os.getenv('CRAWL_AIMD_INTERVAL', 120))
+        if mode != 'auto':
+            fixed = int(mode)
+            return cls(min_workers=fixed, max_workers=fixed, interval_seconds=interval)
+        return cls(
+            min_workers=int(os.getenv('CRAWL_MIN_WORKERS', 1)),
+            max_workers=int(os.getenv('CRAWL_MAX_WORKERS', max(1, round(cpu_count())))),
+            interval_seconds=interval,
+        )
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def acquire(self):
+        """Chờ tới khi số worker active nhỏ hơn limit hiện tại"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def release(self):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record(self, success: bool, duration: float, timeout: bool = False, blocked: bool = False):
+        """Ghi nhận kết quả của một place cho cửa sổ đánh giá hiện tại"""
+        self._events.append({
+            "success": success,
+            "duration": duration,
+            "timeout": timeout,
+            "blocked": blocked,
+        })
+
+    def evaluate(self) -> Dict:
+        """Tính quyết định AIMD cho cửa sổ vừa qua và reset cửa sổ"""
+        now = time.monotonic()
+        elapsed = max(now - self._window_started, 1e-6)
+        events, self._events = self._events, []
+        self._window_started = now
+
+        total = len(events)
+        succeeded = sum(1 for e in events if e["success"])
+        timeouts = sum(1 for e in events if e["timeout"])
+        blocked = sum(1 for e in events if e["blocked"])
+        error_rate = (total - succeeded) / total if total else 0.0
+        timeout_rate = timeouts / total if total else 0.0
+        throughput = succeeded * 60 / elapsed  # places / phút
+        cpu = _cpu_load()
+        memory = _memory_usage()
+
+        old_limit = self.limit
+        if blocked:
+            action, reason = "decrease", f"{blocked} block signal(s)"
+        elif timeout_rate > self.max_timeout_rate:
+            action, reason = "decrease", f"timeout rate {timeout_rate:.0%}"
+        elif cpu is not None and cpu > self.cpu_threshold:
+            action, reason = "decrease", f"CPU saturated ({cpu:.2f})"
+        elif memory is not None and memory > self.memory_threshold:
+            action, reason = "decrease", f"memory pressure ({memory:.0%})"
+        elif total < self.min_samples:
+            action, reason = "hold", f"only {total} sample(s)"
+        elif error_rate > self.max_error_rate:
+            action, reason = "hold", f"error rate {error_rate:.0%}"
+        elif self._last_throughput is not None and throughput < self._last_throughput:
+            action, reason = "hold", "throughput did not improve"
+        else:
+            action, reason = "increase", "throughput improving"
+
+        if action == "decrease":
+            self.limit = max(self.min_workers, int(self.limit * self.decrease_factor))
+        elif action == "increase":
+            self.limit = min(self.max_workers, self.limit + self.increase_step)
+
+        # Chỉ so sánh throughput giữa các cửa sổ có đủ mẫu
+        if total >= self.min_samples:
+            self._last_throughput = throughput
+
+        decision = {
+            "action": action,
+            "reason": reason,
+            "old_limit": old_limit,
+            "new_limit": self.limit,
+            "samples": total,
+            "throughput_per_min": round(throughput, 2),
+            "error_rate": round(error_rate, 3),
+            "timeout_rate": round(timeout_rate, 3),
+            "cpu": round(cpu, 2) if cpu is not None else None,
+            "memory": round(memory, 3) if memory is not None else None,
+        }
+        self.decisions.append(decision)
+        logger.info("⚙️  AIMD %s: workers %d -> %d (%s) | %s places/min, errors %.0f%%, timeouts %.0f%%, "
+                    "cpu %s, mem %s", action, old_limit, self.limit, reason, decision['throughput_per_min'],
+                    error_rate * 100, timeout_rate * 100, decision['cpu'], decision['memory'])
+        return decision
+
+    async def run(self):
+        """Vòng lặp định kỳ đánh giá và áp dụng limit mới"""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            self.evaluate()
+            async with self._cond:
+                self._cond.notify_all()
+
+
+class NavigationRateLimiter:
+    """Giới hạn tốc độ điều hướng chung cho mọi worker (kể cả điều hướng trước)"""
+
+    def __init__(self, min_interval_seconds: float = 5):
+        self.min_interval_seconds = min_interval_seconds
+        self._lock = asyncio.Lock()
+        self._last = 0.0
+
+    @classmethod
+    def from_env(cls) -> "NavigationRateLimiter":
+        return cls(float(os.getenv('CRAWL_NAV_INTERVAL', 5)))
+
+    async def wait(self):
+        """Chờ tới lượt điều hướng tiếp theo"""
+        async with self._lock:
+            delay = self._last + self.min_interval_seconds - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last = time.monotonic()
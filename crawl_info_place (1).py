@@ -1,4 +1,6 @@
 import asyncio
+import atexit
+import contextlib
 import json
 import re
 import random
@@ -6,11 +8,28 @@ import psycopg2
 import csv
 import os
 import glob
+import logging
 from psycopg2.extras import RealDictCursor
 from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
-from playwright.async_api import async_playwright, Playwright
-from datetime import datetime, timedelta
-
+import math
+import time
+from typing import AsyncIterator, NamedTuple
+from playwright.async_api import async_playwright, Playwright, TimeoutError as PlaywrightTimeoutError
+from datetime import datetime
+from concurrency import AIMDController, NavigationRateLimiter
+from photo_downloader import PhotoDownloader, save_photo_rows
+from service_state import state as service_state
+from parsing import parse_coordinates, parse_feature_id, parse_float, parse_reviews_count, parse_relative_time, strip_detail_snippets_from_text
+from crawl_logging import RateLimitedLog, log_place_summary, place_context, setup_logging
+from selector_registry import SelectorRegistry
+from opening_hours import replace_open_intervals
+from rollups import apply_review_batch
+from crawl_watchdog import BrowserCrashedError, Heartbeat, Watchdog, WatchdogIncident, beat, tracked_task
+from crawl_tracing import StageTimers, TraceSampler
+from browser_cache import AssetCache
+from place_payload import PayloadFetcher
+
+logger = logging.getLogger("crawler")
 
 # Database connection parameters - sử dụng environment variables
 import os
@@ -47,57 +66,69 @@ def connect_to_db():
             conn = psycopg2.connect(**DB_CONFIG)
         return conn
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        logger.error("Error connecting to database: %s", e)
         return None
 
 
+# Cột JSONB và TEXT[] của bảng place (giá trị mặc định khi thiếu)
+PLACE_JSON_COLUMNS = {"business_hours", "about_extra"}
+
+
+def _place_column_value(place_data: dict, column: str):
+    if column in PLACE_JSON_COLUMNS:
+        return json.dumps(place_data.get(column, {}))
+    if column in ABOUT_SECTIONS.values():
+        return place_data.get(column, [])
+    return place_data.get(column)
+
+
 def insert_place(conn, place_data: dict) -> int:
-    """Insert place data and return place_id"""
+    """Insert hoặc update place theo url và return place_id
+
+    Chỉ ghi các cột thuộc các bước crawl đã chạy (place_data['stages']), nên một profile
+    crawl một phần không ghi đè các trường khác của place đã có. Các bước lỗi hoặc hết giờ
+    (place_data['missing_stages']) được ghi vào place.missing_stages để crawl bù sau.
+    """
     cursor = conn.cursor()
     
     try:
-        # Insert place data
-        place_query = """
-        INSERT INTO place (
-            url, name, rating, review_count, address, website, phone,
-            business_hours, accessibility, service_options, highlights,
-            popular_for, offerings, dining_options, amenities, atmosphere,
-            crowd, planning, payments, children, parking
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        ) RETURNING id;
-        """
-        
-        cursor.execute(place_query, (
-            place_data.get('url'),
-            place_data.get('name'),
-            place_data.get('rating'),
-            place_data.get('review_count'),
-            place_data.get('address'),
-            place_data.get('website'),
-            place_data.get('phone'),
-            json.dumps(place_data.get('business_hours', {})),
-            place_data.get('accessibility', []),
-            place_data.get('service_options', []),
-            place_data.get('highlights', []),
-            place_data.get('popular_for', []),
-            place_data.get('offerings', []),
-            place_data.get('dining_options', []),
-            place_data.get('amenities', []),
-            place_data.get('atmosphere', []),
-            place_data.get('crowd', []),
-            place_data.get('planning', []),
-            place_data.get('payments', []),
-            place_data.get('children', []),
-            place_data.get('parking', [])
-        ))
-        
-        place_id = cursor.fetchone()[0]
+        stages = place_data['stages'] if 'stages' in place_data else CRAWL_STAGES
+        columns = ['name'] + [col for stage in CRAWL_STAGES if stage in stages for col in STAGE_COLUMNS[stage]]
+        # Toạ độ lấy từ URL nên không thuộc bước crawl nào
+        if place_data.get('lat') is not None:
+            columns += ['lat', 'lng']
+        values = [_place_column_value(place_data, col) for col in columns]
+        missing = set(place_data.get('missing_stages') or [])
+
+        cursor.execute("SELECT id, missing_stages FROM place WHERE url = %s ORDER BY id LIMIT 1",
+                       (place_data.get('url'),))
+        row = cursor.fetchone()
+        if row:
+            place_id = row[0]
+            # Bước vừa chạy xong không còn thiếu; bước lỗi/hết giờ lần này được cộng thêm
+            missing |= set(row[1] or []) - set(stages)
+        columns += ['missing_stages', 'complete']
+        values += [sorted(missing), not missing]
+        if row:
+            assignments = ", ".join(f"{col} = %s" for col in columns)
+            cursor.execute(
+                f"UPDATE place SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                values + [place_id],
+            )
+        else:
+            placeholders = ", ".join(["%s"] * (len(columns) + 1))
+            cursor.execute(
+                f"INSERT INTO place (url, {', '.join(columns)}) VALUES ({placeholders}) RETURNING id",
+                [place_data.get('url')] + values,
+            )
+            place_id = cursor.fetchone()[0]
+        if 'hours' in stages:
+            replace_open_intervals(cursor, place_id, place_data.get('business_hours'))
         conn.commit()
         return place_id
         
     except Exception as e:
-        print(f"Error inserting place: {e}")
+        logger.error("Error inserting place: %s", e)
         conn.rollback()
         return None
     finally:
@@ -105,20 +136,40 @@ def insert_place(conn, place_data: dict) -> int:
 
 
 def insert_reviews(conn, place_id: int, reviews: list):
-    """Insert reviews for a place"""
+    """Insert reviews for a place
+
+    Các review thực sự được insert (không trùng) được cộng vào review_rollup trong cùng transaction.
+    """
     cursor = conn.cursor()
     
     try:
+        # review được partition theo time_datetime nên không có UNIQUE(review_id);
+        # review_id được giành trong review_key trước, transaction khác đang giữ cùng key sẽ chờ
+        # tới khi transaction này commit rồi bỏ qua review
+        key_query = """
+        INSERT INTO review_key (review_id, place_id) VALUES (%s, %s)
+        ON CONFLICT (review_id) DO NOTHING
+        RETURNING review_id;
+        """
         review_query = """
         INSERT INTO review (
             place_id, review_id, reviewer_name, reviewer_profile_url,
-            rating, time, time_datetime, text, owner_response, review_details, photos
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        ) ON CONFLICT (review_id) DO NOTHING;
+            rating, time, time_datetime, text, owner_response, review_details, photos,
+            search_vector
+        )
+        VALUES (
+            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+            to_tsvector('simple', immutable_unaccent(lower(%s)))
+        )
+        RETURNING id;
         """
         
+        inserted_ids = []
         for review in reviews:
+            if review.get('review_id') is not None:
+                cursor.execute(key_query, (review.get('review_id'), place_id))
+                if cursor.fetchone() is None:
+                    continue
             cursor.execute(review_query, (
                 place_id,
                 review.get('review_id'),
@@ -130,14 +181,19 @@ def insert_reviews(conn, place_id: int, reviews: list):
                 review.get('text'),
                 review.get('owner_response'),
                 json.dumps(review.get('review_details', {})),
-                review.get('photos', [])
+                review.get('photos', []),
+                review.get('text')
             ))
-        
+            row = cursor.fetchone()
+            if row:
+                inserted_ids.append(row[0])
+
+        apply_review_batch(cursor, place_id, inserted_ids)
         conn.commit()
-        print(f"Inserted {len(reviews)} reviews for place_id {place_id}")
+        logger.debug("Inserted %d of %d reviews for place_id %s", len(inserted_ids), len(reviews), place_id)
         
     except Exception as e:
-        print(f"Error inserting reviews: {e}")
+        logger.error("Error inserting reviews: %s", e)
         conn.rollback()
     finally:
         cursor.close()
@@ -147,14 +203,14 @@ def save_to_database(place_data: dict):
     """Save place data to PostgreSQL database"""
     conn = connect_to_db()
     if not conn:
-        print("Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     
     try:
         # Insert place
         place_id = insert_place(conn, place_data)
         if not place_id:
-            print(f"Failed to insert place: {place_data.get('name')}")
+            logger.error("Failed to insert place: %s", place_data.get('name'))
             return False
         
         # Insert reviews
@@ -162,139 +218,102 @@ def save_to_database(place_data: dict):
         if reviews:
             insert_reviews(conn, place_id, reviews)
         
-        print(f"Successfully saved place to database: {place_data.get('name')}")
+        logger.debug("Successfully saved place to database: %s", place_data.get('name'))
         return True
         
     except Exception as e:
-        print(f"Error saving to database: {e}")
+        logger.error("Error saving to database: %s", e)
         return False
     finally:
         conn.close()
 
 
-async def _get_text(page, selectors: list[str]) -> str:
-    for sel in selectors:
-        locator = page.locator(sel).first
-        try:
-            if await locator.count() > 0:
-                text = await locator.text_content()
-                if text:
-                    return text.strip()
-        except Exception:
-            continue
-    return ""
+# Stage tải ảnh review (tuỳ chọn, DOWNLOAD_PHOTOS=1)
+PHOTO_DOWNLOADER = PhotoDownloader.from_env()
 
 
-async def _get_attr(page, selectors: list[str], attr_name: str) -> str:
-    for sel in selectors:
+async def _store_review_photos(result: dict) -> None:
+    """Tải ảnh review của place về kho local và ghi bảng review_photo"""
+    if not PHOTO_DOWNLOADER or not result.get('reviews'):
+        return
+    rows = await PHOTO_DOWNLOADER.download_review_photos(result['reviews'])
+    if not rows:
+        return
+    conn = connect_to_db()
+    if not conn:
+        return
+    try:
+        await asyncio.to_thread(save_photo_rows, conn, rows)
+    finally:
+        conn.close()
+
+
+# Thứ tự thử selector theo tỉ lệ hit gần đây, thống kê lưu giữa các lần chạy
+SELECTORS = SelectorRegistry.from_env()
+atexit.register(SELECTORS.save)
+
+
+async def _probe(page, selectors: list[str], field: str | None, read) -> str:
+    """Giá trị khác rỗng đầu tiên của `read(locator)`; có `field` thì thứ tự và hit/miss đi qua SELECTORS"""
+    tried = []
+    for sel in SELECTORS.ordered(field, selectors) if field else selectors:
+        tried.append(sel)
         locator = page.locator(sel).first
         try:
             if await locator.count() > 0:
-                val = await locator.get_attribute(attr_name)
-                if val:
-                    return val.strip()
+                value = await read(locator)
+                if value:
+                    if field:
+                        SELECTORS.observe(field, tried, sel)
+                    return value.strip()
         except Exception:
             continue
+    if field:
+        SELECTORS.observe(field, tried, None)
     return ""
 
 
-def _parse_float(text: str) -> float | None:
-    if not text:
-        return None
-    match = re.search(r"\d+(?:[\.,]\d+)?", text)
-    if not match:
-        return None
-    return float(match.group(0).replace(",", "."))
+async def _get_text(page, selectors: list[str], field: str | None = None) -> str:
+    return await _probe(page, selectors, field, lambda loc: loc.text_content())
 
 
-def _parse_reviews_count(text: str) -> int | None:
-    if not text:
-        return None
-    match = re.search(r"\d{1,3}(?:[.,]\d{3})*|\d+", text)
-    if not match:
-        return None
-    return int(match.group(0).replace(".", "").replace(",", ""))
+async def _get_attr(page, selectors: list[str], attr_name: str, field: str | None = None) -> str:
+    return await _probe(page, selectors, field, lambda loc: loc.get_attribute(attr_name))
 
 
-def _parse_relative_time(time_text: str) -> datetime | None:
-    """
-    Chuyển đổi thời gian tương đối thành datetime thực tế
-    Ví dụ: "2 tháng trước" -> datetime object
-    """
-    if not time_text:
-        return None
-    
-    # Làm sạch text
-    time_text = time_text.strip().lower()
-    
-    # Loại bỏ "Thời gian chỉnh sửa:" nếu có
-    if "thời gian chỉnh sửa:" in time_text:
-        time_text = time_text.replace("thời gian chỉnh sửa:", "").strip()
-    
-    now = datetime.now()
-    
-    # Mapping tiếng Việt
-    time_mapping = {
-        'giây': 'second',
-        'phút': 'minute', 
-        'giờ': 'hour',
-        'ngày': 'day',
-        'tuần': 'week',
-        'tháng': 'month',
-        'năm': 'year'
-    }
-    
-    # Regex patterns
-    patterns = [
-        # "2 tháng trước", "3 ngày trước"
-        (r'(\d+)\s+(giây|phút|giờ|ngày|tuần|tháng|năm)\s+trước', 1),
-        # "một tuần trước", "một năm trước"
-        (r'một\s+(giây|phút|giờ|ngày|tuần|tháng|năm)\s+trước', 2),
-    ]
-    
-    for pattern, group_num in patterns:
-        match = re.search(pattern, time_text)
-        if match:
-            if group_num == 1:
-                # Pattern có số
-                try:
-                    number = int(match.group(1))
-                except:
-                    number = 1
-                unit = match.group(2)
-            else:
-                # Pattern "một"
-                number = 1
-                unit = match.group(1)
-            
-            # Chuyển đổi unit
-            if unit in time_mapping:
-                unit = time_mapping[unit]
-            else:
-                continue
-            
-            # Tính toán datetime
-            if unit == 'second':
-                return now - timedelta(seconds=number)
-            elif unit == 'minute':
-                return now - timedelta(minutes=number)
-            elif unit == 'hour':
-                return now - timedelta(hours=number)
-            elif unit == 'day':
-                return now - timedelta(days=number)
-            elif unit == 'week':
-                return now - timedelta(weeks=number)
-            elif unit == 'month':
-                # Xấp xỉ 30 ngày cho 1 tháng
-                return now - timedelta(days=number * 30)
-            elif unit == 'year':
-                # Xấp xỉ 365 ngày cho 1 năm
-                return now - timedelta(days=number * 365)
-    
-    # Nếu không match được pattern nào
+async def _click_first(page, field: str, selectors: list[str], timeout: float = 5000) -> bool:
+    """Click selector đầu tiên của `field` click được; selector có trên trang nhưng click lỗi
+    (bị che, detach...) được tính là miss và selector kế tiếp được thử"""
+    async def click(locator):
+        await locator.click(timeout=timeout)
+        return "clicked"
+
+    return bool(await _probe(page, selectors, field, click))
+
+
+async def _first_locator(page, field: str, selectors: list[str]):
+    """Locator đầu tiên có trên trang trong các selector của `field` (None nếu không có)"""
+    tried = []
+    for sel in SELECTORS.ordered(field, selectors):
+        tried.append(sel)
+        try:
+            loc = page.locator(sel).first
+            if await loc.count() > 0:
+                SELECTORS.observe(field, tried, sel)
+                return loc
+        except Exception:
+            continue
+    SELECTORS.observe(field, tried, None)
     return None
 
 
+# Parsers dùng chung, regex đã compile sẵn trong parsing.py
+_parse_float = parse_float
+_parse_reviews_count = parse_reviews_count
+_parse_relative_time = parse_relative_time
+_strip_detail_snippets_from_text = strip_detail_snippets_from_text
+
+
 async def _extract_business_hours(page) -> dict[str, str]:
     # Try to expand weekly open hours if the toggle exists
     toggle_selectors = [
@@ -305,15 +324,8 @@ async def _extract_business_hours(page) -> dict[str, str]:
         'span[role="img"][aria-label*="Giờ mở cửa"]',
     ]
 
-    for sel in toggle_selectors:
-        try:
-            loc = page.locator(sel).first
-            if await loc.count() > 0:
-                await loc.click()
-                await page.wait_for_timeout(500)
-                break
-        except Exception:
-            continue
+    if await _click_first(page, "hours_toggle", toggle_selectors):
+        await page.wait_for_timeout(500)
 
     # Wait for the hours table to be present (if available)
     try:
@@ -363,41 +375,68 @@ async def _go_to_about_tab(page) -> None:
         'button[role="tab"]:has-text("Giới thiệu")',
         'div.Gpq6kf:has-text("Giới thiệu")',
     ]
-    for sel in selectors:
-        try:
-            loc = page.locator(sel).first
-            if await loc.count() > 0:
-                await loc.click()
-                await page.wait_for_timeout(300)  # Reduced from 500
-                break
-        except Exception:
-            continue
-
-
-async def _extract_about_list(page, heading_text: str) -> list[str]:
-    # Find the section by heading
-    section_locator = page.locator(f'div.iP2t7d:has(h2.iL3Qke:has-text("{heading_text}"))')
-    try:
-        if await section_locator.count() == 0:
-            return []
-    except Exception:
-        return []
-
-    items_locator = section_locator.locator('ul.ZQ6we li.hpLkke')
-    items: list[str] = []
-    try:
-        count = await items_locator.count()
-    except Exception:
-        count = 0
-
-    for i in range(count):
-        # Prefer aria-label within span after icon
-        label = await _get_attr(page, [f'div.iP2t7d:has(h2.iL3Qke:has-text("{heading_text}")) ul.ZQ6we li.hpLkke:nth-child({i+1}) span[aria-label]'], 'aria-label')
-        if not label:
-            label = await _get_text(page, [f'div.iP2t7d:has(h2.iL3Qke:has-text("{heading_text}")) ul.ZQ6we li.hpLkke:nth-child({i+1})'])
-        if label:
-            items.append(label)
-    return items
+    if await _click_first(page, "about_tab", selectors):
+        await page.wait_for_timeout(300)  # Reduced from 500
+
+
+# Tiêu đề section trong tab Giới thiệu -> cột trong bảng place
+ABOUT_SECTIONS = {
+    "Phù hợp cho người khuyết tật": "accessibility",
+    "Các tùy chọn dịch vụ": "service_options",
+    "Điểm nổi bật": "highlights",
+    "Nổi tiếng về": "popular_for",
+    "Dịch vụ": "offerings",
+    "Lựa chọn ăn uống": "dining_options",
+    "Tiện nghi": "amenities",
+    "Bầu không khí": "atmosphere",
+    "Khách hàng": "crowd",
+    "Lên kế hoạch": "planning",
+    "Thanh toán": "payments",
+    "Trẻ em": "children",
+    "Bãi đỗ xe": "parking",
+}
+
+# Đọc toàn bộ section trong một lần evaluate thay vì một locator cho mỗi item
+_ABOUT_SECTIONS_JS = """
+sections => sections.map(sec => {
+    const h = sec.querySelector('h2.iL3Qke');
+    const items = Array.from(sec.querySelectorAll('ul.ZQ6we li.hpLkke')).map(li => {
+        const span = li.querySelector('span[aria-label]');
+        const label = span ? span.getAttribute('aria-label') : '';
+        return (label || li.textContent || '').trim();
+    }).filter(Boolean);
+    return {heading: h ? (h.textContent || '').trim() : '', items};
+})
+"""
+
+
+async def _extract_about_sections(page) -> dict[str, list[str]]:
+    """Walk every `div.iP2t7d` section of the About tab once and return heading -> items.
+
+    Lỗi được raise để bước about nằm trong missing_stages thay vì ghi đè cột about bằng rỗng.
+    """
+    raw = await page.locator('div.iP2t7d').evaluate_all(_ABOUT_SECTIONS_JS)
+
+    sections: dict[str, list[str]] = {}
+    for sec in raw:
+        heading = sec.get('heading')
+        if heading:
+            sections.setdefault(heading, []).extend(sec.get('items', []))
+    return sections
+
+
+def _map_about_sections(sections: dict[str, list[str]]) -> dict:
+    """Map About-tab headings to place columns; unknown headings go to `about_extra`."""
+    mapped = {column: [] for column in ABOUT_SECTIONS.values()}
+    extra: dict[str, list[str]] = {}
+    for heading, items in sections.items():
+        column = ABOUT_SECTIONS.get(heading)
+        if column:
+            mapped[column] = items
+        else:
+            extra[heading] = items
+    mapped['about_extra'] = extra
+    return mapped
 
 
 async def _go_to_reviews_tab(page) -> None:
@@ -409,72 +448,102 @@ async def _go_to_reviews_tab(page) -> None:
         'button[role="tab"]:has-text("Reviews")',
         'div.Gpq6kf:has-text("Reviews")',
     ]
-    found_tab = False
-    for sel in selectors:
-        try:
-            loc = page.locator(sel).first
-            if await loc.count() > 0:
-                await loc.click()
-                print(f"Clicked on reviews tab with selector: {sel}")
-                await page.wait_for_timeout(2000)  # Increased wait time
-                found_tab = True
-                break
-        except Exception as e:
-            print(f"Error clicking tab with selector {sel}: {e}")
-            continue
-    
+    found_tab = await _click_first(page, "reviews_tab", selectors)
+    if found_tab:
+        await page.wait_for_timeout(2000)  # Increased wait time
+
     if not found_tab:
-        print("Could not find reviews tab, trying alternative approach")
+        logger.info("Could not find reviews tab, trying alternative approach")
         # Try to find any tab-like element that might be the reviews tab
         try:
             tab_elements = page.locator('button[role="tab"]')
             tab_count = await tab_elements.count()
-            print(f"Found {tab_count} tab elements")
+            logger.debug("Found %d tab elements", tab_count)
             # Try clicking the last tab, which is often the reviews tab
             if tab_count > 0:
                 await tab_elements.last.click()
-                print("Clicked on last tab element")
+                logger.debug("Clicked on last tab element")
                 await page.wait_for_timeout(2000)
         except Exception as e:
-            print(f"Error with alternative tab approach: {e}")
+            logger.warning("Error with alternative tab approach: %s", e)
+
+
+# Chế độ sắp xếp review -> (nhãn trong menu "Sắp xếp", vị trí trong menu)
+REVIEW_SORT_MODES = {
+    "relevant": ("Liên quan nhất", 0),
+    "newest": ("Mới nhất", 1),
+    "highest": ("Xếp hạng cao nhất", 2),
+    "lowest": ("Xếp hạng thấp nhất", 3),
+}
+
+
+async def _sort_reviews(page, mode: str) -> bool:
+    """Chọn chế độ sắp xếp trong menu Sắp xếp của tab Bài đánh giá"""
+    label, index = REVIEW_SORT_MODES[mode]
+    sort_selectors = [
+        'button[aria-label="Sắp xếp bài đánh giá"]',
+        'button[data-value="Sắp xếp"]',
+        'button[aria-label*="Sắp xếp"]',
+        'button[aria-label*="Sort reviews"]',
+    ]
+    if not await _click_first(page, "reviews_sort_button", sort_selectors):
+        logger.warning("Could not find or open reviews sort button")
+        return False
 
+    try:
+        items = page.locator('div[role="menuitemradio"]')
+        await items.first.wait_for(timeout=3000)
+        item = items.filter(has_text=label)
+        if await item.count() == 0:
+            item = items.nth(index)
+        await item.first.click()
+        await page.wait_for_timeout(1500)
+        logger.debug("Sorted reviews by: %s", mode)
+        return True
+    except Exception as e:
+        logger.warning("Could not select review sort '%s': %s", mode, e)
+        return False
 
-async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
+
+async def _extract_reviews(page, max_reviews: int | None = 5, deadline: float | None = None) -> list[dict]:
+    """Extract tối đa `max_reviews` review (None = tất cả đã load), dừng khi quá `deadline` (time.monotonic)"""
     reviews: list[dict] = []
-    print("Starting review extraction...")
+    progress = RateLimitedLog(logger)
+    # Một mốc thời gian crawl chung cho mọi review của place này
+    crawl_time = datetime.now()
     
     # Wait for review elements to load
     try:
         await page.wait_for_selector('div.jftiEf', timeout=10000)
-        print("Review containers loaded")
     except Exception as e:
-        print(f"Timeout waiting for review containers: {e}")
+        logger.warning("Timeout waiting for review containers: %s", e)
         return reviews
     
     # Try to find all review containers directly
     review_containers = page.locator('div.jftiEf')
     try:
         total_count = await review_containers.count()
-        print(f"Found {total_count} review containers")
     except Exception as e:
-        print(f"Error counting review containers: {e}")
+        logger.warning("Error counting review containers: %s", e)
         return reviews
     
-    actual_count = min(total_count, max_reviews)
-    print(f"Will extract {actual_count} reviews")
+    actual_count = total_count if max_reviews is None else min(total_count, max_reviews)
+    logger.debug("Extracting %d of %d loaded reviews", actual_count, total_count)
     
     for i in range(actual_count):
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.info("Review time budget reached after %d reviews", len(reviews))
+            break
         try:
-            print(f"Processing review {i+1}/{actual_count}")
             container = review_containers.nth(i)
             
             # Get review ID
             review_id = await container.get_attribute('data-review-id')
             if not review_id:
-                print(f"No review ID found for review {i+1}")
+                logger.debug("No review ID found for review %d", i + 1)
                 continue
-                
-            print(f"Review ID: {review_id}")
+            progress("Processing review %d/%d: %s", i + 1, actual_count, review_id)
+            beat()
             
             # Get reviewer name
             try:
@@ -485,7 +554,7 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
                 else:
                     name = ""
             except Exception as e:
-                print(f"Error getting reviewer name: {e}")
+                logger.debug("Error getting reviewer name: %s", e)
                 name = ""
             
             # Get rating
@@ -497,7 +566,7 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
                 else:
                     rating_value = None
             except Exception as e:
-                print(f"Error getting rating: {e}")
+                logger.debug("Error getting rating: %s", e)
                 rating_value = None
             
             # Get time
@@ -509,21 +578,20 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
                 else:
                     time_text = ""
             except Exception as e:
-                print(f"Error getting time: {e}")
+                logger.debug("Error getting time: %s", e)
                 time_text = ""
             
             # Convert relative time to datetime
-            review_datetime = _parse_relative_time(time_text)
+            review_datetime = _parse_relative_time(time_text, crawl_time)
             
             # Click "More" button if it exists
             try:
                 more_button = container.locator('button.w8nwRe.kyuRq')
                 if await more_button.count() > 0:
-                    print(f"Clicking 'More' button for review {review_id}")
                     await more_button.first.click(timeout=1000)
                     await page.wait_for_timeout(500)  # Increased wait time
             except Exception as e:
-                print(f"Could not click 'More' button: {e}")
+                logger.debug("Could not click 'More' button: %s", e)
             
             # Get review text
             try:
@@ -534,7 +602,7 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
                 else:
                     review_text = ""
             except Exception as e:
-                print(f"Error getting review text: {e}")
+                logger.debug("Error getting review text: %s", e)
                 review_text = ""
 
             # Extract structured detail chips and clean the review text
@@ -542,7 +610,7 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
                 review_details, removal_snippets = await _extract_review_details(container)
                 review_text = _strip_detail_snippets_from_text(review_text, removal_snippets)
             except Exception as e:
-                print(f"Error extracting review details: {e}")
+                logger.debug("Error extracting review details: %s", e)
                 review_details = {}
             
             # Try to get profile URL
@@ -553,14 +621,14 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
                 else:
                     profile_url = ""
             except Exception as e:
-                print(f"Error getting profile URL: {e}")
+                logger.debug("Error getting profile URL: %s", e)
                 profile_url = ""
             
             # Extract photos
             try:
                 photos = await _extract_review_photos(container)
             except Exception as e:
-                print(f"Error extracting photos for review {review_id}: {e}")
+                logger.debug("Error extracting photos for review %s: %s", review_id, e)
                 photos = []
 
             # Create review object
@@ -578,13 +646,12 @@ async def _extract_reviews(page, max_reviews: int = 5) -> list[dict]:
             }
             
             reviews.append(review_obj)
-            print(f"Successfully extracted review {i+1}")
             
         except Exception as e:
-            print(f"Error processing review {i+1}: {e}")
+            logger.warning("Error processing review %d: %s", i + 1, e)
             continue
     
-    print(f"Finished extracting reviews. Total: {len(reviews)}")
+    logger.info("Extracted %d reviews", len(reviews))
     return reviews
 
 
@@ -661,33 +728,6 @@ async def _extract_review_details(container) -> tuple[dict[str, str], list[str]]
     return details, removal_snippets
 
 
-def _strip_detail_snippets_from_text(text: str, snippets: list[str]) -> str:
-    """Remove known detail substrings from the free-form review text and tidy spaces."""
-    if not text:
-        return text
-    cleaned = text
-    for s in snippets:
-        if s:
-            cleaned = cleaned.replace(s, " ")
-
-    # Extra safety: remove common Vietnamese headings if left hanging
-    common_labels = [
-        "Đồ ăn",
-        "Dịch vụ",
-        "Bầu không khí",
-        "Độ ồn",
-        "Quy mô nhóm",
-        "Những món ăn đề xuất",
-        "Loại hình bữa ăn",
-        "Giá mỗi người",
-    ]
-    for k in common_labels:
-        cleaned = re.sub(rf"{re.escape(k)}\s*", " ", cleaned)
-
-    cleaned = re.sub(r"\s{2,}", " ", cleaned).strip()
-    return cleaned
-
-
 async def _extract_review_photos(container) -> list[str]:
     """Extract photo URLs from a review container.
     Photos are typically in buttons with class 'Tya61d' inside a div 'KtCyie'.
@@ -717,21 +757,22 @@ async def _extract_review_photos(container) -> list[str]:
                         photo_url = url_match.group(1)
                         photos.append(photo_url)
             except Exception as e:
-                print(f"Error extracting photo {i+1}: {e}")
+                logger.debug("Error extracting photo %d: %s", i + 1, e)
                 continue
                 
     except Exception as e:
-        print(f"Error extracting photos: {e}")
+        logger.debug("Error extracting photos: %s", e)
     
     return photos
 
 
-async def _scroll_reviews_to_end(page) -> None:
+async def _scroll_reviews_to_end(page, target_count: int | None = None, deadline: float | None = None) -> None:
     """Scroll through the reviews container until it can't scroll anymore.
     This ensures we load all available reviews before extraction.
+    Dừng sớm khi đã load đủ `target_count` review hoặc quá `deadline` (time.monotonic).
     """
-    print("Starting to scroll reviews to load all content...")
-    
+    progress = RateLimitedLog(logger)
+
     # Try to find the reviews container
     container_selectors = [
         'div.m6QErb.DxyBCb.kA9KIf.dS8AEf.XiKgde',
@@ -739,19 +780,10 @@ async def _scroll_reviews_to_end(page) -> None:
         'div.m6QErb.DxyBCb.kA9KIf.dS8AEf',
     ]
     
-    container = None
-    for sel in container_selectors:
-        try:
-            loc = page.locator(sel).first
-            if await loc.count() > 0:
-                container = loc
-                print(f"Found reviews container with selector: {sel}")
-                break
-        except Exception:
-            continue
-    
+    container = await _first_locator(page, "reviews_container", container_selectors)
+
     if not container:
-        print("Could not find reviews container, using page scroll")
+        logger.info("Could not find reviews container, using page scroll")
         # Fallback to page scroll if container not found
         await _scroll_page_until_end(page)
         return
@@ -762,18 +794,29 @@ async def _scroll_reviews_to_end(page) -> None:
     max_attempts = 50  # Prevent infinite scrolling
     
     while scroll_attempts < max_attempts:
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.info("Review time budget reached while scrolling")
+            break
+        if target_count is not None:
+            try:
+                if await page.locator('div.jftiEf').count() >= target_count:
+                    logger.debug("Loaded enough reviews for budget (%d)", target_count)
+                    break
+            except Exception:
+                pass
         try:
             # Get current scroll height
             current_height = await container.evaluate('el => el.scrollHeight')
             
             if current_height == previous_height:
                 # No more content to load
-                print(f"Reached end of reviews (height: {current_height})")
+                logger.debug("Reached end of reviews (height: %s)", current_height)
                 break
             
             # Scroll to bottom of container
             await container.evaluate('el => el.scrollTo(0, el.scrollHeight)')
-            print(f"Scrolled reviews container (attempt {scroll_attempts + 1}, height: {current_height})")
+            progress("Scrolled reviews container (attempt %d, height: %s)", scroll_attempts + 1, current_height)
+            beat()
             
             # Wait for new content to load with random delay (0.5 to 1 second)
             random_delay = random.uniform(0.5, 1.0)
@@ -783,7 +826,7 @@ async def _scroll_reviews_to_end(page) -> None:
             scroll_attempts += 1
             
         except Exception as e:
-            print(f"Error scrolling reviews container: {e}")
+            logger.debug("Error scrolling reviews container: %s", e)
             # Try alternative scroll method
             try:
                 await container.evaluate('el => el.scrollBy(0, 500)')
@@ -793,13 +836,13 @@ async def _scroll_reviews_to_end(page) -> None:
                 break
             scroll_attempts += 1
     
-    print(f"Finished scrolling reviews after {scroll_attempts} attempts")
+    logger.debug("Finished scrolling reviews after %d attempts", scroll_attempts)
 
 
 async def _scroll_page_until_end(page) -> None:
     """Fallback: scroll the entire page until we can't scroll anymore."""
-    print("Using page scroll fallback...")
-    
+    progress = RateLimitedLog(logger)
+
     previous_height = 0
     scroll_attempts = 0
     max_attempts = 30
@@ -810,12 +853,13 @@ async def _scroll_page_until_end(page) -> None:
             current_height = await page.evaluate('document.body.scrollHeight')
             
             if current_height == previous_height:
-                print(f"Reached end of page (height: {current_height})")
+                logger.debug("Reached end of page (height: %s)", current_height)
                 break
             
             # Scroll down
             await page.evaluate('window.scrollBy(0, 800)')
-            print(f"Scrolled page (attempt {scroll_attempts + 1}, height: {current_height})")
+            progress("Scrolled page (attempt %d, height: %s)", scroll_attempts + 1, current_height)
+            beat()
             
             # Wait for content to load with random delay (0.5 to 1 second)
             random_delay = random.uniform(0.5, 1.0)
@@ -825,10 +869,10 @@ async def _scroll_page_until_end(page) -> None:
             scroll_attempts += 1
             
         except Exception as e:
-            print(f"Error scrolling page: {e}")
+            logger.debug("Error scrolling page: %s", e)
             break
     
-    print(f"Finished page scrolling after {scroll_attempts} attempts")
+    logger.debug("Finished page scrolling after %d attempts", scroll_attempts)
 
 
 def _force_vi_lang(url: str) -> str:
@@ -849,6 +893,7 @@ def _force_vi_lang(url: str) -> str:
 def load_urls_from_specific_files() -> list[str]:
     """
     Load URLs from specific CSV files: Quận 1 and Quận 2
+    CRAWL_URL_FILES (glob, ví dụ "urls/*.csv") thay thế danh sách mặc định
     """
     urls = []
     
@@ -857,33 +902,47 @@ def load_urls_from_specific_files() -> list[str]:
         "urls/urls_nhà_hang_quán_an_Quận_1.csv",
         "urls/urls_nhà_hang_quán_an_Quận_2.csv"
     ]
+    if os.getenv('CRAWL_URL_FILES'):
+        csv_files = sorted(glob.glob(os.getenv('CRAWL_URL_FILES')))
     
-    print(f"Loading URLs from 2 specific CSV files")
+    logger.info("Loading URLs from %d specific CSV files", len(csv_files))
     
     for csv_file in csv_files:
         if os.path.exists(csv_file):
-            print(f"Reading URLs from: {os.path.basename(csv_file)}")
             try:
                 with open(csv_file, 'r', encoding='utf-8') as f:
                     reader = csv.DictReader(f)
                     file_urls = [row['url'] for row in reader if row.get('url')]
                     urls.extend(file_urls)
-                    print(f"  - Loaded {len(file_urls)} URLs from {os.path.basename(csv_file)}")
+                    logger.info("  - Loaded %d URLs from %s", len(file_urls), os.path.basename(csv_file))
             except Exception as e:
-                print(f"Error reading {csv_file}: {e}")
+                logger.error("Error reading %s: %s", csv_file, e)
                 continue
         else:
-            print(f"File not found: {csv_file}")
+            logger.warning("File not found: %s", csv_file)
     
-    print(f"Total URLs loaded: {len(urls)}")
+    logger.info("Total URLs loaded: %d", len(urls))
     return urls
 
 
-async def open_place_pages_with_checkpoint(playwright: Playwright, urls: list[str]) -> list[dict]:
-    """Version với checkpoint system để tránh timeout và có thể resume"""
-    from checkpoint_system import checkpoint
-    
-    browser = await playwright.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage'])
+class PlaceBlockedError(Exception):
+    """Google trả về trang chặn (captcha / unusual traffic) thay vì trang place"""
+
+
+async def _is_blocked(page) -> bool:
+    if "/sorry/" in page.url:
+        return True
+    try:
+        return await page.locator('form#captcha-form, div#recaptcha').count() > 0
+    except Exception:
+        return False
+
+
+# Asset tĩnh của Maps dùng chung qua đĩa giữa mọi context và lần chạy (BROWSER_CACHE_DIR)
+BROWSER_CACHE = AssetCache.from_env()
+
+
+async def _new_context(browser):
     context = await browser.new_context(
         viewport={"width": 1366, "height": 900},
         timezone_id="Asia/Ho_Chi_Minh",
@@ -892,351 +951,928 @@ async def open_place_pages_with_checkpoint(playwright: Playwright, urls: list[st
             "Accept-Language": "vi-VN,vi;q=0.9,en;q=0.4",
         },
     )
-    page = await context.new_page()
+    if BROWSER_CACHE:
+        await BROWSER_CACHE.attach(context)
+    return context
 
-    results: list[dict] = []
-    for idx, url in enumerate(urls, start=1):
-        try:
-            print(f"\n{'='*60}")
-            print(f"Processing URL {idx}/{len(urls)}: {url}")
-            print(f"{'='*60}")
-            
-            target_url = _force_vi_lang(url)
-            await page.goto(target_url, wait_until="domcontentloaded", timeout=30000)
-            await page.wait_for_timeout(2000)
 
-            # Ensure title appears
-            await page.wait_for_selector("h1.DUwDvf.lfPIob", timeout=15000)
-            await page.wait_for_timeout(10)
+class BrowserHandle:
+    """Browser + context dùng chung, có thể được kill và khởi động lại khi Chromium chết
 
-            name = await _get_text(page, ["h1.DUwDvf.lfPIob"])
-            
-            if not name:
-                print(f"❌ Could not extract name for URL: {url}")
-                checkpoint.mark_url_processed(url, "", success=False)
-                continue
+    `generation` tăng mỗi lần relaunch: page tạo từ generation cũ đã chết và phải tạo lại.
+    Browser do handle tự khởi động sẽ được handle đóng; browser caller truyền vào thì caller đóng
+    (trừ khi nó đã bị thay thế sau một lần crash).
+    """
 
-            rating_text = await _get_text(page, ['div.F7nice span[aria-hidden="true"]'])
-            rating = _parse_float(rating_text)
-
-            reviews_label = await _get_attr(page, [
-                'div.F7nice span[aria-label*="bài đánh giá"]',
-                'div.F7nice span[aria-label*="review"]',
-            ], attr_name="aria-label")
-            if not reviews_label:
-                reviews_label = await _get_text(page, ['div.F7nice span[aria-label*="bài đánh giá"]', 'div.F7nice span[aria-label*="review"]'])
-            review_count = _parse_reviews_count(reviews_label)
-
-            address = await _get_text(page, [
-                'button[data-item-id="address"] div.Io6YTe',
-                'button[data-item-id="address"]',
-            ])
-
-            website_url = await _get_attr(page, [
-                'a[data-item-id="authority"]',
-                'a.CsEnBe[data-item-id="authority"]',
-                'a[aria-label^="Website:"]',
-                'a[aria-label*="Website"]',
-            ], attr_name="href")
-
-            tel_href = await _get_attr(page, ['a[href^="tel:"]'], 'href')
-            if tel_href:
-                phone = tel_href.replace('tel:', '').strip()
-            else:
-                phone = await _get_text(page, [
-                    'button[data-item-id^="phone"] div.Io6YTe',
-                    'a[data-item-id^="phone"] div.Io6YTe',
-                    'button[aria-label*="Phone"] div.Io6YTe',
-                    'a[aria-label*="Phone"] div.Io6YTe',
-                ])
-
-            business_hours = await _extract_business_hours(page)
-            await _go_to_about_tab(page)
-            await asyncio.sleep(5)
-
-            accessibility = await _extract_about_list(page, "Phù hợp cho người khuyết tật")
-            service_options = await _extract_about_list(page, "Các tùy chọn dịch vụ")
-            highlights = await _extract_about_list(page, "Điểm nổi bật")
-            popular_for = await _extract_about_list(page, "Nổi tiếng về")
-            offerings = await _extract_about_list(page, "Dịch vụ")
-            dining_options = await _extract_about_list(page, "Lựa chọn ăn uống")
-            amenities = await _extract_about_list(page, "Tiện nghi")
-            atmosphere = await _extract_about_list(page, "Bầu không khí")
-            crowd = await _extract_about_list(page, "Khách hàng")
-            planning = await _extract_about_list(page, "Lên kế hoạch")
-            payments = await _extract_about_list(page, "Thanh toán")
-            children = await _extract_about_list(page, "Trẻ em")
-            parking = await _extract_about_list(page, "Bãi đỗ xe")
-
-            await _go_to_reviews_tab(page)
-            print("Navigated to Reviews tab")
-            await page.wait_for_timeout(3000)
-            await _scroll_reviews_to_end(page)
-
-            reviews = await _extract_reviews(page, max_reviews=review_count)
-            print(f"Extracted {len(reviews)} reviews")
-            
-            result = {
-                "url": url,
-                "name": name,
-                "rating": rating,
-                "review_count": review_count,
-                "address": address,
-                "website": website_url,
-                "phone": phone,
-                "business_hours": business_hours,
-                "accessibility": accessibility,
-                "service_options": service_options,
-                "highlights": highlights,
-                "popular_for": popular_for,
-                "offerings": offerings,
-                "dining_options": dining_options,
-                "amenities": amenities,
-                "atmosphere": atmosphere,
-                "crowd": crowd,
-                "planning": planning,
-                "payments": payments,
-                "children": children,
-                "parking": parking,
-                "reviews": reviews,
-            }
-            
-            # Save to database
+    def __init__(self, playwright: Playwright, browser=None, headless: bool = True):
+        self.playwright = playwright
+        self.browser = browser
+        self.headless = headless
+        self.context = None
+        self.generation = 0
+        self._owned = []
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> "BrowserHandle":
+        if self.browser is None:
+            self.browser = await self._launch()
+        self.context = await _new_context(self.browser)
+        return self
+
+    async def _launch(self):
+        browser = await self.playwright.chromium.launch(headless=self.headless,
+                                                        args=['--no-sandbox', '--disable-dev-shm-usage'])
+        self._owned.append(browser)
+        return browser
+
+    def is_connected(self) -> bool:
+        return self.browser.is_connected()
+
+    async def new_page(self):
+        return await self.context.new_page()
+
+    async def relaunch(self, seen_generation: int) -> None:
+        """Kill browser hiện tại và khởi động browser mới (bỏ qua nếu worker khác vừa làm)"""
+        async with self._lock:
+            if self.generation != seen_generation:
+                return
+            old = self.browser
             try:
-                success = save_to_database(result)
-                if success:
-                    checkpoint.mark_url_processed(url, name, success=True)
-                    print(f"✅ Data saved to database for place {idx}: {name}")
-                else:
-                    checkpoint.mark_url_processed(url, name, success=False)
-                    print(f"❌ Failed to save data to database for place {idx}: {name}")
+                # Browser bị treo có thể không trả lời lệnh close
+                await asyncio.wait_for(old.close(), 10)
             except Exception as e:
-                checkpoint.mark_url_processed(url, name, success=False)
-                print(f"❌ Could not save data to database: {e}")
-            
-            results.append(result)
-            print(f"✅ Captured [{idx}/{len(urls)}]: {name}")
-            
+                logger.debug("Closing dead browser failed: %s", e)
+            if old in self._owned:
+                self._owned.remove(old)
+            self.browser = await self._launch()
+            self.context = await _new_context(self.browser)
+            self.generation += 1
+            WATCHDOG.count("browser_relaunch")
+            logger.warning("🔁 Browser relaunched (generation %d)", self.generation)
+
+    async def recover(self, page, seen_generation: int, incident: WatchdogIncident):
+        """Dọn dẹp sau sự cố trên `page`; trả về page mới để crawl tiếp
+
+        Page treo được đóng (kill renderer của nó); nếu không đóng được hoặc browser đã chết
+        thì relaunch cả browser.
+        """
+        if isinstance(incident, BrowserCrashedError) or not self.is_connected():
+            await self.relaunch(seen_generation)
+        elif self.generation == seen_generation:
+            try:
+                await asyncio.wait_for(page.close(), 10)
+            except Exception as e:
+                logger.warning("Could not close hung page (%s), relaunching browser", e)
+                await self.relaunch(seen_generation)
+        return await self.new_page()
+
+    def crash_incident(self, error: Exception, seen_generation: int) -> WatchdogIncident | None:
+        """Lỗi thường (Target closed...) do browser chết/relaunch giữa chừng được coi là sự cố"""
+        if isinstance(error, WatchdogIncident):
+            return error
+        if not self.is_connected() or self.generation != seen_generation:
+            WATCHDOG.count(BrowserCrashedError.kind)
+            return BrowserCrashedError(f"Browser died: {error}")
+        return None
+
+    async def close(self) -> None:
+        with contextlib.suppress(Exception):
+            await self.context.close()
+        for browser in self._owned:
+            with contextlib.suppress(Exception):
+                await browser.close()
+        self._owned.clear()
+
+
+WATCHDOG = Watchdog.from_env()
+STAGE_TIMERS = StageTimers.from_env()
+TRACER = TraceSampler.from_env(STAGE_TIMERS)
+
+
+async def _navigate_to_place(page, url: str, rate_limiter: NavigationRateLimiter | None = None) -> None:
+    """Mở trang place và chờ tới khi tiêu đề `h1.DUwDvf` xuất hiện"""
+    if rate_limiter:
+        beat("rate_limit")
+        await rate_limiter.wait()
+    beat("navigate")
+    target_url = _force_vi_lang(url)
+    with STAGE_TIMERS.timed("navigate"):
+        await page.goto(target_url, wait_until="domcontentloaded", timeout=30000)
+        beat()
+        await page.wait_for_timeout(2000)
+
+        # Ensure title appears
+        try:
+            await page.wait_for_selector("h1.DUwDvf.lfPIob", timeout=15000)
+        except PlaywrightTimeoutError:
+            if await _is_blocked(page):
+                raise PlaceBlockedError(f"Blocked by Google while loading {url}")
+            raise
+    await page.wait_for_timeout(10)
+
+
+async def _crawl_place(page, url: str, stages: frozenset | None = None,
+                       limits: "PlaceLimits | None" = None) -> dict | None:
+    """Crawl một place trên `page`; trả về None nếu không lấy được tên"""
+    await _navigate_to_place(page, url)
+    return await _extract_place(page, url, stages or resolve_profile(), limits)
+
+
+# Các bước crawl cho một place và các cột place mà mỗi bước ghi
+CRAWL_STAGES = ("overview", "hours", "about", "reviews")
+STAGE_COLUMNS = {
+    "overview": ["rating", "review_count", "address", "website", "phone"],
+    "hours": ["business_hours"],
+    "about": list(ABOUT_SECTIONS.values()) + ["about_extra"],
+    "reviews": ["reviews_skipped", "review_sort"],
+}
+
+# Profile có tên -> các bước chạy; ngoài ra có thể ghép bước bằng "+", ví dụ "overview+hours"
+CRAWL_PROFILES = {
+    "overview": frozenset({"overview"}),
+    "details": frozenset({"overview", "hours", "about"}),
+    "reviews-only": frozenset({"reviews"}),
+    "full": frozenset(CRAWL_STAGES),
+}
+
+
+def resolve_profile(profile: str | None = None) -> frozenset:
+    """Tên profile (mặc định CRAWL_PROFILE hoặc "full") -> tập các bước crawl"""
+    profile = (profile or os.getenv('CRAWL_PROFILE') or 'full').strip()
+    if profile in CRAWL_PROFILES:
+        return CRAWL_PROFILES[profile]
+    stages = frozenset(part.strip() for part in profile.split('+'))
+    unknown = stages - set(CRAWL_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown crawl profile or stage: {', '.join(sorted(unknown))}")
+    return stages
+
+
+class ReviewBudget(NamedTuple):
+    max_count: int | None = None      # số review tối đa
+    fraction: float | None = None     # tỉ lệ trên tổng số review của place
+    time_limit: float | None = None   # giây cho scroll + extract
+
+
+def parse_review_budget(spec: str | None = None) -> ReviewBudget:
+    """REVIEW_BUDGET: "200", "10%", "90s" hoặc kết hợp "200,10%,90s" (lấy giới hạn chặt nhất)
+
+    Giá trị sai (không phải số, <= 0, tỉ lệ > 100%) raise ValueError.
+    """
+    spec = spec if spec is not None else os.getenv('REVIEW_BUDGET', '')
+    max_count = fraction = time_limit = None
+    for part in filter(None, (p.strip().lower() for p in spec.split(','))):
+        try:
+            if part.endswith('%'):
+                fraction = float(part[:-1]) / 100
+                valid = 0 < fraction <= 1
+            elif part.endswith('s'):
+                time_limit = float(part[:-1])
+                valid = time_limit > 0
+            else:
+                max_count = int(part)
+                valid = max_count > 0
+        except ValueError:
+            valid = False
+        if not valid:
+            raise ValueError(f"Invalid REVIEW_BUDGET part '{part}' (expected e.g. 200, 10%, 90s)")
+    return ReviewBudget(max_count, fraction, time_limit)
+
+
+def parse_review_sort(mode: str | None = None) -> str:
+    """REVIEW_SORT: một trong REVIEW_SORT_MODES (mặc định relevant)"""
+    mode = (mode or os.getenv('REVIEW_SORT') or 'relevant').strip()
+    if mode not in REVIEW_SORT_MODES:
+        raise ValueError(f"Unknown REVIEW_SORT '{mode}', expected one of {', '.join(REVIEW_SORT_MODES)}")
+    return mode
+
+
+def _review_limit(budget: ReviewBudget, review_count: int | None) -> int | None:
+    """Số review cần lấy cho một place; None = không giới hạn theo số lượng"""
+    limits = [review_count, budget.max_count]
+    if budget.fraction is not None and review_count is not None:
+        limits.append(max(1, math.ceil(review_count * budget.fraction)))
+    limits = [limit for limit in limits if limit is not None]
+    return min(limits) if limits else None
+
+
+class PlaceDeadline(NamedTuple):
+    total: float | None = None          # giây cho toàn bộ các bước của một place
+    stage_limits: dict | None = None    # bước -> giây
+
+
+def parse_place_deadline(spec: str | None = None) -> PlaceDeadline:
+    """PLACE_DEADLINE: "180" (tổng), "reviews=90" (từng bước) hoặc kết hợp "180,about=30,reviews=90" """
+    spec = spec if spec is not None else os.getenv('PLACE_DEADLINE', '')
+    total = None
+    stage_limits = {}
+    for part in filter(None, (p.strip().lower() for p in spec.split(','))):
+        if '=' in part:
+            stage, seconds = (x.strip() for x in part.split('=', 1))
+            if stage not in CRAWL_STAGES:
+                raise ValueError(f"Unknown crawl stage in PLACE_DEADLINE: {stage}")
+            stage_limits[stage] = float(seconds.rstrip('s'))
+        else:
+            total = float(part.rstrip('s'))
+    return PlaceDeadline(total, stage_limits)
+
+
+class PlaceLimits(NamedTuple):
+    """Giới hạn cho mỗi place, parse một lần khi bắt đầu crawl"""
+    deadline: PlaceDeadline
+    review_budget: ReviewBudget
+    review_sort: str
+
+    @classmethod
+    def from_env(cls) -> "PlaceLimits":
+        """PLACE_DEADLINE, REVIEW_BUDGET, REVIEW_SORT; giá trị sai raise ValueError"""
+        return cls(parse_place_deadline(), parse_review_budget(), parse_review_sort())
+
+
+def _stage_timeout(deadline: PlaceDeadline, stage: str, started: float) -> float | None:
+    """Thời gian còn lại cho `stage`: giới hạn riêng của bước và phần còn lại của tổng"""
+    limits = []
+    if deadline.total is not None:
+        limits.append(deadline.total - (time.monotonic() - started))
+    if deadline.stage_limits and stage in deadline.stage_limits:
+        limits.append(deadline.stage_limits[stage])
+    return min(limits) if limits else None
+
+
+async def _extract_place(page, url: str, stages: frozenset = CRAWL_PROFILES["full"],
+                         limits: PlaceLimits | None = None) -> dict | None:
+    """Trích xuất dữ liệu từ một trang place đã load xong, chỉ chạy các bước trong `stages`
+
+    Mỗi bước chạy độc lập trong budget của `limits.deadline` (mặc định PLACE_DEADLINE). Bước lỗi
+    hoặc hết giờ không làm mất dữ liệu của các bước khác: result['stages'] chỉ gồm các bước
+    đã xong, các bước còn thiếu nằm trong result['missing_stages'].
+    """
+    limits = limits or PlaceLimits.from_env()
+    deadline = limits.deadline
+    started = time.monotonic()
+    name = await _get_text(page, ["h1.DUwDvf.lfPIob"], field="name")
+    if not name:
+        return None
+
+    result = {"url": url, "name": name}
+    # URL rút gọn không có toạ độ; Maps redirect sang URL đầy đủ có "!3d...!4d..."
+    coordinates = parse_coordinates(url) or parse_coordinates(page.url)
+    if coordinates:
+        result["lat"], result["lng"] = coordinates
+
+    review_count = None
+    if "overview" in stages or "reviews" in stages:
+        reviews_label = await _get_attr(page, [
+            'div.F7nice span[aria-label*="bài đánh giá"]',
+            'div.F7nice span[aria-label*="review"]',
+        ], attr_name="aria-label", field="review_count")
+        if not reviews_label:
+            # Fallback to text content if aria-label not available
+            reviews_label = await _get_text(page, ['div.F7nice span[aria-label*="bài đánh giá"]', 'div.F7nice span[aria-label*="review"]'],
+                                            field="review_count_text")
+        review_count = _parse_reviews_count(reviews_label)
+
+    async def overview(timeout):
+        rating_text = await _get_text(page, ['div.F7nice span[aria-hidden="true"]'], field="rating")
+        rating = _parse_float(rating_text)
+
+        address = await _get_text(page, [
+            'button[data-item-id="address"] div.Io6YTe',
+            'button[data-item-id="address"]',
+        ], field="address")
+
+        # Website URL (link quán)
+        website_url = await _get_attr(page, [
+            'a[data-item-id="authority"]',
+            'a.CsEnBe[data-item-id="authority"]',
+            'a[aria-label^="Website:"]',
+            'a[aria-label*="Website"]',
+        ], attr_name="href", field="website")
+
+        # Phone number
+        tel_href = await _get_attr(page, ['a[href^="tel:"]'], 'href', field="phone_link")
+        if tel_href:
+            phone = tel_href.replace('tel:', '').strip()
+        else:
+            phone = await _get_text(page, [
+                'button[data-item-id^="phone"] div.Io6YTe',
+                'a[data-item-id^="phone"] div.Io6YTe',
+                'button[aria-label*="Phone"] div.Io6YTe',
+                'a[aria-label*="Phone"] div.Io6YTe',
+            ], field="phone")
+
+        result.update({
+            "rating": rating,
+            "review_count": review_count,
+            "address": address,
+            "website": website_url,
+            "phone": phone,
+        })
+
+    async def hours(timeout):
+        result["business_hours"] = await _extract_business_hours(page)
+
+    async def about(timeout):
+        # Navigate to About tab to extract additional attributes
+        await _go_to_about_tab(page)
+        await asyncio.sleep(5)
+        result.update(_map_about_sections(await _extract_about_sections(page)))
+
+    async def reviews(timeout):
+        budget = limits.review_budget
+        sort_mode = limits.review_sort
+        limit = _review_limit(budget, review_count)
+        time_limits = [budget.time_limit] if budget.time_limit else []
+        if timeout is not None:
+            # Dừng scroll/extract trước hạn của bước để giữ lại các review đã lấy được
+            time_limits.append(max(timeout - 10, timeout * 0.8))
+        review_deadline = time.monotonic() + min(time_limits) if time_limits else None
+
+        # Go to Reviews tab and extract reviews
+        await _go_to_reviews_tab(page)
+        await page.wait_for_timeout(3000)
+        # "relevant" là thứ tự mặc định của Google
+        if sort_mode != "relevant":
+            await _sort_reviews(page, sort_mode)
+        await _scroll_reviews_to_end(page, target_count=limit, deadline=review_deadline)
+
+        extracted = await _extract_reviews(page, max_reviews=limit, deadline=review_deadline)
+        result["reviews"] = extracted
+        result["review_sort"] = sort_mode
+        result["reviews_skipped"] = max(review_count - len(extracted), 0) if review_count is not None else None
+
+    steps = {"overview": overview, "hours": hours, "about": about, "reviews": reviews}
+    completed: list[str] = []
+    stage_errors: dict[str, str] = {}
+    for stage in CRAWL_STAGES:
+        if stage not in stages:
+            continue
+        timeout = _stage_timeout(deadline, stage, started)
+        if timeout is not None and timeout <= 0:
+            stage_errors[stage] = "deadline"
+            continue
+        beat(stage)
+        stage_started = time.monotonic()
+        try:
+            await asyncio.wait_for(steps[stage](timeout), timeout)
+            completed.append(stage)
+        except (asyncio.TimeoutError, PlaywrightTimeoutError) as e:
+            stage_errors[stage] = "timeout"
+            logger.warning("⏱️  Stage '%s' timed out for %s: %s", stage, name, str(e) or 'deadline reached')
+        except Exception as e:
+            stage_errors[stage] = str(e) or type(e).__name__
+            logger.warning("⚠️  Stage '%s' failed for %s: %s", stage, name, e)
+        STAGE_TIMERS.record(stage, time.monotonic() - stage_started)
+    STAGE_TIMERS.record("place", time.monotonic() - started)
+
+    result["stages"] = completed
+    result["missing_stages"] = list(stage_errors)
+    result["stage_errors"] = stage_errors
+    if stage_errors:
+        logger.info("🧩 Partial result for %s: done %s, missing %s after %.1fs",
+                    name, completed or '-', list(stage_errors), time.monotonic() - started)
+    return result
+
+
+def _mark_first_place() -> None:
+    """Ghi nhận thời gian từ khi process start tới place đầu tiên được lưu"""
+    if 'first_place' not in service_state.stages:
+        elapsed = service_state.mark('first_place')
+        stages = ", ".join(f"{k} {v:.1f}s" for k, v in service_state.stages.items())
+        logger.info("⏱️  Startup to first place processed: %.1fs (%s)", elapsed, stages)
+
+
+def _outcome(result: dict, saved: bool) -> str:
+    if not saved:
+        return "save_failed"
+    return "partial" if result.get("missing_stages") else "saved"
+
+
+def _log_place_summary(outcome: str, started: float, result: dict | None = None, error: str | None = None) -> None:
+    """Dòng JSON tổng kết cho một place (worker/url/feature_id lấy từ place_context)"""
+    result = result or {}
+    log_place_summary(
+        outcome=outcome,
+        name=result.get("name"),
+        duration_s=round(time.monotonic() - started, 2),
+        stages=result.get("stages"),
+        missing_stages=result.get("missing_stages") or [],
+        reviews=len(result.get("reviews") or []),
+        error=error,
+    )
+
+
+class CrawlOutcome(NamedTuple):
+    """Một URL đã crawl xong, do các generator crawl yield ra"""
+    url: str
+    result: dict | None        # None khi không lấy được place
+    outcome: str               # ok | no_name | blocked | timeout | error | hung_page | browser_crash
+    error: str | None
+    started: float             # time.monotonic() lúc bắt đầu URL
+    label: str = ""
+    worker: int | None = None
+
+
+class PostgresSink:
+    """Ghi place + reviews vào Postgres (psycopg2 chạy trong thread) và tải ảnh review nếu bật"""
+
+    name = "postgres"
+
+    async def write(self, place: dict) -> bool:
+        saved = await asyncio.to_thread(save_to_database, place)
+        if saved:
+            await _store_review_photos(place)
+        return saved
+
+    async def close(self):
+        pass
+
+
+def build_sinks(spec: str | None = None) -> list:
+    """CRAWL_SINKS: danh sách sink cách nhau bởi dấu phẩy (postgres, ndjson, stdout)"""
+    from sinks import NdjsonSink, StdoutSink
+
+    factories = {"postgres": PostgresSink, "ndjson": NdjsonSink.from_env, "stdout": StdoutSink}
+    names = [n.strip() for n in (spec or os.getenv('CRAWL_SINKS') or 'postgres').split(',') if n.strip()]
+    unknown = set(names) - set(factories)
+    if unknown:
+        raise ValueError(f"Unknown sink: {', '.join(sorted(unknown))}")
+    return [factories[name]() for name in names]
+
+
+async def deliver(places: AsyncIterator[CrawlOutcome], sinks: list | None = None, checkpoint=None) -> dict:
+    """Đẩy từng place từ generator `places` qua mọi sink, cập nhật checkpoint; trả về số đếm theo outcome
+
+    Place chỉ được mark thành công trong checkpoint khi mọi sink ghi được.
+    """
+    sinks = sinks if sinks is not None else build_sinks()
+    counts: dict[str, int] = {}
+    try:
+        async with contextlib.aclosing(places):
+            async for item in places:
+                with place_context(worker=item.worker, url=item.url, feature_id=parse_feature_id(item.url)):
+                    if item.result is None:
+                        if checkpoint:
+                            checkpoint.mark_url_processed(item.url, "", success=False)
+                        _log_place_summary(item.outcome, item.started, error=item.error)
+                        counts[item.outcome] = counts.get(item.outcome, 0) + 1
+                        continue
+
+                    name = item.result["name"]
+                    saved = True
+                    for sink in sinks:
+                        try:
+                            ok = await sink.write(item.result)
+                        except Exception as e:
+                            logger.error("❌ Sink %s failed for %s: %s", sink.name, name, e)
+                            ok = False
+                        saved = saved and ok
+                    if checkpoint:
+                        checkpoint.mark_url_processed(item.url, name, success=saved)
+                    if saved:
+                        _mark_first_place()
+                        logger.info("✅ Captured [%s]: %s", item.label, name)
+                    else:
+                        logger.error("❌ Failed to save place %s: %s", item.label, name)
+                    outcome = _outcome(item.result, saved)
+                    _log_place_summary(outcome, item.started, item.result)
+                    counts[outcome] = counts.get(outcome, 0) + 1
+    finally:
+        for sink in sinks:
+            await sink.close()
+        SELECTORS.save()
+        if SELECTORS.drifted:
+            logger.warning("🧭 Fields with selector drift: %s", sorted(SELECTORS.drifted))
+    return counts
+
+
+async def crawl_places(playwright: Playwright, urls: list[str], browser=None, profile: str | None = None,
+                       delay_seconds: float = 30, url_stages: dict[str, frozenset] | None = None,
+                       headless: bool = True) -> AsyncIterator[CrawlOutcome]:
+    """Crawl tuần tự trên một page, yield từng place ngay khi xong
+
+    `url_stages` cho phép chọn bước riêng cho từng URL (crawl bù); còn lại dùng `profile`.
+    Nếu truyền `browser` đã khởi động sẵn thì caller chịu trách nhiệm đóng nó.
+    Page treo hoặc browser chết (xem crawl_watchdog) được khôi phục và URL được crawl lại
+    tối đa WATCHDOG_MAX_REQUEUES lần.
+    """
+    stages = resolve_profile(profile)
+    limits = PlaceLimits.from_env()
+    handle = await BrowserHandle(playwright, browser, headless).start()
+    page = await handle.new_page()
+
+    try:
+        for idx, url in enumerate(urls, start=1):
+            label = f"{idx}/{len(urls)}"
+            with place_context(url=url, feature_id=parse_feature_id(url)):
+                started = time.monotonic()
+                logger.info("Processing URL %s: %s", label, url)
+                place_stages = (url_stages or {}).get(url, stages)
+                traced = TRACER.sample()
+                requeues = 0
+                while True:
+                    generation = handle.generation
+                    if not handle.is_connected():
+                        # Chromium chết giữa hai URL
+                        page = await handle.recover(page, generation, BrowserCrashedError("Browser disconnected"))
+                        continue
+                    if traced and requeues == 0:
+                        # Trace chạy trong context riêng; lần crawl lại sau sự cố không trace
+                        crawl = TRACER.run(handle.browser, _new_context, url,
+                                           lambda traced_page: _crawl_place(traced_page, url, place_stages, limits))
+                    else:
+                        crawl = _crawl_place(page, url, place_stages, limits)
+                    try:
+                        result = await WATCHDOG.guard(crawl, handle.is_connected)
+                        outcome, error = ("ok", None) if result else ("no_name", None)
+                        if not result:
+                            logger.error("❌ Could not extract name for URL: %s", url)
+                        break
+                    except Exception as e:
+                        incident = handle.crash_incident(e, generation)
+                        if incident is None:
+                            logger.error("Failed to open URL #%d: %s -> %s", idx, url, e)
+                            result, outcome, error = None, "error", str(e)
+                            break
+                    logger.warning("🐕 %s on %s: %s", incident.kind, url, incident)
+                    page = await handle.recover(page, generation, incident)
+                    if requeues >= WATCHDOG.max_requeues:
+                        WATCHDOG.count("gave_up")
+                        result, outcome, error = None, incident.kind, str(incident)
+                        break
+                    requeues += 1
+                    WATCHDOG.count("requeued")
+
+            yield CrawlOutcome(url, result, outcome, error, started, label)
+
             # Add delay before next URL (except for the last one)
-            if idx < len(urls):
-                print(f"⏳ Waiting 30 seconds before next URL...")
-                await asyncio.sleep(30)  # Reduced delay for Render
-                
+            if outcome == "ok" and idx < len(urls):
+                logger.debug("⏳ Waiting %d seconds before next URL...", delay_seconds)
+                await asyncio.sleep(delay_seconds)
+    finally:
+        await handle.close()
+        WATCHDOG.report()
+        STAGE_TIMERS.report()
+        TRACER.report()
+        if BROWSER_CACHE:
+            BROWSER_CACHE.report()
+
+
+async def open_place_pages_with_checkpoint(playwright: Playwright, urls: list[str], browser=None,
+                                           profile: str | None = None, sinks: list | None = None) -> dict:
+    """Version với checkpoint system để tránh timeout và có thể resume
+
+    Nếu truyền `browser` đã khởi động sẵn thì caller chịu trách nhiệm đóng nó.
+    `profile` chọn các bước crawl (xem CRAWL_PROFILES), mặc định theo CRAWL_PROFILE.
+    Trả về số place theo outcome; dữ liệu đi thẳng vào `sinks` (mặc định CRAWL_SINKS).
+    """
+    from checkpoint_system import checkpoint
+
+    places = crawl_places(playwright, urls, browser=browser, profile=profile)
+    return await deliver(places, sinks, checkpoint)
+
+
+async def crawl_places_concurrent(playwright: Playwright, urls: list[str],
+                                  controller: AIMDController | None = None,
+                                  delay_seconds: float = 30,
+                                  prefetch: bool | None = None,
+                                  rate_limiter: NavigationRateLimiter | None = None,
+                                  browser=None,
+                                  profile: str | None = None) -> AsyncIterator[CrawlOutcome]:
+    """Crawl song song nhiều page; số worker active do AIMDController tự điều chỉnh.
+
+    Với `prefetch`, mỗi worker dùng page thứ hai để điều hướng trước tới URL kế tiếp
+    trong lúc place hiện tại đang được scroll/extract. Mọi lần điều hướng đều đi qua
+    `rate_limiter` chung. Place được yield qua một queue giới hạn theo số worker, nên
+    worker chờ khi sink ghi chậm thay vì tích place trong bộ nhớ.
+    Page treo hoặc browser chết (xem crawl_watchdog) không làm hỏng các URL còn lại: page/browser
+    được khôi phục và URL đang dở được đưa lại vào hàng đợi tối đa WATCHDOG_MAX_REQUEUES lần.
+    """
+    controller = controller or AIMDController.from_env()
+    if prefetch is None:
+        prefetch = os.getenv('CRAWL_PREFETCH', '0') == '1'
+    rate_limiter = rate_limiter or NavigationRateLimiter.from_env()
+    stages = resolve_profile(profile)
+    limits = PlaceLimits.from_env()
+    handle = await BrowserHandle(playwright, browser).start()
+
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+    total = len(urls)
+    requeues: dict[str, int] = {}
+    out: asyncio.Queue = asyncio.Queue(maxsize=controller.max_workers)
+    finished = object()
+
+    async def process(worker_id: int, page, url: str, label: str, navigation: asyncio.Task | None,
+                      heartbeat: Heartbeat, generation: int) -> None:
+        """Crawl một URL; trả về page mới nếu `page` phải bỏ sau sự cố watchdog
+
+        `navigation` là None với URL được chọn để trace: điều hướng và extract chạy trong
+        context riêng của TRACER thay vì trên `page`.
+        """
+        logger.info("Processing URL %s: %s", label, url)
+        started = time.monotonic()
+
+        async def emit(result, outcome, error=None):
+            await out.put(CrawlOutcome(url, result, outcome, error, started, label, worker_id))
+
+        async def traced(traced_page):
+            await _navigate_to_place(traced_page, url, rate_limiter)
+            return await _extract_place(traced_page, url, stages, limits)
+
+        async def crawl():
+            if navigation is None:
+                return await TRACER.run(handle.browser, _new_context, url, traced)
+            await navigation
+            return await _extract_place(page, url, stages, limits)
+
+        try:
+            result = await WATCHDOG.guard(crawl(), handle.is_connected, heartbeat)
+        except PlaceBlockedError as e:
+            controller.record(False, time.monotonic() - started, blocked=True)
+            logger.warning("🚫 %s", e)
+            await emit(None, "blocked", str(e))
+            return
+        except PlaywrightTimeoutError as e:
+            controller.record(False, time.monotonic() - started, timeout=True)
+            logger.warning("⏱️ Timeout on %s: %s", url, e)
+            await emit(None, "timeout", str(e))
+            return
         except Exception as e:
-            print(f"Failed to open URL #{idx}: {url} -> {e}")
-            checkpoint.mark_url_processed(url, "", success=False)
-            error_result = {
-                "url": url,
-                "error": str(e),
-            }
-            results.append(error_result)
+            incident = handle.crash_incident(e, generation)
+            if incident is not None:
+                # Không tính vào AIMD: sự cố của page/browser, không phải Google chặn hay chậm
+                if navigation is not None and not navigation.done():
+                    navigation.cancel()
+                logger.warning("🐕 %s on %s: %s", incident.kind, url, incident)
+                new_page = await handle.recover(page, generation, incident)
+                if requeues.get(url, 0) < WATCHDOG.max_requeues:
+                    requeues[url] = requeues.get(url, 0) + 1
+                    WATCHDOG.count("requeued")
+                    queue.put_nowait(url)
+                else:
+                    WATCHDOG.count("gave_up")
+                    await emit(None, incident.kind, str(incident))
+                return new_page
+            controller.record(False, time.monotonic() - started)
+            logger.error("Failed to open URL %s: %s -> %s", label, url, e)
+            await emit(None, "error", str(e))
+            return
 
-    await context.close()
-    await browser.close()
-    return results
+        if not result:
+            controller.record(False, time.monotonic() - started)
+            logger.error("❌ Could not extract name for URL: %s", url)
+            await emit(None, "no_name")
+            return
 
-async def open_place_pages(playwright: Playwright, urls: list[str]) -> list[dict]:
-    browser = await playwright.chromium.launch(headless=False)
-    context = await browser.new_context(
-        viewport={"width": 1366, "height": 900},
-        timezone_id="Asia/Ho_Chi_Minh",
-        locale="vi-VN",
-        extra_http_headers={
-            "Accept-Language": "vi-VN,vi;q=0.9,en;q=0.4",
-        },
-    )
-    page = await context.new_page()
+        timed_out = "timeout" in result.get("stage_errors", {}).values()
+        controller.record(True, time.monotonic() - started, timeout=timed_out)
+        await emit(result, "ok")
+
+    def start_navigation(page, url: str) -> tuple[asyncio.Task | None, Heartbeat]:
+        # Điều hướng (kể cả điều hướng trước) báo heartbeat cho guard của URL đó
+        heartbeat = Heartbeat()
+        if TRACER.sample():
+            # URL được trace tự điều hướng trong context riêng lúc process, không điều hướng trước
+            return None, heartbeat
+        return tracked_task(_navigate_to_place(page, url, rate_limiter), heartbeat), heartbeat
 
-    results: list[dict] = []
-    for idx, url in enumerate(urls, start=1):
+    def next_url() -> tuple[str, str] | None:
         try:
-            print(f"\n{'='*60}")
-            print(f"Processing URL {idx}/{len(urls)}: {url}")
-            print(f"{'='*60}")
-            
-            target_url = _force_vi_lang(url)
-            await page.goto(target_url, wait_until="domcontentloaded", timeout=30000)  # Added explicit timeout
-            # Give the page a brief moment to stabilize
-            await page.wait_for_timeout(2000)  # Reduced from 3000
+            url = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+        return url, f"{total - queue.qsize()}/{total}"
+
+    async def worker(worker_id: int) -> None:
+        # Context worker chỉ áp dụng trong task của worker này
+        with place_context(worker=worker_id):
+            generation = handle.generation
+            pages = [await handle.new_page()]
+            if prefetch:
+                pages.append(await handle.new_page())
+            # (url, label, page, navigation task, heartbeat) đã được điều hướng trước
+            pending = None
+            try:
+                while pending or not queue.empty():
+                    if generation != handle.generation:
+                        # Browser đã được relaunch: page cũ và điều hướng trước trên đó đã chết
+                        generation = handle.generation
+                        if pending:
+                            if pending[3] is not None:
+                                pending[3].cancel()
+                                await asyncio.gather(pending[3], return_exceptions=True)
+                            queue.put_nowait(pending[0])
+                            pending = None
+                        for page in pages:
+                            with contextlib.suppress(Exception):
+                                await page.close()
+                        pages = [await handle.new_page() for _ in pages]
+                    await controller.acquire()
+                    try:
+                        if pending:
+                            url, label, page, navigation, heartbeat = pending
+                            pending = None
+                        else:
+                            item = next_url()
+                            if not item:
+                                return
+                            url, label = item
+                            page = pages[0]
+                            navigation, heartbeat = start_navigation(page, url)
+
+                        if prefetch:
+                            item = next_url()
+                            if item:
+                                spare = pages[1] if page is pages[0] else pages[0]
+                                pending = (*item, spare, *start_navigation(spare, item[0]))
+
+                        with place_context(url=url, feature_id=parse_feature_id(url)):
+                            new_page = await process(worker_id, page, url, label, navigation, heartbeat, generation)
+                        if new_page is not None:
+                            pages[pages.index(page) if page in pages else 0] = new_page
+                    finally:
+                        await controller.release()
+
+                    # Mỗi worker giữ khoảng nghỉ riêng giữa các URL
+                    await asyncio.sleep(delay_seconds)
+            finally:
+                # Huỷ điều hướng trước còn dở; URL chưa được mark nên lần chạy sau sẽ crawl lại
+                if pending and pending[3] is not None:
+                    pending[3].cancel()
+                    await asyncio.gather(pending[3], return_exceptions=True)
+                for page in pages:
+                    with contextlib.suppress(Exception):
+                        await page.close()
+
+    tuner = asyncio.create_task(controller.run())
+
+    async def run_workers() -> None:
+        try:
+            await asyncio.gather(*(worker(i) for i in range(1, controller.max_workers + 1)))
+        finally:
+            await out.put(finished)
 
-            # Ensure title appears
-            await page.wait_for_selector("h1.DUwDvf.lfPIob", timeout=15000)  # Reduced from 30000
+    runner = asyncio.create_task(run_workers())
+    try:
+        while (item := await out.get()) is not finished:
+            yield item
+        await runner
+    finally:
+        runner.cancel()
+        tuner.cancel()
+        await asyncio.gather(runner, tuner, return_exceptions=True)
+        await handle.close()
+        WATCHDOG.report()
+        STAGE_TIMERS.report()
+        TRACER.report()
+        if BROWSER_CACHE:
+            BROWSER_CACHE.report()
+
+
+async def open_place_pages_concurrent(playwright: Playwright, urls: list[str], browser=None,
+                                      profile: str | None = None, sinks: list | None = None,
+                                      **options) -> dict:
+    """Crawl song song (xem crawl_places_concurrent) với checkpoint; trả về số place theo outcome"""
+    from checkpoint_system import checkpoint
 
-            await page.wait_for_timeout(10)
+    places = crawl_places_concurrent(playwright, urls, browser=browser, profile=profile, **options)
+    return await deliver(places, sinks, checkpoint)
 
-            name = await _get_text(
-                page,
-                [
-                    "h1.DUwDvf.lfPIob",
-                ],
-            )
 
-            rating_text = await _get_text(
-                page,
-                [
-                    'div.F7nice span[aria-hidden="true"]',
-                ],
-            )
-            rating = _parse_float(rating_text)
+# Các bước payload trong HTML trả lời được; profile có about/reviews vẫn cần Playwright
+FAST_PATH_STAGES = frozenset({"overview", "hours"})
 
-            reviews_label = await _get_attr(
-                page,
-                [
-                    'div.F7nice span[aria-label*="bài đánh giá"]',
-                    'div.F7nice span[aria-label*="review"]',
-                ],
-                attr_name="aria-label",
-            )
-            if not reviews_label:
-                # Fallback to text content if aria-label not available
-                reviews_label = await _get_text(page, ['div.F7nice span[aria-label*="bài đánh giá"]', 'div.F7nice span[aria-label*="review"]'])
-            review_count = _parse_reviews_count(reviews_label)
 
-            address = await _get_text(
-                page,
-                [
-                    'button[data-item-id="address"] div.Io6YTe',
-                    'button[data-item-id="address"]',
-                ],
-            )
+async def crawl_places_fast(playwright: Playwright, urls: list[str], browser=None, profile: str | None = None,
+                            fetcher: PayloadFetcher | None = None) -> AsyncIterator[CrawlOutcome]:
+    """Crawl bằng HTTP (payload nhúng trong HTML, xem place_payload), không mở trang trong Chromium
 
-            # Website URL (link quán)
-            website_url = await _get_attr(
-                page,
-                [
-                    'a[data-item-id="authority"]',
-                    'a.CsEnBe[data-item-id="authority"]',
-                    'a[aria-label^="Website:"]',
-                    'a[aria-label*="Website"]',
-                ],
-                attr_name="href",
-            )
+    URL mà payload thiếu trường bắt buộc, bị chặn hoặc lỗi được crawl lại bằng Playwright sau cùng
+    (song song nếu có CRAWL_CONCURRENCY). Chỉ dùng được với profile gồm overview / hours.
+    """
+    stages = resolve_profile(profile)
+    fallback = crawl_places_concurrent if os.getenv('CRAWL_CONCURRENCY') else crawl_places
+    if not stages <= FAST_PATH_STAGES:
+        logger.warning("⚡ HTTP fast path covers only %s, profile needs %s: using Playwright",
+                       sorted(FAST_PATH_STAGES), sorted(stages))
+        async for item in fallback(playwright, urls, browser=browser, profile=profile):
+            yield item
+        return
 
-            # Phone number
-            tel_href = await _get_attr(page, ['a[href^="tel:"]'], 'href')
-            if tel_href:
-                phone = tel_href.replace('tel:', '').strip()
-            else:
-                phone = await _get_text(
-                    page,
-                    [
-                        'button[data-item-id^="phone"] div.Io6YTe',
-                        'a[data-item-id^="phone"] div.Io6YTe',
-                        'button[aria-label*="Phone"] div.Io6YTe',
-                        'a[aria-label*="Phone"] div.Io6YTe',
-                    ],
-                )
-
-            business_hours = await _extract_business_hours(page)
-
-            # Navigate to About tab to extract additional attributes
-            await _go_to_about_tab(page)
-
-            await asyncio.sleep(5)
-
-            accessibility = await _extract_about_list(page, "Phù hợp cho người khuyết tật")
-            service_options = await _extract_about_list(page, "Các tùy chọn dịch vụ")
-            highlights = await _extract_about_list(page, "Điểm nổi bật")
-            popular_for = await _extract_about_list(page, "Nổi tiếng về")
-            offerings = await _extract_about_list(page, "Dịch vụ")
-            dining_options = await _extract_about_list(page, "Lựa chọn ăn uống")
-            amenities = await _extract_about_list(page, "Tiện nghi")
-            atmosphere = await _extract_about_list(page, "Bầu không khí")
-            crowd = await _extract_about_list(page, "Khách hàng")
-            planning = await _extract_about_list(page, "Lên kế hoạch")
-            payments = await _extract_about_list(page, "Thanh toán")
-            children = await _extract_about_list(page, "Trẻ em")
-            parking = await _extract_about_list(page, "Bãi đỗ xe")
-
-            # Go to Reviews tab and extract reviews
-            await _go_to_reviews_tab(page)
-            print("Navigated to Reviews tab")
-            
-            # Wait for reviews to load
-            await page.wait_for_timeout(3000)
-            
-            # Scroll through all reviews to load all content
-            await _scroll_reviews_to_end(page)
-            
-            # Debug: Check if review containers exist
+    fetcher = fetcher or PayloadFetcher.from_env()
+    completed = [stage for stage in CRAWL_STAGES if stage in stages]
+    # Một nhóm worker cố định đọc URL từ queue, thay vì một task cho mỗi URL
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+    out: asyncio.Queue = asyncio.Queue(maxsize=fetcher.concurrency)
+    finished = object()
+
+    async def worker():
+        while True:
             try:
-                review_check = page.locator('div.jftiEf')
-                review_count_check = await review_check.count()
-                print(f"DEBUG: Found {review_count_check} review containers before extraction")
-            except Exception as e:
-                print(f"DEBUG: Error checking review containers: {e}")
-            
-            print("Starting to extract reviews...")
-            reviews = await _extract_reviews(page, max_reviews=review_count)
-            print(f"Extracted {len(reviews)} reviews")
-            
-            # Create result object before continuing
-            result = {
-                "url": url,
-                "name": name,
-                "rating": rating,
-                "review_count": review_count,
-                "address": address,
-                "website": website_url,
-                "phone": phone,
-                "business_hours": business_hours,
-                "accessibility": accessibility,
-                "service_options": service_options,
-                "highlights": highlights,
-                "popular_for": popular_for,
-                "offerings": offerings,
-                "dining_options": dining_options,
-                "amenities": amenities,
-                "atmosphere": atmosphere,
-                "crowd": crowd,
-                "planning": planning,
-                "payments": payments,
-                "children": children,
-                "parking": parking,
-                "reviews": reviews,
-            }
-            
-            # Save to database instead of JSON
+                url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
             try:
-                success = save_to_database(result)
-                if success:
-                    print(f"✅ Data saved to database for place {idx}: {name}")
-                else:
-                    print(f"❌ Failed to save data to database for place {idx}: {name}")
+                item = await fetcher.fetch(url, _force_vi_lang(url), stages)
             except Exception as e:
-                print(f"❌ Could not save data to database: {e}")
-            
-            # Save result and continue
-            results.append(result)
-            print(f"✅ Captured [{idx}/{len(urls)}]: {name}")
-            
-            # Add 1 minute delay before next URL (except for the last one)
-            if idx < len(urls):
-                print(f"⏳ Waiting 1 minute before next URL...")
-                await asyncio.sleep(60)  # 1 minute delay
-        except Exception as e:
-            print(f"Failed to open URL #{idx}: {url} -> {e}")
-            error_result = {
-                "url": url,
-                "error": str(e),
-            }
-            results.append(error_result)
-
-            # Log error but don't save to database
-            print(f"Error processing place {idx}: {str(e)}")
-            results.append(
-                {
-                    "url": url,
-                    "error": str(e),
-                }
-            )
+                item = (url, None, f"error: {e}", 0.0)
+            await out.put(item)
+        await out.put(finished)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(fetcher.concurrency, len(urls)))]
+    active = len(workers)
+    pending: list[str] = []
+    idx = 0
+    try:
+        while active:
+            item = await out.get()
+            if item is finished:
+                active -= 1
+                continue
+            url, fields, reason, elapsed = item
+            idx += 1
+            if fields is None:
+                logger.debug("⚡ Fast path miss for %s: %s", url, reason)
+                pending.append(url)
+                continue
+            result = {"url": url, "name": fields["name"], "source": "http",
+                      "stages": completed, "missing_stages": [], "stage_errors": {}}
+            if fields["lat"] is not None:
+                result["lat"], result["lng"] = fields["lat"], fields["lng"]
+            if "overview" in stages:
+                result.update({key: fields[key] for key in ("rating", "review_count", "address", "website", "phone")})
+            if "hours" in stages:
+                result["business_hours"] = fields["business_hours"]
+            yield CrawlOutcome(url, result, "ok", None, time.monotonic() - elapsed, f"{idx}/{len(urls)}")
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        fetcher.report()
+
+    if pending:
+        logger.info("⚡ %d/%d URLs need Playwright", len(pending), len(urls))
+        async for item in fallback(playwright, pending, browser=browser, profile=profile):
+            yield item
+
+
+async def open_place_pages_fast(playwright: Playwright, urls: list[str], browser=None,
+                                profile: str | None = None, sinks: list | None = None) -> dict:
+    """Crawl bằng HTTP fast path (xem crawl_places_fast) với checkpoint; trả về số place theo outcome"""
+    from checkpoint_system import checkpoint
+
+    places = crawl_places_fast(playwright, urls, browser=browser, profile=profile)
+    return await deliver(places, sinks, checkpoint)
+
+
+def load_incomplete_places(limit: int | None = None) -> list[tuple[str, frozenset]]:
+    """Các place còn thiếu bước crawl (lỗi hoặc hết giờ ở lần trước): [(url, các bước thiếu)]"""
+    conn = connect_to_db()
+    if not conn:
+        return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT url, missing_stages FROM place
+            WHERE NOT complete
+            ORDER BY updated_at
+            LIMIT %s
+        """, (limit,))
+        return [(url, frozenset(missing)) for url, missing in cursor.fetchall() if missing]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+async def recrawl_incomplete_places(playwright: Playwright, browser=None, limit: int | None = None,
+                                    delay_seconds: float = 30, sinks: list | None = None) -> dict:
+    """Crawl bù chỉ các bước còn thiếu của những place chưa hoàn chỉnh
+
+    Không dùng checkpoint: danh sách lấy từ place.missing_stages, và insert_place
+    xoá bước khỏi missing_stages khi nó chạy xong.
+    """
+    places = load_incomplete_places(limit)
+    logger.info("🧩 %d incomplete places to re-crawl", len(places))
+    if not places:
+        return {}
+
+    url_stages = dict(places)
+    crawled = crawl_places(playwright, list(url_stages), browser=browser,
+                           delay_seconds=delay_seconds, url_stages=url_stages)
+    return await deliver(crawled, sinks)
+
 
-    await context.close()
-    await browser.close()
-    return results
+async def open_place_pages(playwright: Playwright, urls: list[str]) -> dict:
+    """Bản chạy local: browser có giao diện, nghỉ 1 phút giữa các URL, không checkpoint"""
+    return await deliver(crawl_places(playwright, urls, delay_seconds=60, headless=False))
 
 
 async def main() -> None:
+    setup_logging()
     # Load URLs from specific files (Quận 1 and Quận 2)
     print("🚀 Starting Google Maps Places Crawler")
     print("📍 Target: Quận 1 & Quận 2 only")
@@ -1263,17 +1899,17 @@ async def main() -> None:
         return
 
     async with async_playwright() as playwright:
-        data = await open_place_pages(playwright, urls)
+        counts = await open_place_pages(playwright, urls)
 
     # Data is already saved to database during processing
     print("\n" + "=" * 60)
     print("🎉 Processing completed!")
     print("=" * 60)
-    print(f"📊 Total places processed: {len(data)}")
+    print(f"📊 Total places processed: {sum(counts.values())}")
     
     # Count successful vs error records
-    successful = len([r for r in data if 'error' not in r])
-    errors = len([r for r in data if 'error' in r])
+    successful = counts.get("saved", 0) + counts.get("partial", 0)
+    errors = sum(counts.values()) - successful
     print(f"✅ Successfully processed: {successful}")
     print(f"❌ Errors: {errors}")
     
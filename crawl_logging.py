@@ -0,0 +1,161 @@
+"""
+Logging có cấu trúc cho crawler
+Record được đẩy vào queue (QueueHandler) và một thread riêng (QueueListener) ghi ra stdout,
+nên worker không bị chặn bởi pipeline log của Render. Mỗi record mang context của place
+đang xử lý (shard, worker, url, feature_id); log debug trong vòng lặp nóng đi qua RateLimitedLog.
+
+Cấu hình: LOG_LEVEL (mặc định INFO), LOG_FORMAT=text|json, LOG_STREAM=stdout|stderr.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+CONTEXT_FIELDS = ("shard", "worker", "url", "feature_id")
+
+_place_context: contextvars.ContextVar[dict] = contextvars.ContextVar("place_context", default={})
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextmanager
+def place_context(**fields):
+    """Gắn context (shard, worker, url, feature_id) cho mọi log trong block; riêng cho từng asyncio task"""
+    token = _place_context.set({**_place_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _place_context.reset(token)
+
+
+class PlaceContextFilter(logging.Filter):
+    """Chép context hiện tại vào record; chạy ở thread/task gọi log, trước khi vào queue"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _place_context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        summary = getattr(record, "summary", None)
+        if summary is not None:
+            return json.dumps(summary, ensure_ascii=False, default=str)
+        line = super().format(record)
+        tags = []
+        if getattr(record, "shard", None) is not None:
+            tags.append(f"s{record.shard}")
+        if getattr(record, "worker", None) is not None:
+            tags.append(f"w{record.worker}")
+        if getattr(record, "feature_id", None):
+            tags.append(record.feature_id)
+        return f"{line} [{' '.join(tags)}]" if tags else line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        summary = getattr(record, "summary", None)
+        if summary is not None:
+            return json.dumps(summary, ensure_ascii=False, default=str)
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str | None = None, fmt: str | None = None) -> None:
+    """Cài QueueHandler cho root logger (gọi nhiều lần không sao)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+
+    # stderr khi stdout dành cho dữ liệu (sink stdout)
+    target = sys.stderr if os.getenv("LOG_STREAM", "stdout").strip().lower() == "stderr" else sys.stdout
+    stream = logging.StreamHandler(target)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(PlaceContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # Log nội bộ của thư viện ở mức DEBUG quá ồn
+    for noisy in ("asyncio", "urllib3"):
+        logging.getLogger(noisy).setLevel(max(logging.INFO, root.level))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Ghi nốt các record còn trong queue"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RateLimitedLog:
+    """Log tối đa một lần mỗi `interval` giây, kèm số record đã bị bỏ qua
+
+    Dùng trong vòng lặp nóng (mỗi review, mỗi lần scroll): khi level bị tắt thì
+    chi phí chỉ là một lần isEnabledFor.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 5.0, level: int = logging.DEBUG):
+        self.logger = logger
+        self.interval = interval
+        self.level = level
+        self.suppressed = 0
+        self._last = float("-inf")
+
+    def __call__(self, msg: str, *args) -> None:
+        if not self.logger.isEnabledFor(self.level):
+            return
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            self.suppressed += 1
+            return
+        if self.suppressed:
+            msg, args = msg + " (+%d suppressed)", (*args, self.suppressed)
+        self._last = now
+        self.suppressed = 0
+        self.logger.log(self.level, msg, *args)
+
+
+_summary_logger = logging.getLogger("crawler.summary")
+
+
+def log_place_summary(**fields) -> None:
+    """Một dòng JSON cho mỗi place: outcome, thời gian, số review, các bước thiếu..."""
+    context = _place_context.get()
+    summary = {"event": "place", **{k: context.get(k) for k in CONTEXT_FIELDS}, **fields}
+    _summary_logger.info("place summary", extra={"summary": summary})
@@ -0,0 +1,231 @@
+"""
+Thời gian từng bước crawl và Playwright trace cho các place chậm / lỗi
+StageTimers giữ cửa sổ trượt thời gian của mỗi bước (navigate, overview, hours, about,
+reviews, place = tổng thời gian extract), rẻ nên luôn bật. TraceSampler chọn ngẫu nhiên
+một phần place để crawl trong context riêng có bật tracing (screenshot, DOM snapshot,
+network); trace chỉ được giữ khi place lỗi/thiếu bước hoặc có bước chậm hơn percentile
+của các place được trace trước đó, và được ghi vào thư mục vòng (TraceRing) giới hạn số
+file và dung lượng.
+
+Xem trace: playwright show-trace traces/<file>.zip
+Cấu hình: TRACE_SAMPLE_RATE (0..1, mặc định 0 = tắt), TRACE_PERCENTILE (mặc định 0.9),
+TRACE_DIR (mặc định traces), TRACE_MAX_FILES (mặc định 50), TRACE_MAX_MB (mặc định 500).
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import glob
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from parsing import parse_feature_id
+
+logger = logging.getLogger("crawler.tracing")
+
+
+class PlaceTrace:
+    """Thời gian các bước của place đang được trace và các bước vượt ngưỡng"""
+    __slots__ = ("url", "timings", "slow")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.timings: Dict[str, float] = {}
+        self.slow: List[tuple] = []  # (bước, giây, ngưỡng)
+
+
+_current: contextvars.ContextVar[Optional[PlaceTrace]] = contextvars.ContextVar("place_trace", default=None)
+
+
+class StageTimers:
+    """Cửa sổ `window` lần đo gần nhất của mỗi bước; ngưỡng chậm = percentile của cửa sổ
+
+    Place được trace chạy trong context mới (cache lạnh, có tracing) nên chậm hơn hẳn: thời gian
+    của chúng nằm trong cửa sổ riêng và chỉ được so với ngưỡng của các place được trace khác.
+    """
+
+    def __init__(self, window: int = 200, percentile: float = 0.9, min_samples: int = 20):
+        self.window = window
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._traced: Dict[str, Deque[float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "StageTimers":
+        return cls(percentile=float(os.getenv("TRACE_PERCENTILE", 0.9)))
+
+    def quantile(self, stage: str, q: float, traced: bool = False) -> Optional[float]:
+        samples = (self._traced if traced else self._samples).get(stage)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def threshold(self, stage: str, traced: bool = False) -> Optional[float]:
+        """Ngưỡng chậm của bước; None khi chưa đủ `min_samples` lần đo"""
+        if len((self._traced if traced else self._samples).get(stage, ())) < self.min_samples:
+            return None
+        return self.quantile(stage, self.percentile, traced)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Ghi một lần đo; place đang được trace được so với ngưỡng (trước khi thêm vào cửa sổ)
+        của các place được trace, không phải của cửa sổ chung"""
+        trace = _current.get()
+        windows = self._samples
+        if trace is not None:
+            windows = self._traced
+            threshold = self.threshold(stage, traced=True)
+            trace.timings[stage] = round(seconds, 2)
+            if threshold is not None and seconds > threshold:
+                trace.slow.append((stage, round(seconds, 1), round(threshold, 1)))
+        samples = windows.get(stage)
+        if samples is None:
+            samples = windows[stage] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    @contextlib.contextmanager
+    def timed(self, stage: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - start)
+
+    def report(self) -> None:
+        if not self._samples:
+            return
+        parts = [f"{stage} p50 {self.quantile(stage, 0.5):.1f}s p{round(self.percentile * 100)} "
+                 f"{self.quantile(stage, self.percentile):.1f}s (n={len(samples)})"
+                 for stage, samples in self._samples.items()]
+        logger.info("⏱️  Stage timings: %s", "; ".join(parts))
+
+
+class TraceRing:
+    """Thư mục trace có giới hạn: trace mới nhất luôn được giữ, xoá trace cũ nhất khi vượt
+    `max_files` hoặc `max_bytes` (dùng chung được giữa các process của supervisor)"""
+
+    def __init__(self, directory: str = "traces", max_files: int = 50, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def temp_path(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix=".zip.part")
+        os.close(fd)
+        return path
+
+    def add(self, temp_path: str, name: str) -> str:
+        path = os.path.join(self.directory, name)
+        os.replace(temp_path, path)
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.zip")):
+            with contextlib.suppress(FileNotFoundError):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while len(entries) > 1 and (len(entries) > self.max_files or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            total -= size
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+_UNSAFE_NAME_RE = re.compile(r"[^0-9A-Za-z_-]+")
+
+
+class TraceSampler:
+    def __init__(self, timers: StageTimers, rate: float = 0.0, ring: Optional[TraceRing] = None,
+                 stop_timeout: float = 30):
+        self.timers = timers
+        self.rate = rate
+        self.ring = ring or TraceRing()
+        self.stop_timeout = stop_timeout
+        self.counts: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, timers: StageTimers) -> "TraceSampler":
+        ring = TraceRing(
+            directory=os.getenv("TRACE_DIR", "traces"),
+            max_files=int(os.getenv("TRACE_MAX_FILES", 50)),
+            max_bytes=int(float(os.getenv("TRACE_MAX_MB", 500)) * 1024 * 1024),
+        )
+        return cls(timers, rate=float(os.getenv("TRACE_SAMPLE_RATE", 0)), ring=ring)
+
+    def sample(self) -> bool:
+        return self.rate > 0 and random.random() < self.rate
+
+    def _count(self, key: str) -> None:
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    async def run(self, browser, new_context: Callable, url: str, crawl: Callable[..., Awaitable]):
+        """Chạy `crawl(page)` trên page của một context mới có bật tracing; trả về kết quả của crawl
+
+        Trace được lưu khi crawl raise (kể cả bị watchdog huỷ), trả về None / place thiếu bước,
+        hoặc có bước chậm hơn ngưỡng; ngược lại bị bỏ.
+        """
+        self._count("sampled")
+        context = await new_context(browser)
+        trace = PlaceTrace(url)
+        token = _current.set(trace)
+        failure = None
+        try:
+            await context.tracing.start(screenshots=True, snapshots=True)
+            page = await context.new_page()
+            result = await crawl(page)
+            if result is None:
+                failure = "no_name"
+            elif result.get("missing_stages"):
+                failure = "partial"
+            return result
+        except BaseException as e:
+            failure = "cancelled" if isinstance(e, asyncio.CancelledError) else type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            await self._finish(context, trace, failure)
+
+    async def _finish(self, context, trace: PlaceTrace, failure: Optional[str]) -> None:
+        try:
+            if failure is None and not trace.slow:
+                self._count("discarded")
+                await asyncio.wait_for(context.tracing.stop(), self.stop_timeout)
+                return
+            reason = failure or f"slow-{trace.slow[0][0]}"
+            temp_path = self.ring.temp_path()
+            try:
+                await asyncio.wait_for(context.tracing.stop(path=temp_path), self.stop_timeout)
+                place = _UNSAFE_NAME_RE.sub("_", parse_feature_id(trace.url) or trace.url)[-60:]
+                # pid: các process của supervisor dùng chung TRACE_DIR
+                name = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{os.getpid()}_{place}_{reason}.zip"
+                path = self.ring.add(temp_path, name)
+            finally:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(temp_path)
+            self._count("kept")
+            slow = ", ".join(f"{stage} {seconds}s > {threshold}s" for stage, seconds, threshold in trace.slow)
+            logger.info("🧵 Kept trace %s (%s%s) timings %s",
+                        path, reason, f": {slow}" if slow else "", trace.timings)
+        except Exception as e:
+            self._count("lost")
+            logger.warning("Could not save trace for %s: %s", trace.url, e)
+        finally:
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(context.close(), 10)
+
+    def report(self) -> None:
+        if self.counts:
+            logger.info("🧵 Traces: %s (dir %s)", self.counts, self.ring.directory)
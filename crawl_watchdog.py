@@ -0,0 +1,115 @@
+"""
+Watchdog cho page bị treo và browser đã chết
+Mỗi URL chạy trong `Watchdog.guard`: code crawl gọi `beat()` ở các bước (điều hướng, từng stage,
+mỗi lần scroll, mỗi review). Nếu quá `hang_timeout` giây không có heartbeat, hoặc browser mất
+kết nối, task bị huỷ và một WatchdogIncident được raise để crawler khôi phục page/browser
+và đưa URL vào hàng đợi lại.
+
+Lúc chờ lượt điều hướng (phase "rate_limit") không tính là treo.
+Cấu hình: WATCHDOG_HANG_TIMEOUT (giây, mặc định 120), WATCHDOG_MAX_REQUEUES (mặc định 2).
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from typing import Callable, Coroutine, Dict, Optional
+
+logger = logging.getLogger("crawler.watchdog")
+
+
+class WatchdogIncident(Exception):
+    kind = "incident"
+
+
+class PageHungError(WatchdogIncident):
+    kind = "hung_page"
+
+
+class BrowserCrashedError(WatchdogIncident):
+    kind = "browser_crash"
+
+
+# Phase đang chờ có chủ đích, không tính thời gian im lặng
+IDLE_PHASES = frozenset({"rate_limit"})
+
+
+class Heartbeat:
+    __slots__ = ("last", "phase")
+
+    def __init__(self):
+        self.last = time.monotonic()
+        self.phase = "start"
+
+
+_current: contextvars.ContextVar[Optional[Heartbeat]] = contextvars.ContextVar("heartbeat", default=None)
+
+
+def beat(phase: Optional[str] = None) -> None:
+    """Báo task crawl hiện tại vẫn đang tiến triển (không làm gì ngoài guard)"""
+    heartbeat = _current.get()
+    if heartbeat is not None:
+        heartbeat.last = time.monotonic()
+        if phase:
+            heartbeat.phase = phase
+
+
+def tracked_task(coro: Coroutine, heartbeat: Heartbeat) -> asyncio.Task:
+    """Tạo task mà beat() bên trong cập nhật `heartbeat` (ví dụ điều hướng trước khi vào guard)"""
+    context = contextvars.copy_context()
+    context.run(_current.set, heartbeat)
+    return asyncio.get_running_loop().create_task(coro, context=context)
+
+
+class Watchdog:
+    def __init__(self, hang_timeout: float = 120, check_interval: float = 2, max_requeues: int = 2):
+        self.hang_timeout = hang_timeout
+        self.check_interval = check_interval
+        self.max_requeues = max_requeues
+        self.incidents: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "Watchdog":
+        return cls(
+            hang_timeout=float(os.getenv("WATCHDOG_HANG_TIMEOUT", 120)),
+            max_requeues=int(os.getenv("WATCHDOG_MAX_REQUEUES", 2)),
+        )
+
+    def count(self, kind: str) -> None:
+        self.incidents[kind] = self.incidents.get(kind, 0) + 1
+
+    async def guard(self, coro: Coroutine, is_connected: Callable[[], bool],
+                    heartbeat: Optional[Heartbeat] = None):
+        """Chạy `coro` như một task riêng, huỷ khi hết heartbeat hoặc browser mất kết nối
+
+        Truyền `heartbeat` khi một phần công việc đã chạy trước trong tracked_task.
+        """
+        heartbeat = heartbeat or Heartbeat()
+        heartbeat.last = time.monotonic()
+        task = tracked_task(coro, heartbeat)
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.check_interval)
+                if done:
+                    return task.result()
+                if not is_connected():
+                    self.count(BrowserCrashedError.kind)
+                    raise BrowserCrashedError(f"Browser disconnected during '{heartbeat.phase}'")
+                if heartbeat.phase in IDLE_PHASES:
+                    heartbeat.last = time.monotonic()
+                    continue
+                idle = time.monotonic() - heartbeat.last
+                if idle > self.hang_timeout:
+                    self.count(PageHungError.kind)
+                    raise PageHungError(f"No progress for {idle:.0f}s during '{heartbeat.phase}'")
+        finally:
+            if not task.done():
+                task.cancel()
+                # Call CDP bị treo có thể không trả lời cả khi bị huỷ; không chờ mãi
+                await asyncio.wait({task}, timeout=5)
+
+    def report(self) -> None:
+        if self.incidents:
+            logger.warning("🐕 Watchdog incidents: %s", self.incidents)
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Export bảng place và review ra Parquet, partition theo quận và ngày crawl
+Đọc bằng server-side named cursor theo từng chunk nên bộ nhớ không phụ thuộc kích thước bảng.
+
+Cách dùng:
+    python export_parquet.py --out exports
+    python export_parquet.py --out exports --incremental   # chỉ các dòng mới / được cập nhật
+Cần cài thêm: pip install pyarrow
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from main import get_db_config
+from parsing import parse_float
+
+STATE_FILE = "_export_state.json"
+# File part đang ghi; tiền tố "_" nên pyarrow / Spark bỏ qua khi đọc thư mục
+TEMP_PREFIX = "_tmp-"
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_ROW_GROUP_SIZE = 20000
+DEFAULT_OVERLAP_MINUTES = 10
+
+ARRAY_COLUMNS = [
+    "accessibility", "service_options", "highlights", "popular_for", "offerings",
+    "dining_options", "amenities", "atmosphere", "crowd", "planning", "payments",
+    "children", "parking",
+]
+
+# Tên ngày trong business_hours -> cột hours_<day>
+WEEKDAYS = {
+    "Thứ Hai": "monday",
+    "Thứ Ba": "tuesday",
+    "Thứ Tư": "wednesday",
+    "Thứ Năm": "thursday",
+    "Thứ Sáu": "friday",
+    "Thứ Bảy": "saturday",
+    "Chủ Nhật": "sunday",
+}
+
+# Nhãn trong review_details -> (cột, kiểu số hay chuỗi)
+REVIEW_DETAIL_COLUMNS = {
+    "Đồ ăn": ("food_score", True),
+    "Dịch vụ": ("service_score", True),
+    "Bầu không khí": ("atmosphere_score", True),
+    "Độ ồn": ("noise_level", False),
+    "Quy mô nhóm": ("group_size", False),
+    "Những món ăn đề xuất": ("recommended_dishes", False),
+    "Loại hình bữa ăn": ("meal_type", False),
+    "Giá mỗi người": ("price_per_person", False),
+}
+
+_DISTRICT_RE = re.compile(r"(Quận\s*\d+|Quận\s+[^\s,\d][^,]*|Thủ Đức)", re.IGNORECASE)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("❌ pyarrow is required for Parquet export: pip install pyarrow")
+        sys.exit(1)
+    return pa, pq
+
+
+def load_url_districts(pattern: str = "urls/urls_*_Quận_*.csv") -> Dict[str, str]:
+    """Map url -> quận dựa trên tên file CSV chứa url đó"""
+    districts: Dict[str, str] = {}
+    for csv_file in glob.glob(pattern):
+        district = "Quận_" + os.path.splitext(csv_file)[0].split("_Quận_", 1)[1]
+        with open(csv_file, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("url"):
+                    districts[row["url"]] = district
+    return districts
+
+
+def _district(url_districts: Dict[str, str], url: Optional[str], address: Optional[str]) -> str:
+    if url and url in url_districts:
+        return url_districts[url]
+    match = _DISTRICT_RE.search(address or "")
+    if match:
+        return re.sub(r"\s+", "_", match.group(1).strip())
+    return "unknown"
+
+
+def _schemas(pa):
+    place_fields = [
+        ("id", pa.int32()),
+        ("url", pa.string()),
+        ("name", pa.string()),
+        ("rating", pa.float32()),
+        ("review_count", pa.int32()),
+        ("address", pa.string()),
+        ("website", pa.string()),
+        ("phone", pa.string()),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+    ]
+    place_fields += [(f"hours_{day}", pa.string()) for day in WEEKDAYS.values()]
+    place_fields += [(col, pa.list_(pa.string())) for col in ARRAY_COLUMNS]
+    place_fields += [
+        ("about_extra", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ]
+
+    review_fields = [
+        ("id", pa.int32()),
+        ("place_id", pa.int32()),
+        ("review_id", pa.string()),
+        ("reviewer_name", pa.string()),
+        ("reviewer_profile_url", pa.string()),
+        ("rating", pa.float32()),
+        ("time", pa.string()),
+        ("time_datetime", pa.timestamp("us")),
+        ("text", pa.string()),
+        ("owner_response", pa.string()),
+    ]
+    for column, numeric in REVIEW_DETAIL_COLUMNS.values():
+        review_fields.append((column, pa.float32() if numeric else pa.string()))
+    review_fields += [
+        ("review_details_extra", pa.string()),
+        ("photos", pa.list_(pa.string())),
+        ("created_at", pa.timestamp("us")),
+    ]
+    return pa.schema(place_fields), pa.schema(review_fields)
+
+
+def _as_dict(value) -> dict:
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value:
+        return json.loads(value)
+    return {}
+
+
+def flatten_place(row: dict) -> dict:
+    hours = _as_dict(row.get("business_hours"))
+    flat = {key: row.get(key) for key in ("id", "url", "name", "review_count", "address",
+                                          "website", "phone", "lat", "lng", "created_at", "updated_at")}
+    flat["rating"] = float(row["rating"]) if row.get("rating") is not None else None
+    for day, column in WEEKDAYS.items():
+        flat[f"hours_{column}"] = hours.get(day)
+    for column in ARRAY_COLUMNS:
+        flat[column] = row.get(column) or []
+    extra = row.get("about_extra")
+    flat["about_extra"] = json.dumps(extra, ensure_ascii=False) if extra else None
+    return flat
+
+
+def flatten_review(row: dict) -> dict:
+    details = dict(_as_dict(row.get("review_details")))
+    flat = {key: row.get(key) for key in ("id", "place_id", "review_id", "reviewer_name",
+                                          "reviewer_profile_url", "time", "time_datetime",
+                                          "text", "owner_response", "created_at")}
+    flat["rating"] = float(row["rating"]) if row.get("rating") is not None else None
+    for label, (column, numeric) in REVIEW_DETAIL_COLUMNS.items():
+        value = details.pop(label, None)
+        flat[column] = parse_float(value) if numeric else value
+    flat["review_details_extra"] = json.dumps(details, ensure_ascii=False) if details else None
+    flat["photos"] = row.get("photos") or []
+    return flat
+
+
+def _iter_chunks(conn, name: str, query: str, params: tuple, chunk_size: int) -> Iterator[List[dict]]:
+    """Đọc kết quả bằng server-side named cursor, mỗi lần một chunk"""
+    cursor = conn.cursor(name=name, cursor_factory=RealDictCursor)
+    cursor.itersize = chunk_size
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+class PartitionedWriter:
+    """Ghi dòng vào các partition (district, crawl_date), mỗi partition một ParquetWriter
+
+    Dòng được gom theo partition và chỉ ghi khi đủ `row_group_size` dòng (hoặc khi tổng số dòng
+    đang giữ vượt `max_buffered_rows`, partition lớn nhất được ghi trước) để row group không
+    quá nhỏ. Dòng đến theo thứ tự thời gian (xem PLACE_QUERY) nên khi crawl_date tăng, writer của các ngày trước
+    được đóng; dòng đến muộn của ngày đã đóng được ghi vào một file part mới.
+    """
+
+    def __init__(self, root: str, table: str, schema, run_id: str,
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE, max_buffered_rows: Optional[int] = None):
+        self.pa, self.pq = _pyarrow()
+        self.root = os.path.join(root, table)
+        self.schema = schema
+        self.run_id = run_id
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows or 4 * row_group_size
+        self.buffers: Dict[tuple, List[dict]] = {}
+        self.buffered = 0
+        self.writers: Dict[tuple, object] = {}
+        self.parts: Dict[tuple, int] = {}  # số file part đã mở của partition
+        self.files: List[tuple] = []  # (file tạm, file đích)
+        self.current_date: Optional[str] = None
+        self.rows_written = 0
+
+    def add(self, district: str, crawl_date: str, row: dict):
+        if crawl_date != "unknown" and (self.current_date is None or crawl_date > self.current_date):
+            self.current_date = crawl_date
+            for key in [key for key in set(self.writers) | set(self.buffers)
+                        if key[1] != "unknown" and key[1] < crawl_date]:
+                self._close(key)
+        key = (district, crawl_date)
+        buffer = self.buffers.setdefault(key, [])
+        buffer.append(row)
+        self.buffered += 1
+        if len(buffer) >= self.row_group_size:
+            self._flush(key)
+        elif self.buffered > self.max_buffered_rows:
+            self._flush(max(self.buffers, key=lambda k: len(self.buffers[k])))
+
+    def _path(self, key: tuple) -> str:
+        district, crawl_date = key
+        directory = os.path.join(self.root, f"district={district}", f"crawl_date={crawl_date}")
+        os.makedirs(directory, exist_ok=True)
+        part = self.parts.get(key, 0)
+        self.parts[key] = part + 1
+        name = f"part-{self.run_id}{f'-{part}' if part else ''}.parquet"
+        self.files.append((os.path.join(directory, TEMP_PREFIX + name), os.path.join(directory, name)))
+        return self.files[-1][0]
+
+    def _flush(self, key: tuple):
+        rows = self.buffers.pop(key, None)
+        if not rows:
+            return
+        writer = self.writers.get(key)
+        if writer is None:
+            writer = self.pq.ParquetWriter(self._path(key), self.schema, compression="zstd")
+            self.writers[key] = writer
+        writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+        self.buffered -= len(rows)
+        self.rows_written += len(rows)
+
+    def _close(self, key: tuple):
+        self._flush(key)
+        writer = self.writers.pop(key, None)
+        if writer is not None:
+            writer.close()
+
+    def close(self):
+        for key in list(set(self.writers) | set(self.buffers)):
+            self._close(key)
+
+
+def _load_state(out_dir: str) -> dict:
+    path = os.path.join(out_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _save_state(out_dir: str, state: dict):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _finish_pending(out_dir: str, state: dict):
+    """Đổi tên các file tạm đã ghi trong state (kể cả của lần chạy bị dừng sau khi lưu state),
+    rồi xoá file tạm còn lại của các lần chạy hỏng"""
+    pending = state.pop("pending", None)
+    if pending:
+        for temp_path, path in pending:
+            temp_path, path = os.path.join(out_dir, temp_path), os.path.join(out_dir, path)
+            if os.path.exists(temp_path):
+                os.replace(temp_path, path)
+        _save_state(out_dir, state)
+    for temp_path in glob.glob(os.path.join(out_dir, "**", TEMP_PREFIX + "*"), recursive=True):
+        os.remove(temp_path)
+
+
+def _table_state(value) -> dict:
+    # State cũ chỉ lưu created_at lớn nhất
+    if isinstance(value, str):
+        return {"watermark": value, "seen": {}}
+    return value or {"watermark": None, "seen": {}}
+
+
+def _export_table(conn, out_dir: str, table: str, query: str, column: str, state: dict,
+                  overlap: timedelta, flatten, schema, url_districts: Dict[str, str], chunk_size: int,
+                  run_id: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> Tuple[dict, List[list]]:
+    """Export các dòng có `column` >= watermark - overlap, bỏ qua phiên bản (id, `column`) đã export;
+    trả về (state mới của bảng, các cặp [file tạm, file đích])"""
+    writer = PartitionedWriter(out_dir, table, schema, run_id, row_group_size)
+    watermark = datetime.fromisoformat(state["watermark"]) if state["watermark"] else None
+    seen: Dict[str, str] = dict(state["seen"])
+    since = watermark - overlap if watermark else datetime.min
+    skipped = 0
+    started = time.time()
+    try:
+        for rows in _iter_chunks(conn, f"export_{table}", query, (since,), chunk_size):
+            for row in rows:
+                key, stamp = str(row["id"]), row.get(column)
+                if stamp is not None and seen.get(key) == stamp.isoformat():
+                    skipped += 1
+                    continue
+                district = _district(url_districts, row.get("place_url"), row.get("place_address"))
+                crawl_date = stamp.date().isoformat() if stamp else "unknown"
+                writer.add(district, crawl_date, flatten(row))
+                if stamp is not None:
+                    seen[key] = stamp.isoformat()
+                    if watermark is None or stamp > watermark:
+                        watermark = stamp
+            print(f"  - {table}: {writer.rows_written + writer.buffered} rows")
+    finally:
+        writer.close()
+    print(f"✅ Exported {writer.rows_written} {table} rows in {time.time() - started:.1f}s"
+          + (f" ({skipped} already exported)" if skipped else ""))
+    # Chỉ cần nhớ các dòng còn nằm trong cửa sổ overlap của lần chạy sau
+    if watermark is not None:
+        seen = {key: stamp for key, stamp in seen.items()
+                if datetime.fromisoformat(stamp) >= watermark - overlap}
+    new_state = {"watermark": watermark.isoformat() if watermark else None, "seen": seen}
+    files = [[os.path.relpath(temp_path, out_dir), os.path.relpath(path, out_dir)]
+             for temp_path, path in writer.files]
+    return new_state, files
+
+
+# Dòng được đọc theo (cột thời gian, id); cột thời gian do transaction ghi dòng đặt lúc bắt đầu,
+# nên dòng commit muộn có thể nhỏ hơn watermark -> đọc lại từ watermark - overlap
+PLACE_QUERY = """
+    SELECT p.*, p.url AS place_url, p.address AS place_address
+    FROM place p
+    WHERE p.updated_at >= %s
+    ORDER BY p.updated_at, p.id
+"""
+
+REVIEW_QUERY = """
+    SELECT r.*, p.url AS place_url, p.address AS place_address
+    FROM review r
+    JOIN place p ON p.id = r.place_id
+    WHERE r.created_at >= %s
+    ORDER BY r.created_at, r.id
+"""
+
+
+def export(out_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE, incremental: bool = False,
+           row_group_size: int = DEFAULT_ROW_GROUP_SIZE, overlap_minutes: float = DEFAULT_OVERLAP_MINUTES):
+    """Ghi file part dưới tên tạm; state (watermark + danh sách file) được lưu trước, rồi mới đổi
+    tên file. Lần chạy bị dừng trước khi lưu state không để lại file part nào được đọc."""
+    pa, _ = _pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    place_schema, review_schema = _schemas(pa)
+    state = _load_state(out_dir)
+    _finish_pending(out_dir, state)
+    if not incremental:
+        state = {}
+    overlap = timedelta(minutes=overlap_minutes)
+    url_districts = load_url_districts()
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+    # Snapshot nhất quán, chỉ đọc, không giữ lock ghi của crawler
+    conn.set_session(readonly=True, isolation_level="REPEATABLE READ")
+
+    new_state: dict = {"pending": []}
+    try:
+        for table, query, column, flatten, schema in (
+            ("place", PLACE_QUERY, "updated_at", flatten_place, place_schema),
+            ("review", REVIEW_QUERY, "created_at", flatten_review, review_schema),
+        ):
+            table_state = _table_state(state.get(table))
+            watermark = table_state["watermark"]
+            print(f"📤 Exporting {table}" + (f" ({column} >= {watermark} - {overlap})" if watermark else ""))
+            new_state[table], files = _export_table(conn, out_dir, table, query, column, table_state, overlap,
+                                                    flatten, schema, url_districts, chunk_size, run_id,
+                                                    row_group_size)
+            new_state["pending"] += files
+        conn.commit()
+    finally:
+        conn.close()
+
+    _save_state(out_dir, new_state)
+    _finish_pending(out_dir, new_state)
+    print(f"💾 Export state saved to {os.path.join(out_dir, STATE_FILE)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export place/review tables to partitioned Parquet")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per round trip")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                        help="Rows buffered per partition before a row group is written")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only export rows added or updated since the last run")
+    parser.add_argument("--overlap-minutes", type=float, default=DEFAULT_OVERLAP_MINUTES,
+                        help="Re-read this window before the watermark to catch late commits")
+    args = parser.parse_args()
+    export(args.out, chunk_size=args.chunk_size, incremental=args.incremental,
+           row_group_size=args.row_group_size, overlap_minutes=args.overlap_minutes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Truy vấn không gian trên toạ độ của place (lat/lng parse từ URL Maps)
+place.geohash là cột generated (geohash_encode trong migration 0008) với B-tree COLLATE "C",
+nên mọi ô geohash có cùng prefix nằm liền nhau trong index. Một bounding box được phủ bằng
+vài ô, mỗi ô là một range scan [prefix, prefix || '~'), rồi lọc chính xác theo lat/lng.
+kNN mở rộng bán kính tìm kiếm tới khi đủ k place. Không xử lý bbox vượt kinh tuyến 180.
+
+Cách dùng:
+    python geo.py 10.7735 106.7053 --radius 500
+    python geo.py 10.7735 106.7053 --nearest 10
+"""
+
+import argparse
+import heapq
+import math
+from typing import Callable, Dict, List, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+# Thứ tự alphabet geohash tăng dần theo ASCII, nên so sánh chuỗi "C" khớp thứ tự ô
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6371008.8
+
+BBox = Tuple[float, float, float, float]  # min_lat, min_lng, max_lat, max_lng
+
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Giống hệt hàm SQL geohash_encode (cùng phép chia đôi trên float64)"""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars = []
+    ch = bits = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch * 2 + 1, mid
+            else:
+                ch, lng_hi = ch * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch * 2 + 1, mid
+            else:
+                ch, lat_hi = ch * 2, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[ch])
+            ch = bits = 0
+    return "".join(chars)
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """(chiều cao theo lat, chiều rộng theo lng) của một ô geohash, tính bằng độ"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _successor(cell: str) -> str:
+    """Ô kế tiếp cùng độ dài theo thứ tự chuỗi ("" nếu là ô cuối)"""
+    chars = list(cell)
+    for i in range(len(chars) - 1, -1, -1):
+        index = GEOHASH_ALPHABET.index(chars[i])
+        if index + 1 < len(GEOHASH_ALPHABET):
+            chars[i] = GEOHASH_ALPHABET[index + 1]
+            return "".join(chars)
+        chars[i] = GEOHASH_ALPHABET[0]
+    return ""
+
+
+def cover_cells(bbox: BBox, max_cells: int = 24) -> List[str]:
+    """Các ô geohash (độ dài lớn nhất có thể, không quá `max_cells` ô) phủ kín bbox"""
+    min_lat, min_lng, max_lat, max_lng = bbox
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = range(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1)
+        cols = range(math.floor((min_lng + 180) / width), math.floor((max_lng + 180) / width) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            break
+    cells = {
+        # Toạ độ tâm ô để tránh sai số ở biên
+        geohash_encode(min(-90 + (row + 0.5) * height, 90.0), min(-180 + (col + 0.5) * width, 180.0), precision)
+        for row in rows for col in cols
+    }
+    return sorted(cells)
+
+
+def cell_ranges(bbox: BBox, max_cells: int = 24) -> List[Tuple[str, str]]:
+    """Các range [lo, hi) trên cột geohash phủ bbox; ô liền nhau được gộp thành một range"""
+    ranges: List[List[str]] = []
+    for cell in cover_cells(bbox, max_cells):
+        if ranges and ranges[-1][2] == cell:
+            ranges[-1][1] = cell + "~"
+            ranges[-1][2] = _successor(cell)
+        else:
+            ranges.append([cell, cell + "~", _successor(cell)])
+    return [(lo, hi) for lo, hi, _ in ranges]
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat: float, lng: float, radius_m: float) -> BBox:
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlng = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6)))
+    return (max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0))
+
+
+BBOX_QUERY = """
+    SELECT p.id, p.name, p.address, p.rating, p.review_count, p.url, p.lat, p.lng
+    FROM unnest(%(lo)s::text[], %(hi)s::text[]) AS cell(lo, hi)
+    JOIN place p ON p.geohash >= cell.lo COLLATE "C" AND p.geohash < cell.hi COLLATE "C"
+    WHERE p.lat BETWEEN %(min_lat)s AND %(max_lat)s
+      AND p.lng BETWEEN %(min_lng)s AND %(max_lng)s
+"""
+
+
+def places_in_bbox(conn, bbox: BBox) -> List[Dict]:
+    """Mọi place có toạ độ nằm trong bbox (min_lat, min_lng, max_lat, max_lng)"""
+    ranges = cell_ranges(bbox)
+    min_lat, min_lng, max_lat, max_lng = bbox
+    params = {"lo": [lo for lo, _ in ranges], "hi": [hi for _, hi in ranges],
+              "min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng}
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(BBOX_QUERY, params)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def within_radius(fetch_bbox: Callable[[BBox], List[Dict]], lat: float, lng: float,
+                  radius_m: float) -> List[Dict]:
+    """Place trong bán kính `radius_m`, gần nhất trước (mỗi row thêm distance_m)"""
+    rows = []
+    for row in fetch_bbox(bbox_around(lat, lng, radius_m)):
+        distance = haversine_m(lat, lng, row["lat"], row["lng"])
+        if distance <= radius_m:
+            rows.append({**row, "distance_m": round(distance, 1)})
+    rows.sort(key=lambda row: row["distance_m"])
+    return rows
+
+
+def nearest(fetch_bbox: Callable[[BBox], List[Dict]], lat: float, lng: float, k: int = 10,
+            start_radius_m: float = 500, max_radius_m: float = 50_000) -> List[Dict]:
+    """k place gần nhất: tìm trong bán kính tăng gấp đôi tới khi có đủ k place trong bán kính
+
+    Mọi place trong bán kính r đều nằm trong bbox của r, nên k place gần nhất trong bán kính
+    là k place gần nhất thật sự.
+    """
+    radius = start_radius_m
+    while True:
+        rows = within_radius(fetch_bbox, lat, lng, radius)
+        if len(rows) >= k or radius >= max_radius_m:
+            return heapq.nsmallest(k, rows, key=lambda row: row["distance_m"])
+        radius = min(radius * 2, max_radius_m)
+
+
+def places_within(conn, lat: float, lng: float, radius_m: float) -> List[Dict]:
+    return within_radius(lambda bbox: places_in_bbox(conn, bbox), lat, lng, radius_m)
+
+
+def nearest_places(conn, lat: float, lng: float, k: int = 10, max_radius_m: float = 50_000) -> List[Dict]:
+    return nearest(lambda bbox: places_in_bbox(conn, bbox), lat, lng, k, max_radius_m=max_radius_m)
+
+
+def main():
+    from main import get_db_config
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Find places near a point")
+    parser.add_argument("lat", type=float)
+    parser.add_argument("lng", type=float)
+    parser.add_argument("--radius", type=float, default=500, help="Radius in metres")
+    parser.add_argument("--nearest", type=int, help="Return the k nearest places instead")
+    args = parser.parse_args()
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+    try:
+        if args.nearest:
+            results = nearest_places(conn, args.lat, args.lng, args.nearest)
+        else:
+            results = places_within(conn, args.lat, args.lng, args.radius)
+    finally:
+        conn.close()
+
+    print(f"📍 {len(results)} places near ({args.lat}, {args.lng})")
+    for row in results:
+        print(f"{row['distance_m']:8.0f} m  {row['name']} ⭐{row['rating']} - {row['address']}")
+
+
+if __name__ == "__main__":
+    main()
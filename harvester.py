@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Harvester tạo file URL cho crawler từ danh sách kết quả tìm kiếm của Google Maps
+Mỗi (query, quận) mở một context riêng, scroll feed kết quả tới hết và ghi URL place vào
+urls/urls_<query>_<quận>.csv (cùng định dạng các file có sẵn) ngay khi thấy, flush từng dòng,
+nên crawler chạy song song (CRAWL_URL_FILES='urls/*.csv') thấy URL mới ở lần chạy kế tiếp.
+URL được dedupe theo feature id trên mọi file CSV trong thư mục output. Quận đã harvest xong
+được ghi vào urls/.harvest_state.json và bị bỏ qua khi chạy lại (trừ khi --refresh); quận
+bị dừng giữa chừng được scroll lại từ đầu, URL đã có được bỏ qua.
+
+Cách dùng:
+    python harvester.py                                   # mọi quận TP.HCM, query mặc định
+    python harvester.py --district "Quận 1" --district "Quận 3" --concurrency 2
+    python harvester.py --query "quán cà phê" --refresh
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import logging
+import os
+import random
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote
+
+from concurrency import NavigationRateLimiter
+from crawl_logging import place_context, setup_logging
+from parsing import parse_feature_id
+
+logger = logging.getLogger("crawler.harvester")
+
+# Query đã dùng để tạo các file urls/ có sẵn (giữ nguyên để tên file khớp)
+DEFAULT_QUERY = "nhà hang quán an"
+CITY = "Hồ Chí Minh"
+HCMC_DISTRICTS = [
+    "Quận 1", "Quận 2", "Quận 3", "Quận 4", "Quận 5", "Quận 6", "Quận 7", "Quận 8", "Quận 9",
+    "Quận 10", "Quận 11", "Quận 12", "Quận Bình Thạnh", "Quận Bình Tân", "Quận Gò Vấp",
+    "Quận Phú Nhuận", "Quận Thủ Đức", "Quận Tân Bình", "Quận Tân Phú",
+]
+
+FEED_SELECTOR = 'div[role="feed"]'
+RESULT_LINK_SELECTOR = 'a.hfpxzc'
+END_OF_LIST_SELECTOR = 'span.HlvSq'
+STATE_FILE = ".harvest_state.json"
+
+
+def csv_path(out_dir: str, query: str, district: str) -> str:
+    return os.path.join(out_dir, f"urls_{query.replace(' ', '_')}_{district.replace(' ', '_')}.csv")
+
+
+def search_url(query: str, district: str) -> str:
+    return f"https://www.google.com/maps/search/{quote(f'{query} {district}, {CITY}')}?hl=vi"
+
+
+def load_seen_feature_ids(out_dir: str) -> Set[str]:
+    """Feature id của mọi URL đã có trong các file CSV của `out_dir`"""
+    seen = set()
+    for path in glob.glob(os.path.join(out_dir, "*.csv")):
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                feature_id = parse_feature_id(row.get("url"))
+                if feature_id:
+                    seen.add(feature_id)
+    return seen
+
+
+class HarvestState:
+    """(query, quận) đã harvest xong, ghi file tạm rồi rename sau mỗi lần cập nhật"""
+
+    def __init__(self, out_dir: str):
+        self.path = os.path.join(out_dir, STATE_FILE)
+        self.data: Dict[str, dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    @staticmethod
+    def key(query: str, district: str) -> str:
+        return f"{query}|{district}"
+
+    def is_done(self, query: str, district: str) -> bool:
+        return self.data.get(self.key(query, district), {}).get("done", False)
+
+    def mark_done(self, query: str, district: str, new_urls: int, seen_results: int) -> None:
+        self.data[self.key(query, district)] = {
+            "done": True, "new_urls": new_urls, "results": seen_results,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class UrlCsvWriter:
+    """Append URL vào file CSV (header "url" khi file mới), flush từng dòng"""
+
+    def __init__(self, path: str):
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        missing_newline = False
+        if not is_new:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                missing_newline = f.read(1) not in (b"\n", b"\r")
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        if is_new:
+            self._writer.writerow(["url"])
+        elif missing_newline:
+            # Các file có sẵn không có newline ở dòng cuối
+            self._file.write("\r\n")
+        self._file.flush()
+
+    def write(self, url: str) -> None:
+        self._writer.writerow([url])
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def harvest_district(browser, new_context, query: str, district: str, out_dir: str,
+                           seen: Set[str], rate_limiter: NavigationRateLimiter,
+                           max_results: Optional[int] = None, idle_rounds: int = 8) -> tuple:
+    """Scroll feed kết quả của một quận; trả về (số URL mới, số kết quả đã thấy)"""
+    context = await new_context(browser)
+    page = await context.new_page()
+    writer = UrlCsvWriter(csv_path(out_dir, query, district))
+    new_urls = 0
+    results: Set[str] = set()
+    try:
+        await rate_limiter.wait()
+        await page.goto(search_url(query, district), wait_until="domcontentloaded", timeout=30000)
+
+        def record(url: str) -> None:
+            nonlocal new_urls
+            feature_id = parse_feature_id(url)
+            if not feature_id or feature_id in results:
+                return
+            results.add(feature_id)
+            # `seen` dùng chung giữa các quận chạy song song (cùng event loop, không cần lock)
+            if feature_id not in seen:
+                seen.add(feature_id)
+                writer.write(url)
+                new_urls += 1
+
+        try:
+            await page.wait_for_selector(FEED_SELECTOR, timeout=15000)
+        except Exception:
+            # Query chỉ khớp một place: Maps mở thẳng trang place
+            if "/maps/place/" in page.url:
+                record(page.url)
+                return new_urls, len(results)
+            raise
+
+        feed = page.locator(FEED_SELECTOR)
+        idle = 0
+        while idle < idle_rounds and (max_results is None or len(results) < max_results):
+            before = len(results)
+            for url in await page.eval_on_selector_all(RESULT_LINK_SELECTOR, "els => els.map(e => e.href)"):
+                record(url)
+            if await page.locator(END_OF_LIST_SELECTOR).count() > 0:
+                logger.debug("Reached end of results for %s", district)
+                break
+            idle = idle + 1 if len(results) == before else 0
+            await feed.evaluate("el => el.scrollTo(0, el.scrollHeight)")
+            await page.wait_for_timeout(int(random.uniform(1.0, 2.0) * 1000))
+        return new_urls, len(results)
+    finally:
+        writer.close()
+        await context.close()
+
+
+async def harvest(districts: List[str], query: str = DEFAULT_QUERY, out_dir: str = "urls",
+                  concurrency: int = 3, refresh: bool = False, max_results: Optional[int] = None,
+                  headless: bool = True) -> Dict[str, int]:
+    """Harvest các quận song song (tối đa `concurrency` context); trả về số URL mới theo quận"""
+    from playwright.async_api import async_playwright
+    import main
+
+    crawl_module = main.load_crawler_module()
+    os.makedirs(out_dir, exist_ok=True)
+    state = HarvestState(out_dir)
+    seen = load_seen_feature_ids(out_dir)
+    pending = [d for d in districts if refresh or not state.is_done(query, d)]
+    logger.info("🔎 Harvesting '%s' in %d districts (%d skipped as done), %d URLs already known",
+                query, len(pending), len(districts) - len(pending), len(seen))
+
+    rate_limiter = NavigationRateLimiter.from_env()
+    semaphore = asyncio.Semaphore(concurrency)
+    counts: Dict[str, int] = {}
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=headless, args=main.BROWSER_ARGS)
+
+        async def run(district: str) -> None:
+            async with semaphore:
+                with place_context(url=search_url(query, district)):
+                    try:
+                        new_urls, results = await harvest_district(
+                            browser, crawl_module._new_context, query, district, out_dir,
+                            seen, rate_limiter, max_results)
+                    except Exception as e:
+                        # Không mark done: lần chạy sau harvest lại quận này
+                        logger.error("❌ Harvest failed for %s: %s", district, e)
+                        return
+                    state.mark_done(query, district, new_urls, results)
+                    counts[district] = new_urls
+                    logger.info("✅ %s: %d results, %d new URLs", district, results, new_urls)
+
+        try:
+            await asyncio.gather(*(run(d) for d in pending))
+        finally:
+            await browser.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate place URL CSVs from Maps search results")
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--district", action="append", help="District to harvest (repeatable, default: all)")
+    parser.add_argument("--out-dir", default="urls")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("HARVEST_CONCURRENCY", 3)))
+    parser.add_argument("--max-results", type=int, help="Stop scrolling a district after this many results")
+    parser.add_argument("--refresh", action="store_true", help="Harvest districts already marked done again")
+    parser.add_argument("--headful", action="store_true")
+    args = parser.parse_args()
+
+    setup_logging()
+    counts = asyncio.run(harvest(args.district or HCMC_DISTRICTS, args.query, args.out_dir,
+                                 args.concurrency, args.refresh, args.max_results, not args.headful))
+    logger.info("🎉 %d new URLs across %d districts", sum(counts.values()), len(counts))
+
+
+if __name__ == "__main__":
+    main()
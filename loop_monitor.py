@@ -0,0 +1,211 @@
+"""
+Phát hiện event loop bị chặn (psycopg2, ghi file đồng bộ, print nhiều...) trong crawler async
+Một coroutine tick mỗi `interval` giây và đo độ trễ so với lịch; một thread nền kiểm tra tick
+cuối: khi loop im lặng quá `threshold` giây, thread chụp stack của thread chạy loop. Độ trễ
+của lần chặn đó được cộng vào call site (frame trong code của repo gần đỉnh stack nhất), nên
+`report()` và /metrics cho biết chỗ nào chặn loop nhiều nhất.
+
+Tắt mặc định. Cấu hình: LOOP_MONITOR=1, LOOP_LAG_THRESHOLD_MS (mặc định 100).
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from crawl_logging import RateLimitedLog
+
+logger = logging.getLogger("crawler.loop_monitor")
+
+_THIS_FILE = os.path.abspath(__file__)
+PROJECT_DIR = os.path.dirname(_THIS_FILE)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNKNOWN_SITE = "<unknown>"
+
+
+class StallSite:
+    __slots__ = ("count", "total", "max", "stack")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.stack: List[str] = []  # stack của lần chặn lâu nhất
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    path = os.path.abspath(frame.filename)
+    if path.startswith(PROJECT_DIR + os.sep):
+        path = os.path.relpath(path, PROJECT_DIR)
+    else:
+        path = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{path}:{frame.lineno} {frame.name}"
+
+
+def call_site(stack: traceback.StackSummary) -> str:
+    """Frame gần đỉnh stack nhất nằm trong code của repo (không phải thư viện)"""
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(PROJECT_DIR + os.sep) and "site-packages" not in path and path != _THIS_FILE:
+            return _frame_label(frame)
+    return _frame_label(stack[-1]) if stack else UNKNOWN_SITE
+
+
+class LoopMonitor:
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, enabled: bool = True):
+        self.threshold = threshold
+        self.interval = interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._last_tick = time.monotonic()
+        self._pending: Optional[traceback.StackSummary] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._warn = RateLimitedLog(logger, interval=10, level=logging.WARNING)
+        self.buckets = [0] * (len(LAG_BUCKETS) + 1)
+        self.lag_sum = 0.0
+        self.ticks = 0
+        self.max_lag = 0.0
+        self.sites: Dict[str, StallSite] = {}
+
+    @classmethod
+    def from_env(cls) -> "LoopMonitor":
+        return cls(threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", 100)) / 1000,
+                   enabled=os.getenv("LOOP_MONITOR", "0") == "1")
+
+    def start(self) -> None:
+        """Bắt đầu theo dõi event loop đang chạy (gọi từ trong loop)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        logger.info("🐢 Event loop monitor on (threshold %.0f ms)", self.threshold * 1000)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._thread.join(timeout=1)
+        self._task = self._thread = None
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._record(max(now - expected, 0.0), now)
+
+    def _record(self, lag: float, now: float) -> None:
+        with self._lock:
+            self._last_tick = now
+            stack, self._pending = self._pending, None
+            self.ticks += 1
+            self.lag_sum += lag
+            self.max_lag = max(self.max_lag, lag)
+            self.buckets[next((i for i, bound in enumerate(LAG_BUCKETS) if lag <= bound), len(LAG_BUCKETS))] += 1
+            if lag < self.threshold:
+                return
+            site_name = call_site(stack) if stack else UNKNOWN_SITE
+            site = self.sites.get(site_name)
+            if site is None:
+                site = self.sites[site_name] = StallSite()
+            site.count += 1
+            site.total += lag
+            if lag >= site.max:
+                site.max = lag
+                site.stack = [_frame_label(frame) for frame in stack] if stack else []
+        self._warn("🐢 Event loop blocked for %.0f ms at %s", lag * 1000, site_name)
+
+    def _watch(self) -> None:
+        # Thread nền: vẫn chạy khi loop bị chặn (trừ khi call giữ GIL suốt thời gian đó)
+        while not self._stop.wait(self.threshold / 2):
+            with self._lock:
+                silent = time.monotonic() - self._last_tick
+                if self._pending is not None or silent < self.interval + self.threshold:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            with self._lock:
+                self._pending = stack
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ticks": self.ticks,
+                "lag_sum": self.lag_sum,
+                "max_lag": self.max_lag,
+                "buckets": list(self.buckets),
+                "sites": {name: (site.count, site.total, site.max) for name, site in self.sites.items()},
+            }
+
+    def metrics(self) -> str:
+        """Prometheus text format cho /metrics"""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP crawler_event_loop_lag_seconds Delay of the event loop monitor tick",
+            "# TYPE crawler_event_loop_lag_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip((*LAG_BUCKETS, "+Inf"), snapshot["buckets"]):
+            cumulative += count
+            lines.append(f'crawler_event_loop_lag_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines += [
+            f"crawler_event_loop_lag_seconds_sum {snapshot['lag_sum']:.6f}",
+            f"crawler_event_loop_lag_seconds_count {snapshot['ticks']}",
+            "# HELP crawler_event_loop_lag_max_seconds Largest event loop delay seen",
+            "# TYPE crawler_event_loop_lag_max_seconds gauge",
+            f"crawler_event_loop_lag_max_seconds {snapshot['max_lag']:.6f}",
+            "# HELP crawler_event_loop_stalls_total Event loop stalls above the threshold, by call site",
+            "# TYPE crawler_event_loop_stalls_total counter",
+        ]
+        for name, (count, _, _) in snapshot["sites"].items():
+            lines.append(f'crawler_event_loop_stalls_total{{site="{_escape(name)}"}} {count}')
+        lines += [
+            "# HELP crawler_event_loop_stall_seconds_total Time the event loop was blocked, by call site",
+            "# TYPE crawler_event_loop_stall_seconds_total counter",
+        ]
+        for name, (_, total, _) in snapshot["sites"].items():
+            lines.append(f'crawler_event_loop_stall_seconds_total{{site="{_escape(name)}"}} {total:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def report(self, top: int = 10) -> None:
+        with self._lock:
+            sites = sorted(self.sites.items(), key=lambda item: item[1].total, reverse=True)[:top]
+            max_lag = self.max_lag
+        if not sites:
+            return
+        logger.warning("🐢 Event loop stalls (max lag %.0f ms), worst call sites:", max_lag * 1000)
+        for name, site in sites:
+            logger.warning("  %s: %d stalls, %.2fs total, max %.0f ms\n    %s", name, site.count, site.total,
+                           site.max * 1000, "\n    ".join(site.stack[-6:]) or "(no stack captured)")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+monitor = LoopMonitor.from_env()
+
+
+async def monitored(coro):
+    """Chạy `coro` dưới `monitor` (không theo dõi gì khi LOOP_MONITOR tắt) và log call site khi xong"""
+    monitor.start()
+    try:
+        return await coro
+    finally:
+        await monitor.stop()
+        monitor.report()
@@ -2,24 +2,44 @@
 """
 Google Maps Places Crawler - Main Entry Point for Render Deployment
 Tự động tạo database tables và crawl dữ liệu từ Google Maps
+
+Các dependency nặng (psycopg2, playwright, crawler module) chỉ được import khi dùng lần đầu;
+Chromium được khởi động song song với bước kiểm tra database và migration.
 """
 
 import os
 import sys
 import asyncio
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
 import importlib.util
 
-# Import checkpoint system
-from checkpoint_system import checkpoint
+from service_state import state
+from crawl_logging import setup_logging
+
+_env_loaded = False
+
+
+def _load_env():
+    """Load environment variables từ .env (một lần)"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def _connect():
+    import psycopg2
+
+    db_config = get_db_config()
+    # Sử dụng connection string hoặc individual parameters
+    if 'connection_string' in db_config:
+        return psycopg2.connect(db_config['connection_string'])
+    return psycopg2.connect(**db_config)
 
-# Load environment variables
-load_dotenv()
 
 def get_db_config():
     """Lấy cấu hình database từ environment variables"""
+    _load_env()
     # Ưu tiên DATABASE_URL từ Render
     database_url = os.getenv('DATABASE_URL')
     if database_url:
@@ -35,61 +55,24 @@ def get_db_config():
     }
 
 def create_tables():
-    """Tạo các bảng trong database nếu chưa tồn tại"""
-    print("🔧 Creating database tables...")
+    """Tạo/cập nhật schema database bằng các migration trong thư mục migrations/"""
+    from migrate import migrate, ensure_review_partitions
+
+    print("🔧 Applying database migrations...")
     
     conn = None
     try:
-        db_config = get_db_config()
-        
-        # Sử dụng connection string hoặc individual parameters
-        if 'connection_string' in db_config:
-            conn = psycopg2.connect(db_config['connection_string'])
-        else:
-            conn = psycopg2.connect(**db_config)
-            
-        cursor = conn.cursor()
-        
-        # Kiểm tra tables đã tồn tại chưa
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public'
-        """)
-        existing_tables = [table[0] for table in cursor.fetchall()]
-        
-        if 'place' in existing_tables and 'review' in existing_tables:
-            print("✅ Database tables already exist!")
-            print(f"📊 Existing tables: {existing_tables}")
-            return
-        
-        # Đọc file SQL và tạo tables
-        with open('create_tables.sql', 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        # Thực thi SQL để tạo tables
-        cursor.execute(sql_content)
-        conn.commit()
-        
-        print("✅ Database tables created successfully!")
-        
-        # Kiểm tra tables đã tạo
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public'
-        """)
-        tables = cursor.fetchall()
-        print(f"📊 Tables created: {[table[0] for table in tables]}")
+        conn = _connect()
+        applied = migrate(conn)
+        ensure_review_partitions(conn)
+        if applied:
+            print(f"✅ Applied migrations: {[f'{m.version:04d}_{m.name}' for m in applied]}")
         
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
-        if conn:
-            conn.rollback()
         raise
     finally:
         if conn:
-            cursor.close()
             conn.close()
 
 def check_database_connection():
@@ -97,14 +80,7 @@ def check_database_connection():
     print("🔍 Checking database connection...")
     
     try:
-        db_config = get_db_config()
-        
-        # Sử dụng connection string hoặc individual parameters
-        if 'connection_string' in db_config:
-            conn = psycopg2.connect(db_config['connection_string'])
-        else:
-            conn = psycopg2.connect(**db_config)
-            
+        conn = _connect()
         cursor = conn.cursor()
         cursor.execute("SELECT version();")
         version = cursor.fetchone()[0]
@@ -129,20 +105,36 @@ def load_crawler_module():
         print(f"❌ Error loading crawler module: {e}")
         return None
 
-async def run_crawler():
-    """Chạy crawler với checkpoint system để thu thập dữ liệu"""
+BROWSER_ARGS = ['--no-sandbox', '--disable-dev-shm-usage']
+
+
+async def run_crawler(playwright=None, browser=None, crawl_module=None):
+    """Chạy crawler với checkpoint system để thu thập dữ liệu
+
+    `playwright`/`browser`/`crawl_module` có thể được truyền vào nếu đã khởi động sẵn.
+    """
+    from checkpoint_system import checkpoint
+
     print("🚀 Starting Google Maps Places Crawler...")
     print("📍 Target: Quận 1 & Quận 2")
     print("=" * 60)
     
     # Load crawler module
-    crawl_module = load_crawler_module()
+    crawl_module = crawl_module or load_crawler_module()
     if not crawl_module:
         print("❌ Failed to load crawler module")
         return
     
     # Load URLs từ CSV files
     all_urls = crawl_module.load_urls_from_specific_files()
+
+    # Process con của supervisor.py chỉ crawl shard của mình
+    shard = os.getenv('CRAWL_SHARD')
+    if shard:
+        from supervisor import parse_shard, shard_of
+        index, count = parse_shard(shard)
+        all_urls = [url for url in all_urls if shard_of(url, count) == index]
+        print(f"🧩 Shard {index}/{count}: {len(all_urls)} URLs")
     
     if not all_urls:
         print("❌ No URLs found in CSV files!")
@@ -166,12 +158,15 @@ async def run_crawler():
     print(f"📊 Progress: {checkpoint.get_progress_summary()['progress_percent']}%")
     print("=" * 60)
     
-    # Import playwright functions
-    from playwright.async_api import async_playwright
-    
     try:
-        async with async_playwright() as playwright:
-            data = await crawl_module.open_place_pages_with_checkpoint(playwright, remaining_urls)
+        if playwright is None:
+            # Import playwright functions
+            from playwright.async_api import async_playwright
+
+            async with async_playwright() as playwright:
+                await _run_crawl(crawl_module, playwright, browser, remaining_urls)
+        else:
+            await _run_crawl(crawl_module, playwright, browser, remaining_urls)
         
         # Đánh dấu hoàn thành
         checkpoint.complete_crawl()
@@ -193,10 +188,63 @@ async def run_crawler():
     if progress['processed'] > 0:
         print(f"💾 All data has been saved to PostgreSQL database")
         db_config = get_db_config()
-        print(f"🔗 Database: {db_config['host']}:{db_config['port']}/{db_config['database']}")
+        if 'connection_string' not in db_config:
+            print(f"🔗 Database: {db_config['host']}:{db_config['port']}/{db_config['database']}")
+
+
+async def _run_crawl(crawl_module, playwright, browser, urls):
+    if os.getenv('CRAWL_FAST_PATH') == '1':
+        # Overview / hours qua HTTP, Playwright chỉ cho URL fast path không đọc được
+        return await crawl_module.open_place_pages_fast(playwright, urls, browser=browser)
+    if os.getenv('CRAWL_CONCURRENCY'):
+        # Crawl song song, số worker tự điều chỉnh (AIMD) hoặc cố định
+        return await crawl_module.open_place_pages_concurrent(playwright, urls, browser=browser)
+    return await crawl_module.open_place_pages_with_checkpoint(playwright, urls, browser=browser)
+
+
+async def _launch_browser(playwright):
+    browser = await playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+    print(f"🌐 Chromium ready after {state.mark('browser'):.1f}s")
+    return browser
+
+
+async def _startup_and_crawl():
+    """Khởi động Chromium song song với kiểm tra database, migration và load crawler module"""
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser_task = asyncio.create_task(_launch_browser(playwright))
+        module_task = asyncio.create_task(asyncio.to_thread(load_crawler_module))
+        try:
+            # Kiểm tra kết nối database
+            if not await asyncio.to_thread(check_database_connection):
+                raise RuntimeError("Cannot connect to database. Please check your environment variables.")
+            state.mark('database')
+
+            # Tạo tables
+            await asyncio.to_thread(create_tables)
+            state.mark('schema')
+
+            browser = await browser_task
+            crawl_module = await module_task
+        except BaseException:
+            browser_task.cancel()
+            await asyncio.gather(browser_task, module_task, return_exceptions=True)
+            raise
+
+        try:
+            if os.getenv('CRAWL_MODE') == 'recrawl-incomplete':
+                # Chỉ crawl bù các bước còn thiếu của place chưa hoàn chỉnh
+                await crawl_module.recrawl_incomplete_places(playwright, browser)
+            else:
+                await run_crawler(playwright, browser, crawl_module)
+        finally:
+            await browser.close()
+
 
 def main():
     """Main function - entry point cho Render"""
+    setup_logging()
     print("🌟 Google Maps Places Crawler - Render Deployment")
     print("=" * 60)
     
@@ -208,22 +256,12 @@ def main():
     else:
         print(f"📊 Database config: {db_config['host']}:{db_config['port']}/{db_config['database']}")
     
-    # Kiểm tra kết nối database
-    if not check_database_connection():
-        print("❌ Cannot connect to database. Please check your environment variables.")
-        sys.exit(1)
-    
-    # Tạo tables
-    try:
-        create_tables()
-    except Exception as e:
-        print(f"❌ Failed to create tables: {e}")
-        sys.exit(1)
-    
-    # Chạy crawler
+    # Kiểm tra database, tạo tables và chạy crawler
     try:
-        asyncio.run(run_crawler())
+        from loop_monitor import monitored
+        asyncio.run(monitored(_startup_and_crawl()))
     except Exception as e:
+        state.fail(str(e))
         print(f"❌ Crawler failed: {e}")
         sys.exit(1)
     
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations cho database crawler
+Mỗi file migrations/NNNN_name.sql được áp dụng đúng một lần và ghi vào bảng schema_migrations.
+File bắt đầu bằng dòng "-- no-transaction" chạy ngoài transaction, từng câu lệnh một
+(bắt buộc cho CREATE INDEX CONCURRENTLY).
+
+Cách dùng:
+    python migrate.py                 # áp dụng mọi migration còn thiếu
+    python migrate.py --to 3          # chỉ tới version 3
+    python migrate.py --status
+    python migrate.py --prune-before 2023-01   # xoá partition review cũ hơn tháng này
+"""
+
+import argparse
+import glob
+import logging
+import os
+import re
+from datetime import date
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger("crawler.migrate")
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+NO_TRANSACTION_MARKER = "-- no-transaction"
+# Khoá advisory để nhiều process không chạy migration cùng lúc
+MIGRATION_LOCK_ID = 72600320
+
+_FILENAME_RE = re.compile(r"^(\d{4})_(.+)\.sql$")
+_PARTITION_RE = re.compile(r"^review_p(\d{4})_(\d{2})$")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+    transactional: bool
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.sql"))):
+        match = _FILENAME_RE.match(os.path.basename(path))
+        if not match:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            first_line = f.readline().strip()
+        migrations.append(Migration(int(match.group(1)), match.group(2), path,
+                                    first_line != NO_TRANSACTION_MARKER))
+    return migrations
+
+
+def _split_statements(sql: str) -> List[str]:
+    """Tách các câu lệnh đơn giản (không có thân hàm $$) theo dấu ; cuối dòng"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE) if stmt.strip()]
+
+
+def _ensure_migrations_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def applied_versions(conn) -> set:
+    _ensure_migrations_table(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    # Không để transaction của SELECT mở: migration no-transaction cần đổi sang autocommit
+    conn.commit()
+    return versions
+
+
+def _apply(conn, migration: Migration):
+    with open(migration.path, "r", encoding="utf-8") as f:
+        sql = f.read()
+
+    cursor = conn.cursor()
+    try:
+        if migration.transactional:
+            cursor.execute(sql)
+        else:
+            # set_session không dùng được khi transaction đang mở
+            conn.commit()
+            conn.autocommit = True
+            for statement in _split_statements(sql):
+                cursor.execute(statement)
+            conn.autocommit = False
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name),
+        )
+        conn.commit()
+    except Exception:
+        if not conn.autocommit:
+            conn.rollback()
+        conn.autocommit = False
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate(conn, target: Optional[int] = None) -> List[Migration]:
+    """Áp dụng các migration chưa chạy theo thứ tự version; trả về danh sách đã áp dụng"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    conn.commit()
+    applied: List[Migration] = []
+    try:
+        done = applied_versions(conn)
+        for migration in discover_migrations():
+            if migration.version in done or (target is not None and migration.version > target):
+                continue
+            logger.info("🔧 Applying migration %04d_%s...", migration.version, migration.name)
+            _apply(conn, migration)
+            applied.append(migration)
+        if not applied:
+            logger.info("✅ Database schema is up to date")
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+        cursor.close()
+    return applied
+
+
+def _review_is_partitioned(cursor) -> bool:
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('review')")
+    return cursor.fetchone() is not None
+
+
+def ensure_review_partitions(conn, months_ahead: int = 2) -> None:
+    """Tạo sẵn partition cho tháng hiện tại và `months_ahead` tháng tới
+
+    Mỗi tháng một transaction; tháng tạo lỗi chỉ được log (review của tháng đó vẫn vào
+    review_default) để không chặn khởi động.
+    """
+    cursor = conn.cursor()
+    try:
+        if not _review_is_partitioned(cursor):
+            return
+        cursor.execute("""
+            SELECT m::date
+            FROM generate_series(date_trunc('month', now()),
+                                 date_trunc('month', now()) + %s * INTERVAL '1 month',
+                                 INTERVAL '1 month') AS m
+        """, (months_ahead,))
+        months = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        for month in months:
+            try:
+                cursor.execute("SELECT create_review_partition(%s)", (month,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error("❌ Could not create review partition for %s: %s", f"{month:%Y-%m}", e)
+    finally:
+        cursor.close()
+
+
+def drop_review_partitions_before(conn, cutoff: date) -> List[str]:
+    """Retention: xoá các partition tháng nằm hoàn toàn trước `cutoff` và dòng cũ trong review_default"""
+    cutoff = cutoff.replace(day=1)
+    cursor = conn.cursor()
+    dropped: List[str] = []
+    try:
+        if not _review_is_partitioned(cursor):
+            return dropped
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'review'::regclass
+        """)
+        for (name,) in cursor.fetchall():
+            match = _PARTITION_RE.match(name)
+            if match and date(int(match.group(1)), int(match.group(2)), 1) < cutoff:
+                cursor.execute(f'ALTER TABLE review DETACH PARTITION "{name}"')
+                cursor.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+        cursor.execute("DELETE FROM review_default WHERE time_datetime < %s", (cutoff,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return dropped
+
+
+def main():
+    from crawl_logging import setup_logging
+    from main import get_db_config
+    import psycopg2
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--to", type=int, help="Target version (default: latest)")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations")
+    parser.add_argument("--prune-before", help="Drop review partitions older than YYYY-MM")
+    args = parser.parse_args()
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+
+    try:
+        if args.status:
+            done = applied_versions(conn)
+            for migration in discover_migrations():
+                mark = "✅" if migration.version in done else "⏳"
+                logger.info("%s %04d_%s", mark, migration.version, migration.name)
+            return
+        if args.prune_before:
+            year, month = map(int, args.prune_before.split("-"))
+            dropped = drop_review_partitions_before(conn, date(year, month, 1))
+            logger.info("🗑️  Dropped partitions: %s", dropped or 'none')
+            return
+        migrate(conn, target=args.to)
+        ensure_review_partitions(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
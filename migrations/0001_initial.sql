@@ -1,8 +1,9 @@
 -- PostgreSQL schema for places and reviews data
 -- Based on places.json structure
+-- 0001: schema ban đầu (trước đây là create_tables.sql)
 
 -- Create place table
-CREATE TABLE place (
+CREATE TABLE IF NOT EXISTS place (
     id SERIAL PRIMARY KEY,
     url TEXT,
     name VARCHAR(255),
@@ -30,7 +31,7 @@ CREATE TABLE place (
 );
 
 -- Create review table
-CREATE TABLE review (
+CREATE TABLE IF NOT EXISTS review (
     id SERIAL PRIMARY KEY,
     place_id INTEGER REFERENCES place(id) ON DELETE CASCADE,
     review_id VARCHAR(255) UNIQUE,
@@ -44,4 +45,4 @@ CREATE TABLE review (
     review_details JSONB, -- Store review details as JSON object
     photos TEXT[], -- Array of photo URLs
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
@@ -0,0 +1,21 @@
+-- 0002: About-tab sections không có cột riêng + full-text search trên review.text
+
+ALTER TABLE place ADD COLUMN IF NOT EXISTS about_extra JSONB; -- heading -> items
+
+-- Extensions cho full-text search không dấu trên review.text
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() chỉ STABLE nên cần wrapper IMMUTABLE để dùng trong index
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent', $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE review ADD COLUMN IF NOT EXISTS search_vector TSVECTOR; -- to_tsvector('simple', immutable_unaccent(lower(text)))
+
+UPDATE review SET search_vector = to_tsvector('simple', immutable_unaccent(lower(text)))
+WHERE search_vector IS NULL AND text IS NOT NULL;
+
+-- Full-text index và trigram index cho tìm kiếm không dấu
+CREATE INDEX IF NOT EXISTS idx_review_search_vector ON review USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_review_text_trgm ON review USING GIN (immutable_unaccent(lower(text)) gin_trgm_ops);
@@ -0,0 +1,6 @@
+-- no-transaction
+-- 0003: index cho các truy vấn thường dùng, build CONCURRENTLY để không khoá crawler đang ghi
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_place_url ON place (url);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_review_place_id ON review (place_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_review_time_datetime ON review (time_datetime);
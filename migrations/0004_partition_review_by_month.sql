@@ -0,0 +1,74 @@
+-- 0004: range partition bảng review theo tháng của time_datetime
+-- Truy vấn review gần đây và việc xoá dữ liệu cũ chỉ chạm tới các partition liên quan.
+-- review_id không còn UNIQUE toàn bảng (unique trên bảng partition phải chứa time_datetime);
+-- insert_reviews chống trùng bằng idx_review_review_id.
+
+CREATE OR REPLACE FUNCTION create_review_partition(month_start DATE) RETURNS void AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month_start)::date;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF review FOR VALUES FROM (%L) TO (%L)',
+        'review_p' || to_char(start_date, 'YYYY_MM'),
+        start_date,
+        (start_date + INTERVAL '1 month')::date
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE review RENAME TO review_legacy;
+ALTER SEQUENCE review_id_seq OWNED BY NONE;
+DROP INDEX IF EXISTS idx_review_search_vector;
+DROP INDEX IF EXISTS idx_review_text_trgm;
+DROP INDEX IF EXISTS idx_review_place_id;
+DROP INDEX IF EXISTS idx_review_time_datetime;
+
+CREATE TABLE review (
+    id INTEGER NOT NULL DEFAULT nextval('review_id_seq'),
+    place_id INTEGER REFERENCES place(id) ON DELETE CASCADE,
+    review_id VARCHAR(255),
+    reviewer_name VARCHAR(255),
+    reviewer_profile_url TEXT,
+    rating DECIMAL(3,1),
+    time VARCHAR(100), -- Store as string since it's relative time like "2 tháng trước"
+    time_datetime TIMESTAMP, -- Partition key; NULL và dữ liệu quá cũ nằm ở review_default
+    text TEXT,
+    owner_response TEXT,
+    review_details JSONB, -- Store review details as JSON object
+    photos TEXT[], -- Array of photo URLs
+    search_vector TSVECTOR, -- to_tsvector('simple', immutable_unaccent(lower(text)))
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (time_datetime);
+
+ALTER SEQUENCE review_id_seq OWNED BY review.id;
+
+CREATE TABLE review_default PARTITION OF review DEFAULT;
+
+-- Partition theo tháng cho tối đa 36 tháng gần nhất tới 2 tháng tới
+SELECT create_review_partition(m::date)
+FROM generate_series(
+    GREATEST(
+        date_trunc('month', COALESCE((SELECT min(time_datetime) FROM review_legacy), now())),
+        date_trunc('month', now() - INTERVAL '36 months')
+    ),
+    date_trunc('month', now() + INTERVAL '2 months'),
+    INTERVAL '1 month'
+) AS m;
+
+INSERT INTO review (
+    id, place_id, review_id, reviewer_name, reviewer_profile_url, rating, time,
+    time_datetime, text, owner_response, review_details, photos, search_vector, created_at
+)
+SELECT
+    id, place_id, review_id, reviewer_name, reviewer_profile_url, rating, time,
+    time_datetime, text, owner_response, review_details, photos, search_vector, created_at
+FROM review_legacy;
+
+DROP TABLE review_legacy;
+
+CREATE INDEX idx_review_id ON review (id);
+CREATE INDEX idx_review_review_id ON review (review_id);
+CREATE INDEX idx_review_place_id ON review (place_id);
+CREATE INDEX idx_review_time_datetime ON review (time_datetime);
+CREATE INDEX idx_review_search_vector ON review USING GIN (search_vector);
+CREATE INDEX idx_review_text_trgm ON review USING GIN (immutable_unaccent(lower(text)) gin_trgm_ops);
@@ -0,0 +1,20 @@
+-- 0005: ảnh review đã tải về kho local (content-addressed theo sha256)
+
+CREATE TABLE IF NOT EXISTS photo_blob (
+    sha256 CHAR(64) PRIMARY KEY,
+    path TEXT NOT NULL, -- Đường dẫn trong PHOTO_STORE_DIR
+    content_type VARCHAR(100),
+    size_bytes INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS review_photo (
+    review_id VARCHAR(255) NOT NULL, -- review.review_id (review được partition nên không có FK)
+    position SMALLINT NOT NULL, -- Thứ tự ảnh trong review
+    source_url TEXT, -- URL googleusercontent gốc
+    sha256 CHAR(64) NOT NULL REFERENCES photo_blob(sha256),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (review_id, position)
+);
+
+CREATE INDEX IF NOT EXISTS idx_review_photo_sha256 ON review_photo (sha256);
@@ -0,0 +1,4 @@
+-- 0006: ghi lại số review bị bỏ qua do budget và chế độ sắp xếp đã dùng
+
+ALTER TABLE place ADD COLUMN IF NOT EXISTS reviews_skipped INTEGER; -- review_count - số review đã lấy
+ALTER TABLE place ADD COLUMN IF NOT EXISTS review_sort VARCHAR(20); -- relevant | newest | highest | lowest
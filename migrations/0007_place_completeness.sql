@@ -0,0 +1,6 @@
+-- 0007: đánh dấu place crawl chưa đủ bước (lỗi hoặc hết PLACE_DEADLINE) để crawl bù
+
+ALTER TABLE place ADD COLUMN IF NOT EXISTS missing_stages TEXT[] NOT NULL DEFAULT '{}';
+ALTER TABLE place ADD COLUMN IF NOT EXISTS complete BOOLEAN NOT NULL DEFAULT TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_place_incomplete ON place(updated_at) WHERE NOT complete;
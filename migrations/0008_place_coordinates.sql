@@ -0,0 +1,51 @@
+-- 0008: toạ độ place (parse từ "!3d<lat>!4d<lng>" trong URL) + geohash để truy vấn theo vùng/khoảng cách
+
+-- Giống hệt geo.geohash_encode (cùng phép chia đôi trên float8)
+CREATE OR REPLACE FUNCTION geohash_encode(lat DOUBLE PRECISION, lng DOUBLE PRECISION, len INTEGER)
+RETURNS TEXT AS $$
+DECLARE
+    alphabet CONSTANT TEXT := '0123456789bcdefghjkmnpqrstuvwxyz';
+    lat_lo DOUBLE PRECISION := -90;
+    lat_hi DOUBLE PRECISION := 90;
+    lng_lo DOUBLE PRECISION := -180;
+    lng_hi DOUBLE PRECISION := 180;
+    mid DOUBLE PRECISION;
+    hash TEXT := '';
+    ch INTEGER := 0;
+    bits INTEGER := 0;
+    even BOOLEAN := TRUE;
+BEGIN
+    WHILE length(hash) < len LOOP
+        IF even THEN
+            mid := (lng_lo + lng_hi) / 2;
+            IF lng >= mid THEN ch := ch * 2 + 1; lng_lo := mid; ELSE ch := ch * 2; lng_hi := mid; END IF;
+        ELSE
+            mid := (lat_lo + lat_hi) / 2;
+            IF lat >= mid THEN ch := ch * 2 + 1; lat_lo := mid; ELSE ch := ch * 2; lat_hi := mid; END IF;
+        END IF;
+        even := NOT even;
+        bits := bits + 1;
+        IF bits = 5 THEN
+            hash := hash || substr(alphabet, ch + 1, 1);
+            ch := 0;
+            bits := 0;
+        END IF;
+    END LOOP;
+    RETURN hash;
+END
+$$ LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE place ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION;
+ALTER TABLE place ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION;
+
+-- Backfill từ URL của các place đã crawl (crawler ghi lat/lng cho place mới)
+UPDATE place
+SET lat = (regexp_match(url, '!3d(-?[0-9]+(?:\.[0-9]+)?)!4d(-?[0-9]+(?:\.[0-9]+)?)'))[1]::DOUBLE PRECISION,
+    lng = (regexp_match(url, '!3d(-?[0-9]+(?:\.[0-9]+)?)!4d(-?[0-9]+(?:\.[0-9]+)?)'))[2]::DOUBLE PRECISION
+WHERE lat IS NULL AND url ~ '!3d-?[0-9.]+!4d-?[0-9.]+';
+
+-- Collation "C": thứ tự byte, nên mọi geohash cùng prefix nằm liền nhau trong B-tree
+ALTER TABLE place ADD COLUMN IF NOT EXISTS geohash TEXT COLLATE "C"
+    GENERATED ALWAYS AS (geohash_encode(lat, lng, 9)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_place_geohash ON place (geohash) WHERE geohash IS NOT NULL;
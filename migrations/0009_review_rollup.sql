@@ -0,0 +1,79 @@
+-- 0009: rollup rating và điểm thành phần (Đồ ăn, Dịch vụ, Bầu không khí) theo place và tháng
+-- insert_reviews cộng dồn batch review vừa insert (review_rollup_delta với id của batch);
+-- rollups.py --recompute tính lại toàn bộ từ bảng review.
+
+-- Điểm thành phần trong review_details là text ("5", "4,5"); NULL nếu không phải điểm 1..5
+CREATE OR REPLACE FUNCTION parse_score(score_text TEXT) RETURNS NUMERIC AS $$
+    SELECT CASE WHEN s BETWEEN 1 AND 5 THEN s END
+    FROM (SELECT replace(substring(score_text FROM '[0-9]+(?:[.,][0-9]+)?'), ',', '.')::NUMERIC AS s) AS parsed
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Cộng từng phần tử của hai histogram; STRICT nên int_array_sum bắt đầu từ giá trị đầu tiên
+CREATE OR REPLACE FUNCTION int_array_add(a INTEGER[], b INTEGER[]) RETURNS INTEGER[] AS $$
+    SELECT array_agg(COALESCE(a[i], 0) + COALESCE(b[i], 0) ORDER BY i)
+    FROM generate_series(1, GREATEST(cardinality(a), cardinality(b))) AS i
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+DROP AGGREGATE IF EXISTS int_array_sum(INTEGER[]);
+CREATE AGGREGATE int_array_sum(INTEGER[]) (SFUNC = int_array_add, STYPE = INTEGER[]);
+
+CREATE TABLE IF NOT EXISTS review_rollup (
+    place_id INTEGER NOT NULL REFERENCES place(id) ON DELETE CASCADE,
+    month DATE NOT NULL, -- tháng của time_datetime; 1970-01-01 = review không rõ thời gian
+    review_count INTEGER NOT NULL,
+    rating_count INTEGER NOT NULL,
+    rating_sum NUMERIC NOT NULL,
+    rating_hist INTEGER[] NOT NULL, -- số review 1..5 sao (làm tròn)
+    food_count INTEGER NOT NULL,
+    food_sum NUMERIC NOT NULL,
+    food_hist INTEGER[] NOT NULL,
+    service_count INTEGER NOT NULL,
+    service_sum NUMERIC NOT NULL,
+    service_hist INTEGER[] NOT NULL,
+    atmosphere_count INTEGER NOT NULL,
+    atmosphere_sum NUMERIC NOT NULL,
+    atmosphere_hist INTEGER[] NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (place_id, month)
+);
+
+-- Histogram 5 bucket (1..5, làm tròn) của điểm; bỏ qua NULL
+CREATE OR REPLACE FUNCTION score_hist_add(hist INTEGER[], score NUMERIC) RETURNS INTEGER[] AS $$
+    SELECT CASE
+        WHEN score IS NULL THEN hist
+        ELSE hist[1:b - 1] || (hist[b] + 1) || hist[b + 1:5]
+    END
+    FROM (SELECT floor(score + 0.5)::INTEGER AS b) AS bucket
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+DROP AGGREGATE IF EXISTS score_hist(NUMERIC);
+CREATE AGGREGATE score_hist(NUMERIC) (SFUNC = score_hist_add, STYPE = INTEGER[], INITCOND = '{0,0,0,0,0}');
+
+-- Rollup của các review khớp bộ lọc (NULL = không lọc), cùng cột với review_rollup
+CREATE OR REPLACE FUNCTION review_rollup_delta(p_place_id INTEGER, p_review_ids INTEGER[])
+RETURNS SETOF review_rollup AS $$
+    SELECT
+        place_id, month, count(*)::INTEGER,
+        count(rating)::INTEGER, COALESCE(sum(rating), 0), score_hist(rating),
+        count(food)::INTEGER, COALESCE(sum(food), 0), score_hist(food),
+        count(service)::INTEGER, COALESCE(sum(service), 0), score_hist(service),
+        count(atmosphere)::INTEGER, COALESCE(sum(atmosphere), 0), score_hist(atmosphere),
+        CURRENT_TIMESTAMP::TIMESTAMP
+    FROM (
+        SELECT
+            r.place_id,
+            COALESCE(date_trunc('month', r.time_datetime)::DATE, DATE '1970-01-01') AS month,
+            CASE WHEN r.rating BETWEEN 1 AND 5 THEN r.rating END AS rating,
+            parse_score(r.review_details->>'Đồ ăn') AS food,
+            parse_score(r.review_details->>'Dịch vụ') AS service,
+            parse_score(r.review_details->>'Bầu không khí') AS atmosphere
+        FROM review r
+        WHERE r.place_id IS NOT NULL
+          AND (p_place_id IS NULL OR r.place_id = p_place_id)
+          AND (p_review_ids IS NULL OR r.id = ANY(p_review_ids))
+    ) AS scored
+    GROUP BY place_id, month
+$$ LANGUAGE sql STABLE;
+
+INSERT INTO review_rollup SELECT * FROM review_rollup_delta(NULL, NULL)
+ON CONFLICT (place_id, month) DO NOTHING;
@@ -0,0 +1,12 @@
+-- 0010: giờ mở cửa dạng khoảng phút trong tuần (0 = 00:00 Thứ Hai, 10080 = hết Chủ Nhật)
+-- Parse từ place.business_hours bởi parsing.weekly_open_intervals; insert_place ghi lại khi chạy
+-- bước "hours", place đã có được backfill bằng: python opening_hours.py --rebuild
+
+CREATE TABLE IF NOT EXISTS place_open_interval (
+    place_id INTEGER NOT NULL REFERENCES place(id) ON DELETE CASCADE,
+    open_minutes INT4RANGE NOT NULL -- [mở, đóng)
+);
+
+-- "Mở lúc T" = open_minutes @> T: GiST index trả về đúng các khoảng chứa T
+CREATE INDEX IF NOT EXISTS idx_place_open_interval_minutes ON place_open_interval USING GIST (open_minutes);
+CREATE INDEX IF NOT EXISTS idx_place_open_interval_place_id ON place_open_interval (place_id);
@@ -0,0 +1,64 @@
+-- 0011: review_id duy nhất toàn bảng qua bảng phụ review_key
+-- review được partition theo time_datetime nên không có UNIQUE(review_id), và WHERE NOT EXISTS
+-- trong insert_reviews bị race giữa các worker / shard (review trùng, rollup bị cộng hai lần).
+-- insert_reviews giành review_id trong review_key (ON CONFLICT DO NOTHING RETURNING) trước khi
+-- insert review, trong cùng transaction. Key vẫn được giữ khi prune partition (review cũ không
+-- bị insert lại, giống rollup), và bị xoá theo place.
+
+-- Chặn crawler đang ghi cho tới khi backfill xong
+LOCK TABLE review IN SHARE ROW EXCLUSIVE MODE;
+
+-- a - b theo từng phần tử (ngược với int_array_add)
+CREATE OR REPLACE FUNCTION int_array_sub(a INTEGER[], b INTEGER[]) RETURNS INTEGER[] AS $$
+    SELECT int_array_add(a, (SELECT array_agg(-x ORDER BY i) FROM unnest(b) WITH ORDINALITY AS h(x, i)))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Review trùng review_id đã insert trước migration này; giữ dòng có id nhỏ nhất
+CREATE TEMP TABLE review_duplicate ON COMMIT DROP AS
+SELECT id, place_id FROM (
+    SELECT id, place_id, row_number() OVER (PARTITION BY review_id ORDER BY id) AS n
+    FROM review
+    WHERE review_id IS NOT NULL
+) AS ranked
+WHERE n > 1;
+
+-- Trừ các dòng trùng khỏi rollup trước khi xoá (không tính lại toàn bộ để giữ số liệu của
+-- partition đã prune)
+UPDATE review_rollup r SET
+    review_count = r.review_count - d.review_count,
+    rating_count = r.rating_count - d.rating_count,
+    rating_sum = r.rating_sum - d.rating_sum,
+    rating_hist = int_array_sub(r.rating_hist, d.rating_hist),
+    food_count = r.food_count - d.food_count,
+    food_sum = r.food_sum - d.food_sum,
+    food_hist = int_array_sub(r.food_hist, d.food_hist),
+    service_count = r.service_count - d.service_count,
+    service_sum = r.service_sum - d.service_sum,
+    service_hist = int_array_sub(r.service_hist, d.service_hist),
+    atmosphere_count = r.atmosphere_count - d.atmosphere_count,
+    atmosphere_sum = r.atmosphere_sum - d.atmosphere_sum,
+    atmosphere_hist = int_array_sub(r.atmosphere_hist, d.atmosphere_hist),
+    updated_at = CURRENT_TIMESTAMP
+FROM (
+    SELECT delta.*
+    FROM (SELECT place_id, array_agg(id) AS ids FROM review_duplicate
+          WHERE place_id IS NOT NULL GROUP BY place_id) AS dup,
+         LATERAL review_rollup_delta(dup.place_id, dup.ids) AS delta
+) AS d
+WHERE r.place_id = d.place_id AND r.month = d.month;
+
+DELETE FROM review_rollup WHERE review_count <= 0;
+
+DELETE FROM review WHERE id IN (SELECT id FROM review_duplicate);
+
+CREATE TABLE IF NOT EXISTS review_key (
+    review_id VARCHAR(255) PRIMARY KEY,
+    place_id INTEGER REFERENCES place(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO review_key (review_id, place_id)
+SELECT review_id, place_id FROM review WHERE review_id IS NOT NULL
+ON CONFLICT (review_id) DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS idx_review_key_place_id ON review_key (place_id);
@@ -0,0 +1,5 @@
+-- 0012: index cho export_parquet.py --incremental (ORDER BY cột thời gian, id)
+-- review là bảng partition nên không build CONCURRENTLY được; index được tạo trên từng partition.
+
+CREATE INDEX IF NOT EXISTS idx_place_updated_at_id ON place (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_review_created_at_id ON review (created_at, id);
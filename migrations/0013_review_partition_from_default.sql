@@ -0,0 +1,32 @@
+-- 0013: create_review_partition chuyển dòng của tháng đó ra khỏi review_default
+-- Khi process chạy qua hết các partition tạo sẵn, review của tháng mới nằm ở review_default;
+-- CREATE TABLE ... PARTITION OF khi đó lỗi vì default đã có dòng thuộc khoảng này. Partition
+-- được tạo tách rời, nhận các dòng đó từ default rồi mới ATTACH, trong cùng transaction.
+
+CREATE OR REPLACE FUNCTION create_review_partition(month_start DATE) RETURNS void AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month_start)::date;
+    end_date DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_name TEXT := 'review_p' || to_char(date_trunc('month', month_start), 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE review INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    -- CHECK trùng với khoảng partition để ATTACH không phải quét lại bảng
+    EXECUTE format(
+        'ALTER TABLE %I ADD CONSTRAINT %I CHECK (time_datetime IS NOT NULL AND time_datetime >= %L AND time_datetime < %L)',
+        partition_name, partition_name || '_range', start_date, end_date
+    );
+    EXECUTE format(
+        'INSERT INTO %I SELECT * FROM review_default WHERE time_datetime >= %L AND time_datetime < %L',
+        partition_name, start_date, end_date
+    );
+    DELETE FROM review_default WHERE time_datetime >= start_date AND time_datetime < end_date;
+    EXECUTE format(
+        'ALTER TABLE review ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_date, end_date
+    );
+    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', partition_name, partition_name || '_range');
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Truy vấn "đang mở cửa lúc T" trên bảng place_open_interval
+Giờ mở cửa (place.business_hours, chuỗi tự do như "07:00–22:00", "Mở cửa cả ngày") được
+parse thành các khoảng phút trong tuần, tính từ 00:00 Thứ Hai theo giờ Việt Nam; mỗi khoảng
+là một dòng int4range với GiST index, nên open-at-T là một index scan thay vì parse JSON
+của mọi place.
+
+Cách dùng:
+    python opening_hours.py                           # đang mở bây giờ
+    python opening_hours.py --at "2024-06-01 23:00"   # tối thứ Bảy
+    python opening_hours.py --weekday 5 --time 23:00  # thứ Bảy (Thứ Hai = 0) lúc 23:00
+    python opening_hours.py --rebuild                 # parse lại business_hours của mọi place
+"""
+
+import argparse
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from parsing import MINUTES_PER_DAY, weekly_open_intervals
+
+LOCAL_TZ = ZoneInfo("Asia/Ho_Chi_Minh")
+
+OPEN_AT_QUERY = """
+    SELECT p.id, p.name, p.address, p.rating, p.review_count, p.url,
+           upper(i.open_minutes) AS closes_at
+    FROM place_open_interval i
+    JOIN place p ON p.id = i.place_id
+    WHERE i.open_minutes @> %(minute)s
+    ORDER BY p.rating DESC NULLS LAST, p.id
+    LIMIT %(limit)s
+"""
+
+
+def week_minute(when: Optional[datetime] = None) -> int:
+    """Phút trong tuần (0 = 00:00 Thứ Hai) theo giờ Việt Nam; datetime không có tz coi là giờ Việt Nam"""
+    when = when or datetime.now(LOCAL_TZ)
+    if when.tzinfo is not None:
+        when = when.astimezone(LOCAL_TZ)
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+def format_week_minute(minute: int) -> str:
+    day, rest = divmod(minute, MINUTES_PER_DAY)
+    names = ["Thứ Hai", "Thứ Ba", "Thứ Tư", "Thứ Năm", "Thứ Sáu", "Thứ Bảy", "Chủ Nhật"]
+    return f"{names[day % 7]} {rest // 60:02d}:{rest % 60:02d}"
+
+
+def replace_open_intervals(cursor, place_id: int, business_hours: dict) -> int:
+    """Ghi lại các khoảng mở cửa của một place (trong transaction của caller); trả về số khoảng"""
+    intervals = weekly_open_intervals(business_hours)
+    cursor.execute("DELETE FROM place_open_interval WHERE place_id = %s", (place_id,))
+    if intervals:
+        execute_values(cursor,
+                       "INSERT INTO place_open_interval (place_id, open_minutes) VALUES %s",
+                       [(place_id, f"[{start},{end})") for start, end in intervals])
+    return len(intervals)
+
+
+def open_at(conn, when: Optional[datetime] = None, minute: Optional[int] = None, limit: int = 100) -> List[Dict]:
+    """Place đang mở lúc `when` (hoặc phút trong tuần `minute`); closes_at là phút trong tuần"""
+    minute = week_minute(when) if minute is None else minute
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(OPEN_AT_QUERY, {"minute": minute, "limit": limit})
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def rebuild(conn) -> tuple:
+    """Parse lại business_hours của mọi place; trả về (số place có khoảng giờ, số place có dữ liệu giờ)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id, business_hours FROM place WHERE business_hours IS NOT NULL")
+        rows = cursor.fetchall()
+        parsed = 0
+        for place_id, hours in rows:
+            if isinstance(hours, str):
+                hours = json.loads(hours)
+            parsed += replace_open_intervals(cursor, place_id, hours) > 0
+        conn.commit()
+        return parsed, len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    from main import get_db_config
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="List places open at a given time")
+    parser.add_argument("--at", type=datetime.fromisoformat, help="Local time, e.g. '2024-06-01 23:00'")
+    parser.add_argument("--weekday", type=int, choices=range(7), help="0 = Monday ... 6 = Sunday")
+    parser.add_argument("--time", help="HH:MM, used with --weekday")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--rebuild", action="store_true", help="Re-parse business_hours for every place")
+    args = parser.parse_args()
+
+    minute = None
+    if args.weekday is not None:
+        hour, _, mins = (args.time or "00:00").partition(":")
+        minute = args.weekday * MINUTES_PER_DAY + int(hour) * 60 + int(mins or 0)
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+    try:
+        if args.rebuild:
+            parsed, total = rebuild(conn)
+            print(f"🔁 Opening hours parsed for {parsed}/{total} places")
+            return
+        minute = week_minute(args.at) if minute is None else minute
+        results = open_at(conn, minute=minute, limit=args.limit)
+    finally:
+        conn.close()
+
+    print(f"🕒 {len(results)} places open at {format_week_minute(minute)}")
+    for row in results:
+        print(f"  {row['name']} ⭐{row['rating']} (đóng {format_week_minute(row['closes_at'] % 10080)}) - {row['address']}")
+
+
+if __name__ == "__main__":
+    main()
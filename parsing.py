@@ -0,0 +1,286 @@
+"""
+Text parsers cho dữ liệu crawl từ Google Maps
+Các regex được compile một lần ở module level; có thêm hàm batch nhận một list
+string và một mốc thời gian crawl chung để xử lý lại hàng trăm nghìn reviews.
+"""
+
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+_FLOAT_RE = re.compile(r"\d+(?:[\.,]\d+)?")
+_COUNT_RE = re.compile(r"\d{1,3}(?:[.,]\d{3})*|\d+")
+_MULTI_SPACE_RE = re.compile(r"\s{2,}")
+# Feature id của place trong URL Maps, ví dụ "!1s0x3168532aa82ab9f1:0x5f471336cc2918b1"
+_FEATURE_ID_RE = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.IGNORECASE)
+# Toạ độ của place trong URL Maps, ví dụ "!3d10.773527!4d106.7053407"
+_COORDINATES_RE = re.compile(r"!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)")
+
+# "2 tháng trước", "3 ngày trước", "một tuần trước"
+_RELATIVE_TIME_RE = re.compile(r"(\d+|một)\s+(giây|phút|giờ|ngày|tuần|tháng|năm)\s+trước")
+_EDITED_PREFIX = "thời gian chỉnh sửa:"
+
+# Tháng xấp xỉ 30 ngày, năm xấp xỉ 365 ngày
+_UNIT_DELTAS = {
+    'giây': timedelta(seconds=1),
+    'phút': timedelta(minutes=1),
+    'giờ': timedelta(hours=1),
+    'ngày': timedelta(days=1),
+    'tuần': timedelta(weeks=1),
+    'tháng': timedelta(days=30),
+    'năm': timedelta(days=365),
+}
+
+# Các tiêu đề chi tiết review thường bị sót lại trong text
+DETAIL_LABELS = [
+    "Đồ ăn",
+    "Dịch vụ",
+    "Bầu không khí",
+    "Độ ồn",
+    "Quy mô nhóm",
+    "Những món ăn đề xuất",
+    "Loại hình bữa ăn",
+    "Giá mỗi người",
+]
+# Nhãn dài đứng trước để alternation không cắt ngang nhãn khác
+_DETAIL_LABELS_RE = re.compile(
+    "|".join(rf"{re.escape(label)}\s*" for label in sorted(DETAIL_LABELS, key=len, reverse=True))
+)
+
+
+def parse_float(text: str) -> float | None:
+    if not text:
+        return None
+    match = _FLOAT_RE.search(text)
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+
+def parse_reviews_count(text: str) -> int | None:
+    if not text:
+        return None
+    match = _COUNT_RE.search(text)
+    if not match:
+        return None
+    return int(match.group(0).replace(".", "").replace(",", ""))
+
+
+def parse_feature_id(url: str) -> str | None:
+    if not url:
+        return None
+    match = _FEATURE_ID_RE.search(url)
+    return match.group(1).lower() if match else None
+
+
+def parse_coordinates(url: str) -> tuple[float, float] | None:
+    """(lat, lng) của place từ URL Maps"""
+    if not url:
+        return None
+    match = _COORDINATES_RE.search(url)
+    if not match:
+        return None
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+@lru_cache(maxsize=4096)
+def _relative_offset(time_text: str) -> Optional[timedelta]:
+    """Tính khoảng lùi cho một chuỗi thời gian; cache vì reviews lặp lại rất nhiều."""
+    time_text = time_text.strip().lower()
+    if _EDITED_PREFIX in time_text:
+        time_text = time_text.replace(_EDITED_PREFIX, "").strip()
+
+    match = _RELATIVE_TIME_RE.search(time_text)
+    if not match:
+        return None
+    amount, unit = match.groups()
+    number = 1 if amount == "một" else int(amount)
+    return _UNIT_DELTAS[unit] * number
+
+
+def parse_relative_time(time_text: str, now: Optional[datetime] = None) -> datetime | None:
+    """
+    Chuyển đổi thời gian tương đối thành datetime thực tế
+    Ví dụ: "2 tháng trước" -> datetime object
+    `now` là mốc thời gian crawl; mặc định là datetime.now()
+    """
+    if not time_text:
+        return None
+    offset = _relative_offset(time_text)
+    if offset is None:
+        return None
+    return (now or datetime.now()) - offset
+
+
+def strip_detail_snippets_from_text(text: str, snippets: list[str]) -> str:
+    """Remove known detail substrings from the free-form review text and tidy spaces."""
+    if not text:
+        return text
+    cleaned = text
+    for s in snippets:
+        if s:
+            cleaned = cleaned.replace(s, " ")
+
+    # Extra safety: remove common Vietnamese headings if left hanging
+    cleaned = _DETAIL_LABELS_RE.sub(" ", cleaned)
+    return _MULTI_SPACE_RE.sub(" ", cleaned).strip()
+
+
+# ---------------------------------------------------------------------------
+# Giờ mở cửa
+# ---------------------------------------------------------------------------
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Tên ngày (đã lower, bỏ phần ghi chú) -> thứ tự trong tuần, Thứ Hai = 0
+_WEEKDAY_INDEX = {
+    **{name: i for i, name in enumerate(
+        ["thứ hai", "thứ ba", "thứ tư", "thứ năm", "thứ sáu", "thứ bảy", "chủ nhật"])},
+    **{name: i for i, name in enumerate(
+        ["thứ 2", "thứ 3", "thứ 4", "thứ 5", "thứ 6", "thứ 7", "cn"])},
+    **{name: i for i, name in enumerate(
+        ["t2", "t3", "t4", "t5", "t6", "t7", "chủ nhật"])},
+    **{name: i for i, name in enumerate(
+        ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"])},
+}
+_ALL_DAY_MARKERS = ("mở cửa cả ngày", "mở cửa 24 giờ", "24 giờ", "open 24 hours", "24 hours")
+_CLOSED_MARKERS = ("đóng cửa", "closed", "nghỉ")
+# Ghi chú Google thêm vào ô giờ (ngày lễ...), không ảnh hưởng khoảng giờ
+_HOURS_NOTES_RE = re.compile(r"giờ (?:mở cửa )?có thể khác|hours might differ|\(.*?\)")
+_HOURS_SEGMENT_SEP_RE = re.compile(r"\s*(?:[,;]|\svà\s|\sand\s)\s*")
+_HOURS_PREFIX_RE = re.compile(r"^(?:từ|from)\s+")
+_HOURS_RANGE_SEP_RE = re.compile(r"\s*(?:–|—|-|đến|to)\s*")
+_CLOCK_RE = re.compile(r"^(\d{1,2})(?:[:h.](\d{2}))?\s*(am|pm|sa|ch|sáng|chiều|tối)?$")
+_PM_MARKERS = ("pm", "ch", "chiều", "tối")
+
+
+def _parse_clock(text: str) -> tuple[int, str | None] | None:
+    """"07:30" -> (450, None), "7 PM" -> (420, "pm"): phút từ 00:00 và meridiem chưa áp dụng"""
+    match = _CLOCK_RE.match(text.strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if hour > 24 or minute > 59:
+        return None
+    return hour * 60 + minute, match.group(3)
+
+
+def _apply_meridiem(minutes: int, meridiem: str | None) -> int:
+    if meridiem is None:
+        return minutes
+    hour, minute = divmod(minutes, 60)
+    hour %= 12
+    if meridiem in _PM_MARKERS:
+        hour += 12
+    return hour * 60 + minute
+
+
+def parse_hours_text(text: str) -> List[tuple[int, int]] | None:
+    """Giờ mở cửa của một ngày -> [(phút mở, phút đóng)], tính từ 00:00 của ngày đó
+
+    Phút đóng > 1440 khi khoảng giờ qua nửa đêm. [] = đóng cửa cả ngày;
+    None = không parse được (chuỗi rỗng hoặc định dạng lạ).
+    """
+    if not text:
+        return None
+    text = _HOURS_NOTES_RE.sub(" ", text.lower().replace(" ", " ").replace("\xa0", " "))
+    text = _MULTI_SPACE_RE.sub(" ", text).strip(" ,.;")
+    if not text:
+        return None
+    if any(marker in text for marker in _ALL_DAY_MARKERS):
+        return [(0, MINUTES_PER_DAY)]
+    if any(marker in text for marker in _CLOSED_MARKERS) and not any(ch.isdigit() for ch in text):
+        return []
+
+    intervals = []
+    for segment in _HOURS_SEGMENT_SEP_RE.split(text):
+        parts = _HOURS_RANGE_SEP_RE.split(_HOURS_PREFIX_RE.sub("", segment), maxsplit=1)
+        if len(parts) != 2:
+            return None
+        start, end = _parse_clock(parts[0]), _parse_clock(parts[1])
+        if start is None or end is None:
+            return None
+        (start_minutes, start_meridiem), (end_minutes, end_meridiem) = start, end
+        end_minutes = _apply_meridiem(end_minutes, end_meridiem)
+        if start_meridiem is None and end_meridiem is not None:
+            # "11–2 PM": giờ mở dùng chung meridiem của giờ đóng, trừ khi như vậy lại muộn hơn giờ đóng
+            shared = _apply_meridiem(start_minutes, end_meridiem)
+            start_minutes = shared if shared <= end_minutes else _apply_meridiem(start_minutes, "am")
+        else:
+            start_minutes = _apply_meridiem(start_minutes, start_meridiem)
+        if start_minutes >= MINUTES_PER_DAY:
+            return None
+        if end_minutes <= start_minutes:
+            # "18:00–02:00", "07:00–00:00": qua nửa đêm
+            end_minutes += MINUTES_PER_DAY
+        intervals.append((start_minutes, end_minutes))
+    return intervals
+
+
+def weekday_index(label: str) -> int | None:
+    """"Thứ Hai" / "Thứ 2" / "CN" / "Monday" -> 0..6 (Thứ Hai = 0)"""
+    if not label:
+        return None
+    name = _HOURS_NOTES_RE.sub(" ", label.lower()).split("\n")[0].strip(" ,.:")
+    return _WEEKDAY_INDEX.get(_MULTI_SPACE_RE.sub(" ", name))
+
+
+def weekly_open_intervals(business_hours: dict) -> List[tuple[int, int]]:
+    """business_hours {"Thứ Hai": "07:00–22:00", ...} -> các khoảng [mở, đóng) tính bằng phút
+    từ 00:00 Thứ Hai, đã gộp và cắt ở cuối tuần (khoảng qua đêm Chủ Nhật nối sang đầu tuần)
+
+    Ngày không nhận ra hoặc giờ không parse được bị bỏ qua.
+    """
+    raw = []
+    for label, text in (business_hours or {}).items():
+        day = weekday_index(label)
+        intervals = parse_hours_text(text) if day is not None else None
+        if not intervals:
+            continue
+        offset = day * MINUTES_PER_DAY
+        for start, end in intervals:
+            start, end = offset + start, offset + end
+            if end > MINUTES_PER_WEEK:
+                raw.append((start, MINUTES_PER_WEEK))
+                raw.append((0, end - MINUTES_PER_WEEK))
+            else:
+                raw.append((start, end))
+
+    merged: List[tuple[int, int]] = []
+    for start, end in sorted(raw):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Batch API
+# ---------------------------------------------------------------------------
+
+def parse_floats(texts: Iterable[str]) -> List[float | None]:
+    return [parse_float(t) for t in texts]
+
+
+def parse_reviews_counts(texts: Iterable[str]) -> List[int | None]:
+    return [parse_reviews_count(t) for t in texts]
+
+
+def parse_relative_times(texts: Iterable[str], anchor: Optional[datetime] = None) -> List[datetime | None]:
+    """Parse nhiều chuỗi thời gian với cùng một mốc crawl `anchor`."""
+    anchor = anchor or datetime.now()
+    results: List[datetime | None] = []
+    for t in texts:
+        offset = _relative_offset(t) if t else None
+        results.append(anchor - offset if offset is not None else None)
+    return results
+
+
+def strip_detail_snippets_batch(texts: Iterable[str], snippets_list: Iterable[list[str]]) -> List[str]:
+    return [strip_detail_snippets_from_text(t, s) for t, s in zip(texts, snippets_list)]
@@ -0,0 +1,189 @@
+"""
+Tải ảnh review về kho lưu trữ local theo nội dung (content-addressed)
+URL background-image của Google hết hạn nên ảnh được tải một lần, lưu theo sha256
+và map review -> blob trong bảng review_photo.
+
+Bật bằng DOWNLOAD_PHOTOS=1; cấu hình thêm qua PHOTO_STORE_DIR, PHOTO_SIZE,
+PHOTO_PER_HOST_LIMIT, PHOTO_RETRIES.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("crawler.photos")
+
+# Hậu tố kích thước của googleusercontent, ví dụ "=w600-h450-p-k-no" hoặc "=s1024"
+_SIZE_SUFFIX_RE = re.compile(r"=[swh]\d+[^/?#=]*$")
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PhotoBlob(NamedTuple):
+    sha256: str
+    path: str
+    content_type: str
+    size_bytes: int
+    existed: bool
+
+
+def resize_url(url: str, size: Optional[int]) -> str:
+    """Thêm gợi ý kích thước (cạnh dài nhất) cho ảnh googleusercontent"""
+    if not size or "googleusercontent.com" not in urlparse(url).netloc:
+        return url
+    if _SIZE_SUFFIX_RE.search(url):
+        return _SIZE_SUFFIX_RE.sub(f"=s{size}", url)
+    return f"{url}=s{size}"
+
+
+class PhotoStore:
+    """Kho ảnh theo nội dung: <root>/ab/cd/<sha256><ext>, ghi nguyên tử và tự dedupe"""
+
+    def __init__(self, root: str = "photo_store"):
+        self.root = root
+
+    def path_for(self, sha256: str, ext: str = "") -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256 + ext)
+
+    def put(self, data: bytes, content_type: str = "") -> PhotoBlob:
+        sha256 = hashlib.sha256(data).hexdigest()
+        ext = ""
+        if content_type:
+            ext = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+        path = self.path_for(sha256, ext)
+        if os.path.exists(path):
+            return PhotoBlob(sha256, path, content_type, len(data), True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return PhotoBlob(sha256, path, content_type, len(data), False)
+
+
+class PhotoDownloader:
+    def __init__(self, store: Optional[PhotoStore] = None, per_host_limit: int = 4, retries: int = 3,
+                 backoff_seconds: float = 0.5, size: Optional[int] = 1024, timeout: float = 20):
+        self.store = store or PhotoStore()
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.size = size
+        self.timeout = timeout
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        # Một Session với pool keep-alive HTTP/1.1 dùng chung cho mọi request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=per_host_limit)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"downloaded": 0, "deduplicated": 0, "failed": 0, "bytes": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["PhotoDownloader"]:
+        if os.getenv("DOWNLOAD_PHOTOS", "0") != "1":
+            return None
+        return cls(
+            store=PhotoStore(os.getenv("PHOTO_STORE_DIR", "photo_store")),
+            per_host_limit=int(os.getenv("PHOTO_PER_HOST_LIMIT", 4)),
+            retries=int(os.getenv("PHOTO_RETRIES", 3)),
+            size=int(os.getenv("PHOTO_SIZE", 1024)) or None,
+        )
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    def _get(self, url: str) -> requests.Response:
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code in _RETRY_STATUSES:
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+        response.raise_for_status()
+        return response
+
+    async def fetch(self, url: str) -> PhotoBlob:
+        """Tải một ảnh (có retry với backoff) và lưu vào store"""
+        target = resize_url(url, self.size)
+        async with self._host_limit(target):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await asyncio.to_thread(self._get, target)
+                    break
+                except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                    status = getattr(getattr(e, "response", None), "status_code", None)
+                    retryable = status is None or status in _RETRY_STATUSES
+                    if not retryable or attempt == self.retries:
+                        raise
+                    await asyncio.sleep(self.backoff_seconds * (2 ** attempt))
+
+        blob = await asyncio.to_thread(self.store.put, response.content,
+                                       response.headers.get("Content-Type", ""))
+        self.stats["deduplicated" if blob.existed else "downloaded"] += 1
+        self.stats["bytes"] += blob.size_bytes
+        return blob
+
+    async def download_review_photos(self, reviews: List[dict]) -> List[dict]:
+        """Tải ảnh của các review; trả về các dòng review_photo đã tải thành công"""
+        jobs = []
+        for review in reviews:
+            for position, url in enumerate(review.get("photos") or []):
+                jobs.append((review.get("review_id"), position, url))
+
+        async def run(review_id, position, url):
+            try:
+                blob = await self.fetch(url)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning("Error downloading photo %s: %s", url, e)
+                return None
+            return {"review_id": review_id, "position": position, "source_url": url, "blob": blob}
+
+        started = time.monotonic()
+        rows = [row for row in await asyncio.gather(*(run(*job) for job in jobs)) if row]
+        if jobs:
+            logger.info("📷 Downloaded %d/%d photos in %.1fs", len(rows), len(jobs), time.monotonic() - started)
+        return rows
+
+    def close(self):
+        self.session.close()
+
+
+def save_photo_rows(conn, rows: List[dict]):
+    """Ghi photo_blob và review_photo cho các ảnh đã tải"""
+    cursor = conn.cursor()
+    try:
+        for row in rows:
+            blob = row["blob"]
+            cursor.execute("""
+                INSERT INTO photo_blob (sha256, path, content_type, size_bytes)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (sha256) DO NOTHING
+            """, (blob.sha256, blob.path, blob.content_type, blob.size_bytes))
+            cursor.execute("""
+                INSERT INTO review_photo (review_id, position, source_url, sha256)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (review_id, position) DO UPDATE
+                SET source_url = EXCLUDED.source_url, sha256 = EXCLUDED.sha256
+            """, (row["review_id"], row["position"], row["source_url"], blob.sha256))
+        conn.commit()
+    except Exception as e:
+        logger.error("Error saving photo rows: %s", e)
+        conn.rollback()
+    finally:
+        cursor.close()
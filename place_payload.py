@@ -0,0 +1,219 @@
+"""
+Đọc thông tin place từ payload khởi tạo nhúng trong HTML của trang Maps, không cần Chromium
+HTML ban đầu của /maps/place/... có `window.APP_INITIALIZATION_STATE=[...]`; bên trong là một
+chuỗi JSON bắt đầu bằng ")]}'" chứa mảng place (tên, rating, số review, địa chỉ, website,
+điện thoại, giờ mở cửa, toạ độ). Vị trí các trường không được Google công bố và có thể đổi,
+nên mọi truy cập đều qua `_dig` và place thiếu trường bắt buộc sẽ được crawl lại bằng
+Playwright (xem crawl_places_fast).
+
+PayloadFetcher tải HTML bằng một requests.Session có pool keep-alive dùng chung, chạy trong
+thread với giới hạn song song và khoảng cách tối thiểu giữa hai request.
+Cấu hình: FAST_PATH_CONCURRENCY (mặc định 8), FAST_PATH_INTERVAL (giây, mặc định 0.2).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from concurrency import NavigationRateLimiter
+from parsing import parse_coordinates, parse_hours_text, weekday_index
+
+logger = logging.getLogger("crawler.fast_path")
+
+_APP_STATE_RE = re.compile(r"window\.APP_INITIALIZATION_STATE\s*=\s*")
+_XSSI_PREFIX = ")]}'"
+
+# Vị trí các trường trong mảng place
+PLACE_FIELDS = {
+    "name": (11,),
+    "rating": (4, 7),
+    "review_count": (4, 8),
+    "address": (39,),
+    "website": (7, 0),
+    "phone": (178, 0, 0),
+    "lat": (9, 2),
+    "lng": (9, 3),
+}
+_HOURS_PATH = (34, 1)
+
+# Trường phải có để không cần Playwright, theo bước crawl
+REQUIRED_FIELDS = {
+    "overview": ("address", "rating", "review_count"),
+    "hours": ("business_hours",),
+}
+
+_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
+    "Accept-Language": "vi-VN,vi;q=0.9,en;q=0.4",
+}
+
+
+def _dig(data: Any, *path: int) -> Any:
+    """data[i][j]... hoặc None nếu sai kiểu / ngoài mảng"""
+    for index in path:
+        if not isinstance(data, list) or not -len(data) <= index < len(data):
+            return None
+        data = data[index]
+    return data
+
+
+def _strings(data: Any, depth: int = 0) -> Iterable[str]:
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, list) and depth < 8:
+        for item in data:
+            yield from _strings(item, depth + 1)
+
+
+def extract_app_state(html: str) -> Optional[list]:
+    """Mảng APP_INITIALIZATION_STATE trong HTML; None nếu không có"""
+    match = _APP_STATE_RE.search(html or "")
+    if not match:
+        return None
+    try:
+        state, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except ValueError:
+        return None
+    return state if isinstance(state, list) else None
+
+
+def find_place_array(state: list) -> Optional[list]:
+    """Mảng place trong các chuỗi JSON ")]}'" của state (mảng có tên ở vị trí 11)"""
+    for text in _strings(state):
+        if not text.startswith(_XSSI_PREFIX):
+            continue
+        try:
+            decoded = json.loads(text[len(_XSSI_PREFIX):])
+        except ValueError:
+            continue
+        place = _dig(decoded, 6)
+        if isinstance(_dig(place, 11), str):
+            return place
+    return None
+
+
+def _payload_hours(entries: Any) -> Dict[str, str]:
+    """[[ngày, ..., [giờ...]], ...] -> {"Thứ Hai": "07:00–22:00", ...} (chỉ giữ giờ parse được)"""
+    hours = {}
+    for entry in entries if isinstance(entries, list) else []:
+        day = _dig(entry, 0)
+        if not isinstance(day, str) or weekday_index(day) is None:
+            continue
+        texts = [text for text in _strings(entry[1:]) if parse_hours_text(text) is not None]
+        if texts:
+            hours[day] = ", ".join(dict.fromkeys(texts))
+    return hours
+
+
+def decode_place(html: str) -> Optional[dict]:
+    """Các trường của place từ HTML; None nếu không tìm thấy payload"""
+    state = extract_app_state(html)
+    place = find_place_array(state) if state else None
+    if place is None:
+        return None
+    fields = {field: _dig(place, *path) for field, path in PLACE_FIELDS.items()}
+    if not isinstance(fields["rating"], (int, float)):
+        fields["rating"] = None
+    if not isinstance(fields["review_count"], int):
+        fields["review_count"] = None
+    for field in ("address", "website", "phone"):
+        if not isinstance(fields[field], str) or not fields[field].strip():
+            fields[field] = None
+    if not all(isinstance(fields[key], (int, float)) for key in ("lat", "lng")):
+        fields["lat"] = fields["lng"] = None
+    fields["business_hours"] = _payload_hours(_dig(place, *_HOURS_PATH))
+    return fields
+
+
+def missing_fields(fields: dict, stages: Iterable[str]) -> List[str]:
+    return [field for stage in stages for field in REQUIRED_FIELDS.get(stage, ()) if not fields.get(field)]
+
+
+class PayloadFetcher:
+    def __init__(self, concurrency: int = 8, min_interval: float = 0.2, timeout: float = 20,
+                 max_consecutive_blocks: int = 3):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_consecutive_blocks = max_consecutive_blocks
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limiter = NavigationRateLimiter(min_interval)
+        self._consecutive_blocks = 0
+        self.disabled = False
+        self.session = requests.Session()
+        self.session.headers.update(_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "PayloadFetcher":
+        return cls(
+            concurrency=int(os.getenv("FAST_PATH_CONCURRENCY", 8)),
+            min_interval=float(os.getenv("FAST_PATH_INTERVAL", 0.2)),
+        )
+
+    def _count(self, key: str) -> None:
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _get(self, url: str) -> Tuple[int, str, Optional[dict]]:
+        # Decode HTML (~1 MB) cũng chạy trong thread, không chặn event loop
+        response = self.session.get(url, timeout=self.timeout)
+        fields = decode_place(response.text) if response.status_code == 200 else None
+        return response.status_code, response.url, fields
+
+    async def fetch(self, url: str, target_url: Optional[str] = None,
+                    stages: Iterable[str] = ("overview",)) -> Tuple[str, Optional[dict], Optional[str], float]:
+        """(url, các trường của place, None, giây) hoặc (url, None, lý do cần Playwright, giây)"""
+        if self.disabled:
+            return url, None, "disabled", 0.0
+        async with self._semaphore:
+            if self.disabled:
+                return url, None, "disabled", 0.0
+            await self._rate_limiter.wait()
+            started = time.monotonic()
+            try:
+                status, final_url, fields = await asyncio.to_thread(self._get, target_url or url)
+            except requests.RequestException as e:
+                self._count("error")
+                return url, None, f"error: {e}", time.monotonic() - started
+        elapsed = time.monotonic() - started
+
+        if status == 429 or "/sorry/" in final_url:
+            self._count("blocked")
+            self._consecutive_blocks += 1
+            if self._consecutive_blocks >= self.max_consecutive_blocks and not self.disabled:
+                self.disabled = True
+                logger.warning("🚫 HTTP fast path blocked %d times in a row, using Playwright for the rest",
+                               self._consecutive_blocks)
+            return url, None, "blocked", elapsed
+        self._consecutive_blocks = 0
+        if status != 200:
+            self._count(f"http_{status}")
+            return url, None, f"http_{status}", elapsed
+
+        if fields is None or not fields["name"]:
+            self._count("no_payload")
+            return url, None, "no_payload", elapsed
+        # Cùng thứ tự với _extract_place: toạ độ trong URL trước, payload sau
+        coordinates = parse_coordinates(url) or parse_coordinates(final_url)
+        if coordinates:
+            fields["lat"], fields["lng"] = coordinates
+        missing = missing_fields(fields, stages)
+        if missing:
+            self._count("missing_fields")
+            return url, None, f"missing {', '.join(missing)}", elapsed
+        self._count("ok")
+        return url, fields, None, elapsed
+
+    def report(self) -> None:
+        if self.stats:
+            logger.info("⚡ HTTP fast path: %s", self.stats)
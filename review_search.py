@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tìm kiếm full-text trên review.text (không dấu, không phân biệt hoa thường)
+Dùng GIN index trên review.search_vector; chế độ "substring" dùng trigram index
+trên immutable_unaccent(lower(text)) cho các cụm từ không khớp theo từ.
+
+Cách dùng:
+    python review_search.py "phở bò" --limit 20 --page 1
+"""
+
+import argparse
+from typing import Dict, List
+
+from psycopg2.extras import RealDictCursor
+
+_RESULT_COLUMNS = """
+    r.id, r.review_id, r.rating, r.text, r.time, r.time_datetime,
+    p.id AS place_id, p.name AS place_name, p.address AS place_address, p.url AS place_url
+"""
+
+FTS_QUERY = f"""
+    WITH q AS (
+        SELECT plainto_tsquery('simple', immutable_unaccent(lower(%(query)s))) AS tsq
+    )
+    SELECT {_RESULT_COLUMNS}, ts_rank_cd(r.search_vector, q.tsq) AS rank
+    FROM q, review r
+    JOIN place p ON p.id = r.place_id
+    WHERE r.search_vector @@ q.tsq
+    ORDER BY rank DESC, r.id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+SUBSTRING_QUERY = f"""
+    WITH q AS (
+        SELECT immutable_unaccent(lower(%(query)s)) AS needle,
+               immutable_unaccent(lower(%(pattern)s)) AS pattern
+    )
+    SELECT {_RESULT_COLUMNS}, word_similarity(q.needle, immutable_unaccent(lower(r.text))) AS rank
+    FROM q, review r
+    JOIN place p ON p.id = r.place_id
+    WHERE immutable_unaccent(lower(r.text)) LIKE '%%' || q.pattern || '%%' ESCAPE '\\'
+    ORDER BY rank DESC, r.id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+
+def escape_like(text: str) -> str:
+    """Escape \\, % và _ để khớp nguyên văn trong LIKE ... ESCAPE '\\'"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_reviews(conn, query: str, limit: int = 20, page: int = 1, mode: str = "fts") -> List[Dict]:
+    """Trả về reviews khớp `query`, xếp hạng theo độ liên quan, kèm thông tin place.
+
+    mode="fts" khớp theo từ (phở bò ~ "pho bo"); mode="substring" khớp chuỗi con
+    bất kỳ nhờ trigram index.
+    """
+    if not query or not query.strip():
+        return []
+    sql = FTS_QUERY if mode == "fts" else SUBSTRING_QUERY
+    params = {"query": query.strip(), "pattern": escape_like(query.strip()),
+              "limit": limit, "offset": max(page - 1, 0) * limit}
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def main():
+    from main import get_db_config
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Search review text")
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--mode", choices=["fts", "substring"], default="fts")
+    args = parser.parse_args()
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+    try:
+        results = search_reviews(conn, args.query, limit=args.limit, page=args.page, mode=args.mode)
+    finally:
+        conn.close()
+
+    print(f"🔍 {len(results)} results for '{args.query}' (page {args.page})")
+    for row in results:
+        snippet = (row['text'] or '')[:120].replace('\n', ' ')
+        print(f"[{row['rank']:.3f}] {row['place_name']} ⭐{row['rating']} - {snippet}")
+
+
+if __name__ == "__main__":
+    main()
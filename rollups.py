@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Rollup rating và điểm thành phần của review theo place và tháng (bảng review_rollup)
+Mỗi dòng giữ count, sum và histogram 1..5 của rating, Đồ ăn, Dịch vụ, Bầu không khí.
+insert_reviews cộng dồn batch review vừa insert trong cùng transaction (apply_review_batch);
+--recompute tính lại toàn bộ (hoặc một số place) từ bảng review, ví dụ sau khi prune partition.
+
+Cách dùng:
+    python rollups.py 42                 # tổng hợp của place 42
+    python rollups.py 42 --monthly
+    python rollups.py --recompute
+"""
+
+import argparse
+from datetime import date
+from typing import Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+
+# Tên metric -> nhãn trong review_details (rating là cột riêng)
+METRICS = {
+    "rating": None,
+    "food": "Đồ ăn",
+    "service": "Dịch vụ",
+    "atmosphere": "Bầu không khí",
+}
+
+# Tháng dùng cho review không có time_datetime
+UNKNOWN_MONTH = date(1970, 1, 1)
+
+_ADD_COLUMNS = ["review_count"] + [f"{m}_{part}" for m in METRICS for part in ("count", "sum")]
+
+APPLY_DELTA_SQL = f"""
+    INSERT INTO review_rollup SELECT * FROM review_rollup_delta(%s, %s)
+    ON CONFLICT (place_id, month) DO UPDATE SET
+        {", ".join(f"{col} = review_rollup.{col} + EXCLUDED.{col}" for col in _ADD_COLUMNS)},
+        {", ".join(f"{m}_hist = int_array_add(review_rollup.{m}_hist, EXCLUDED.{m}_hist)" for m in METRICS)},
+        updated_at = EXCLUDED.updated_at
+"""
+
+_SUMMARY_COLUMNS = ", ".join(
+    ["sum(review_count)::INTEGER AS review_count"]
+    + [f"sum({m}_count)::INTEGER AS {m}_count, sum({m}_sum) AS {m}_sum, "
+       f"int_array_sum({m}_hist) AS {m}_hist" for m in METRICS]
+)
+
+SUMMARY_QUERY = f"""
+    SELECT place_id, {_SUMMARY_COLUMNS}
+    FROM review_rollup
+    WHERE place_id = ANY(%(place_ids)s)
+      AND (%(since)s::DATE IS NULL OR month >= %(since)s::DATE)
+    GROUP BY place_id
+"""
+
+MONTHLY_QUERY = """
+    SELECT * FROM review_rollup
+    WHERE place_id = %(place_id)s
+      AND (%(since)s::DATE IS NULL OR month >= %(since)s::DATE)
+    ORDER BY month
+"""
+
+
+def apply_review_batch(cursor, place_id: int, review_ids: List[int]) -> None:
+    """Cộng các review vừa insert vào rollup; gọi trước commit của insert_reviews"""
+    if review_ids:
+        cursor.execute(APPLY_DELTA_SQL, (place_id, list(review_ids)))
+
+
+def recompute(conn, place_ids: Optional[List[int]] = None) -> int:
+    """Tính lại rollup từ bảng review (mọi place, hoặc chỉ `place_ids`); trả về số dòng rollup"""
+    cursor = conn.cursor()
+    try:
+        if place_ids is None:
+            cursor.execute("DELETE FROM review_rollup")
+            cursor.execute("INSERT INTO review_rollup SELECT * FROM review_rollup_delta(NULL, NULL)")
+            rows = cursor.rowcount
+        else:
+            cursor.execute("DELETE FROM review_rollup WHERE place_id = ANY(%s)", (list(place_ids),))
+            rows = 0
+            for place_id in place_ids:
+                cursor.execute("INSERT INTO review_rollup SELECT * FROM review_rollup_delta(%s, NULL)",
+                               (place_id,))
+                rows += cursor.rowcount
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _with_averages(row: dict) -> dict:
+    for metric in METRICS:
+        count = row[f"{metric}_count"]
+        row[f"{metric}_avg"] = round(float(row[f"{metric}_sum"]) / count, 2) if count else None
+    return row
+
+
+def place_summaries(conn, place_ids: List[int], since: Optional[date] = None) -> Dict[int, dict]:
+    """Tổng hợp theo place (từ tháng `since` nếu có): count, avg và histogram của từng metric"""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(SUMMARY_QUERY, {"place_ids": list(place_ids), "since": since})
+        return {row["place_id"]: _with_averages(dict(row)) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def monthly(conn, place_id: int, since: Optional[date] = None) -> List[dict]:
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(MONTHLY_QUERY, {"place_id": place_id, "since": since})
+        return [_with_averages(dict(row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def main():
+    from main import get_db_config
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Show or rebuild review rating rollups")
+    parser.add_argument("place_id", type=int, nargs="*")
+    parser.add_argument("--monthly", action="store_true", help="One line per month")
+    parser.add_argument("--since", type=date.fromisoformat, help="First month, e.g. 2024-01-01")
+    parser.add_argument("--recompute", action="store_true",
+                        help="Rebuild rollups from the review table (given places, or all)")
+    args = parser.parse_args()
+
+    db_config = get_db_config()
+    if 'connection_string' in db_config:
+        conn = psycopg2.connect(db_config['connection_string'])
+    else:
+        conn = psycopg2.connect(**db_config)
+    try:
+        if args.recompute:
+            rows = recompute(conn, args.place_id or None)
+            print(f"🔁 Recomputed {rows} rollup rows")
+            return
+        for place_id in args.place_id:
+            rows = monthly(conn, place_id, args.since) if args.monthly else \
+                list(place_summaries(conn, [place_id], args.since).values())
+            for row in rows:
+                month = row.get("month")
+                label = "" if month is None else ("unknown " if month == UNKNOWN_MONTH else f"{month:%Y-%m} ")
+                scores = "  ".join(f"{m} {row[f'{m}_avg']} ({row[f'{m}_count']}) {row[f'{m}_hist']}"
+                                   for m in METRICS)
+                print(f"📊 place {place_id} {label}| {row['review_count']} reviews | {scores}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Registry selector với thống kê hit/miss theo từng trường
+Mỗi trường (ví dụ "address", "reviews_tab") có một danh sách selector ứng viên; registry
+thử theo tỉ lệ thành công gần đây (EWMA) thay vì thứ tự cố định, lưu thống kê ra file
+giữa các lần chạy và cảnh báo khi tỉ lệ hit của một trường sụt mạnh (Google đổi markup).
+
+Cấu hình: SELECTOR_STATS_FILE (mặc định selector_stats.json, để trống = không lưu).
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger("crawler.selectors")
+
+# Điểm của selector chưa có thống kê; selector bằng điểm giữ thứ tự gốc trong code
+DEFAULT_SCORE = 0.5
+
+
+class SelectorRegistry:
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.1, field_alpha: float = 0.05,
+                 drift_min_samples: int = 20, drift_ratio: float = 0.2, save_interval: float = 60):
+        self.path = path
+        self.alpha = alpha
+        self.field_alpha = field_alpha
+        self.drift_min_samples = drift_min_samples
+        self.drift_ratio = drift_ratio
+        self.save_interval = save_interval
+        # field -> selector -> {"score", "hits", "misses"}
+        self.selectors: Dict[str, Dict[str, dict]] = {}
+        # field -> {"lookups", "hits", "recent"}
+        self.fields: Dict[str, dict] = {}
+        self.drifted: set = set()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if path:
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "SelectorRegistry":
+        return cls(path=os.getenv("SELECTOR_STATS_FILE", "selector_stats.json") or None)
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load selector stats from %s: %s", self.path, e)
+            return
+        self.selectors = data.get("selectors", {})
+        self.fields = data.get("fields", {})
+        self.drifted = set(data.get("drifted", []))
+
+    def save(self) -> None:
+        """Ghi thống kê ra file (ghi file tạm rồi rename)"""
+        if not self.path or not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"selectors": self.selectors, "fields": self.fields,
+                           "drifted": sorted(self.drifted)}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save selector stats to %s: %s", self.path, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def ordered(self, field: str, candidates: Iterable[str]) -> List[str]:
+        """Các selector của `field` theo điểm giảm dần"""
+        stats = self.selectors.get(field)
+        if not stats:
+            return list(candidates)
+        return sorted(candidates, key=lambda sel: -stats.get(sel, {}).get("score", DEFAULT_SCORE))
+
+    def observe(self, field: str, tried: List[str], hit: Optional[str]) -> None:
+        """Ghi nhận một lần tìm `field`: các selector trong `tried` đều miss trừ `hit`"""
+        stats = self.selectors.setdefault(field, {})
+        for sel in tried:
+            entry = stats.setdefault(sel, {"score": DEFAULT_SCORE, "hits": 0, "misses": 0})
+            success = sel == hit
+            entry["hits" if success else "misses"] += 1
+            entry["score"] += self.alpha * ((1.0 if success else 0.0) - entry["score"])
+
+        summary = self.fields.setdefault(field, {"lookups": 0, "hits": 0, "recent": None})
+        summary["lookups"] += 1
+        summary["hits"] += hit is not None
+        value = 1.0 if hit is not None else 0.0
+        if summary["recent"] is None:
+            summary["recent"] = value
+        else:
+            summary["recent"] += self.field_alpha * (value - summary["recent"])
+        self._check_drift(field, summary)
+
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def _check_drift(self, field: str, summary: dict) -> None:
+        if summary["lookups"] < self.drift_min_samples:
+            return
+        lifetime = summary["hits"] / summary["lookups"]
+        if lifetime > 0 and summary["recent"] < self.drift_ratio * lifetime:
+            if field not in self.drifted:
+                self.drifted.add(field)
+                logger.warning("🧭 Selector drift on '%s': recent hit rate %.0f%% vs %.0f%% overall, "
+                               "candidates %s", field, summary["recent"] * 100, lifetime * 100,
+                               list(self.selectors.get(field, {})))
+        elif field in self.drifted and summary["recent"] >= 0.5 * lifetime:
+            self.drifted.discard(field)
+            logger.info("🧭 Selectors for '%s' recovered", field)
+
+    def report(self) -> Dict[str, dict]:
+        """Tỉ lệ hit của từng trường và selector tốt nhất hiện tại"""
+        report = {}
+        for field, summary in self.fields.items():
+            ordered = self.ordered(field, self.selectors.get(field, {}))
+            report[field] = {
+                "lookups": summary["lookups"],
+                "hit_rate": round(summary["hits"] / summary["lookups"], 3) if summary["lookups"] else None,
+                "recent": round(summary["recent"], 3) if summary["recent"] is not None else None,
+                "best": ordered[0] if ordered else None,
+                "drifted": field in self.drifted,
+            }
+        return report
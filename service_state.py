@@ -0,0 +1,47 @@
+"""
+Trạng thái khởi động của service cho các probe /live và /ready
+Ghi lại thời điểm (giây kể từ khi process start) của từng bước khởi động.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+PROCESS_STARTED = time.time()
+
+# Các bước bắt buộc trước khi crawler thực sự có thể làm việc
+READY_STAGES = ("database", "schema", "browser")
+
+
+class ServiceState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def mark(self, stage: str) -> float:
+        """Ghi nhận một bước đã xong (chỉ lần đầu); trả về số giây kể từ khi start"""
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = round(time.time() - PROCESS_STARTED, 3)
+            return self.stages[stage]
+
+    def fail(self, error: str):
+        with self._lock:
+            self.error = error
+
+    @property
+    def ready(self) -> bool:
+        return self.error is None and all(stage in self.stages for stage in READY_STAGES)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": self.error is None and all(stage in self.stages for stage in READY_STAGES),
+                "uptime_seconds": round(time.time() - PROCESS_STARTED, 3),
+                "stages": dict(self.stages),
+                "error": self.error,
+            }
+
+
+state = ServiceState()
@@ -0,0 +1,138 @@
+"""
+Sink nhận từng place do crawler yield ra
+Mỗi sink có `async write(place) -> bool` và `async close()`. Crawler đẩy từng place
+qua các sink ngay khi crawl xong rồi bỏ đi, nên bộ nhớ không phụ thuộc số URL.
+
+CRAWL_SINKS chọn sink, ví dụ "postgres,ndjson" (Postgres sink nằm trong crawler).
+NDJSON_DIR, NDJSON_MAX_MB và NDJSON_PREFIX cấu hình file NDJSON gzip xoay vòng.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import threading
+from datetime import date, datetime
+from typing import Optional
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def place_to_json(place: dict) -> str:
+    return json.dumps(place, ensure_ascii=False, default=_json_default)
+
+
+class NdjsonSink:
+    """Ghi mỗi place một dòng JSON vào file gzip, sang file mới khi vượt `max_bytes`
+
+    File đang ghi có đuôi .part và chỉ được đổi tên khi đóng, nên reader chỉ thấy file hoàn chỉnh.
+    """
+
+    name = "ndjson"
+
+    def __init__(self, directory: str = "exports/ndjson", max_bytes: int = 64 * 1024 * 1024,
+                 prefix: str = "places"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        # pid: các process của supervisor (và process được khởi động lại) không trùng tên file
+        self.run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self.files_written = 0
+        self._file = None
+        self._path: Optional[str] = None
+        self._bytes = 0
+
+    @classmethod
+    def from_env(cls) -> "NdjsonSink":
+        return cls(
+            directory=os.getenv("NDJSON_DIR", "exports/ndjson"),
+            max_bytes=int(float(os.getenv("NDJSON_MAX_MB", 64)) * 1024 * 1024),
+            prefix=os.getenv("NDJSON_PREFIX", "places"),
+        )
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.files_written += 1
+        self._path = os.path.join(self.directory,
+                                  f"{self.prefix}-{self.run_id}-{self.files_written:04d}.ndjson.gz")
+        self._file = gzip.open(self._path + ".part", "wt", encoding="utf-8")
+        self._bytes = 0
+
+    def _rotate(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path + ".part", self._path)
+        self._file = None
+
+    def _write_line(self, line: str):
+        if self._file is None:
+            self._open()
+        self._file.write(line)
+        self._bytes += len(line)
+        # Kích thước tính trên dữ liệu chưa nén
+        if self._bytes >= self.max_bytes:
+            self._rotate()
+
+    async def write(self, place: dict) -> bool:
+        line = place_to_json(place) + "\n"
+        await asyncio.to_thread(self._write_line, line)
+        return True
+
+    async def close(self):
+        await asyncio.to_thread(self._rotate)
+
+
+class StdoutSink:
+    """Mỗi place một dòng JSON ra stdout, để pipe sang công cụ khác
+
+    Sink ghi qua một bản dup của fd 1 và không đụng tới fd 1 của process, nên log vẫn đi theo
+    cấu hình logging: đặt LOG_STREAM=stderr để stdout chỉ chứa JSON.
+    """
+
+    name = "stdout"
+
+    def __init__(self):
+        sys.stdout.flush()
+        try:
+            self.stream = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+        except (AttributeError, OSError, ValueError):
+            # stdout không phải file thật (bị thay trong test...): ghi vào buffer của nó
+            self.stream = getattr(sys.stdout, "buffer", None)
+            self._owned = False
+        else:
+            self._owned = True
+        self._lock = threading.Lock()
+
+    def _write_line(self, line: bytes):
+        with self._lock:
+            if self.stream is None:
+                sys.stdout.write(line.decode("utf-8"))
+                sys.stdout.flush()
+                return
+            self.stream.write(line)
+            self.stream.flush()
+
+    async def write(self, place: dict) -> bool:
+        line = (place_to_json(place) + "\n").encode("utf-8")
+        await asyncio.to_thread(self._write_line, line)
+        return True
+
+    def _close(self):
+        with self._lock:
+            if self.stream is None:
+                return
+            if self._owned:
+                self.stream.close()
+            else:
+                self.stream.flush()
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
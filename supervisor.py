@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Supervisor chạy crawler trên nhiều process, mỗi process một event loop và một Chromium
+URL được chia shard theo hash nên mỗi shard cố định giữa các lần chạy và có file checkpoint
+riêng (crawl_checkpoint.shard<i>-of-<K>.json), cũng như file NDJSON và thống kê selector; process chết được khởi động lại và tiếp tục
+từ checkpoint của shard, URL đang crawl dở sẽ được crawl lại.
+
+Cách dùng:
+    python supervisor.py --processes 8
+    python supervisor.py --processes 8 --max-restarts 10
+Mỗi process vẫn đọc CRAWL_CONCURRENCY, CRAWL_PROFILE, CRAWL_SINKS... như main.py.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+from crawl_logging import place_context, setup_logging
+
+logger = logging.getLogger("crawler.supervisor")
+
+
+def shard_of(url: str, count: int) -> int:
+    """Shard cố định của một URL (không phụ thuộc PYTHONHASHSEED)"""
+    digest = hashlib.sha1(url.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def parse_shard(spec: Optional[str]) -> Optional[tuple]:
+    """CRAWL_SHARD="i/K" -> (i, K)"""
+    if not spec:
+        return None
+    index, count = (int(part) for part in spec.split("/", 1))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid CRAWL_SHARD: {spec}")
+    return index, count
+
+
+def shard_file(path: str, index: int, count: int) -> str:
+    """crawl_checkpoint.json -> crawl_checkpoint.shard<i>-of-<K>.json"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.shard{index}-of-{count}{ext or '.json'}"
+
+
+def shard_checkpoint_file(index: int, count: int) -> str:
+    return shard_file(os.getenv("CHECKPOINT_FILE", "crawl_checkpoint.json"), index, count)
+
+
+async def _crawl_shard() -> None:
+    from playwright.async_api import async_playwright
+    import main
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True, args=main.BROWSER_ARGS)
+        try:
+            await main.run_crawler(playwright, browser)
+        finally:
+            await browser.close()
+
+
+def _shard_main(index: int, count: int) -> None:
+    """Entry point của process con (spawn): checkpoint, file NDJSON, thống kê selector và
+    context log riêng cho shard"""
+    os.environ["CRAWL_SHARD"] = f"{index}/{count}"
+    os.environ["CHECKPOINT_FILE"] = shard_checkpoint_file(index, count)
+    os.environ["NDJSON_PREFIX"] = f"{os.getenv('NDJSON_PREFIX', 'places')}-shard{index}-of-{count}"
+    stats_file = os.getenv("SELECTOR_STATS_FILE", "selector_stats.json")
+    if stats_file:
+        shard_stats = shard_file(stats_file, index, count)
+        # Lần đầu chạy với K shard: bắt đầu từ thống kê chung thay vì từ đầu
+        if not os.path.exists(shard_stats) and os.path.exists(stats_file):
+            shutil.copyfile(stats_file, shard_stats)
+        os.environ["SELECTOR_STATS_FILE"] = shard_stats
+    setup_logging()
+    with place_context(shard=index):
+        asyncio.run(_crawl_shard())
+
+
+class ShardProcess:
+    def __init__(self, ctx, index: int, count: int):
+        self.ctx = ctx
+        self.index = index
+        self.count = count
+        self.restarts = 0
+        self.process = None
+        self.done = False
+        self.next_start = 0.0
+
+    def start(self) -> None:
+        self.process = self.ctx.Process(target=_shard_main, args=(self.index, self.count),
+                                        name=f"crawl-shard-{self.index}")
+        self.process.start()
+        logger.info("🚀 Shard %d/%d started (pid %s)", self.index, self.count, self.process.pid)
+
+    def progress(self) -> Dict:
+        """Đọc checkpoint của shard (file có thể đang được ghi dở)"""
+        try:
+            with open(shard_checkpoint_file(self.index, self.count), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {"total": data.get("total_urls", 0), "processed": data.get("processed_urls", 0),
+                "failed": len(data.get("failed_urls", []))}
+
+
+def supervise(processes: int, max_restarts: int = 5, report_interval: float = 60) -> bool:
+    """Chạy `processes` shard tới khi tất cả xong; trả về False nếu có shard bỏ cuộc"""
+    import main
+
+    # Migration chạy một lần ở supervisor thay vì ở từng process
+    if not main.check_database_connection():
+        raise RuntimeError("Cannot connect to database. Please check your environment variables.")
+    main.create_tables()
+
+    ctx = multiprocessing.get_context("spawn")
+    shards = [ShardProcess(ctx, i, processes) for i in range(processes)]
+    for shard in shards:
+        shard.start()
+
+    gave_up: List[int] = []
+    last_report = time.monotonic()
+    try:
+        while any(not s.done for s in shards):
+            time.sleep(1)
+            for shard in shards:
+                if shard.done:
+                    continue
+                if shard.process is None:
+                    if time.monotonic() >= shard.next_start:
+                        shard.start()
+                    continue
+                if shard.process.is_alive():
+                    continue
+                code = shard.process.exitcode
+                shard.process = None
+                if code == 0:
+                    shard.done = True
+                    logger.info("✅ Shard %d/%d finished", shard.index, processes)
+                elif shard.restarts >= max_restarts:
+                    shard.done = True
+                    gave_up.append(shard.index)
+                    logger.error("❌ Shard %d/%d exited with code %s, giving up after %d restarts",
+                                 shard.index, processes, code, shard.restarts)
+                else:
+                    shard.restarts += 1
+                    delay = min(5 * 2 ** (shard.restarts - 1), 300)
+                    shard.next_start = time.monotonic() + delay
+                    logger.warning("💥 Shard %d/%d exited with code %s, restart %d/%d in %ds",
+                                   shard.index, processes, code, shard.restarts, max_restarts, delay)
+
+            if time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                _report(shards)
+    except KeyboardInterrupt:
+        logger.warning("Stopping shards...")
+        for shard in shards:
+            if shard.process is not None and shard.process.is_alive():
+                shard.process.terminate()
+        for shard in shards:
+            if shard.process is not None:
+                shard.process.join(timeout=30)
+        raise
+
+    _report(shards)
+    return not gave_up
+
+
+def _report(shards: List[ShardProcess]) -> None:
+    totals = {"total": 0, "processed": 0, "failed": 0}
+    for shard in shards:
+        for key, value in shard.progress().items():
+            totals[key] += value
+    restarts = sum(s.restarts for s in shards)
+    running = sum(1 for s in shards if s.process is not None and s.process.is_alive())
+    logger.info("📊 %d/%d URLs processed, %d failed | %d shards running, %d restarts",
+                totals["processed"], totals["total"], totals["failed"], running, restarts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the crawler across several processes")
+    parser.add_argument("--processes", type=int,
+                        default=int(os.getenv("CRAWL_PROCESSES", os.cpu_count() or 1)))
+    parser.add_argument("--max-restarts", type=int, default=5, help="Restarts per shard before giving up")
+    parser.add_argument("--report-interval", type=float, default=60, help="Seconds between progress reports")
+    args = parser.parse_args()
+
+    setup_logging()
+    ok = supervise(args.processes, args.max_restarts, args.report_interval)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
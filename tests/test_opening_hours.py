@@ -0,0 +1,101 @@
+"""
+Corpus giờ mở cửa đã gặp trên Maps: parsing.parse_hours_text, weekly_open_intervals, weekday_index
+Chạy từ thư mục gốc: python -m pytest tests (hoặc python -m unittest discover -s tests)
+Thêm mẫu mới vào CORPUS khi gặp định dạng lạ; benchmarks/bench_hours.py dùng lại corpus này.
+"""
+
+import unittest
+
+from parsing import MINUTES_PER_WEEK, parse_hours_text, weekday_index, weekly_open_intervals
+
+# (chuỗi giờ của một ngày, kết quả mong đợi) - phút từ 00:00 của ngày đó
+CORPUS = [
+    ("07:00–22:00", [(420, 1320)]),
+    ("7:00 - 22:00", [(420, 1320)]),
+    ("07:00 đến 22:00", [(420, 1320)]),
+    ("Từ 06:30 đến 10:30 và 16:00 đến 21:00", [(390, 630), (960, 1260)]),
+    ("06:00–10:00, 16:00–21:30", [(360, 600), (960, 1290)]),
+    ("18:00–02:00", [(1080, 1560)]),
+    ("10:00–00:00", [(600, 1440)]),
+    ("Mở cửa cả ngày", [(0, 1440)]),
+    ("Mở cửa 24 giờ", [(0, 1440)]),
+    ("Open 24 hours", [(0, 1440)]),
+    ("Đóng cửa", []),
+    ("Closed", []),
+    ("11 AM–2 PM", [(660, 840)]),
+    ("11–2 PM", [(660, 840)]),
+    ("5–11 PM", [(1020, 1380)]),
+    ("10:30 AM–12 AM", [(630, 1440)]),
+    ("9 SA–9 CH", [(540, 1260)]),
+    ("07:00–22:00 (Giờ có thể khác)", [(420, 1320)]),
+    ("07:00–22:00\nGiờ mở cửa có thể khác", [(420, 1320)]),
+    ("", None),
+    ("Liên hệ", None),
+    ("25:00–26:00", None),
+]
+
+# (business_hours, khoảng phút trong tuần mong đợi)
+WEEKLY_CORPUS = [
+    ({"Thứ Hai": "07:00–22:00", "Thứ Ba": "Đóng cửa"}, [(420, 1320)]),
+    ({"Chủ Nhật": "18:00–02:00"}, [(0, 120), (9720, 10080)]),
+    ({"Thứ Hai": "Mở cửa cả ngày", "Thứ Ba": "Mở cửa cả ngày"}, [(0, 2880)]),
+    ({"Thứ Hai": "20:00–02:00", "Thứ Ba": "00:00–03:00"}, [(1200, 1620)]),
+    ({"Thứ 7": "08:00–12:00", "CN": "08:00–12:00"}, [(7680, 7920), (9120, 9360)]),
+    ({"Monday": "9 AM–5 PM"}, [(540, 1020)]),
+    ({"Ngày lễ": "07:00–22:00"}, []),
+    (None, []),
+]
+
+# (nhãn ngày, chỉ số mong đợi; Thứ Hai = 0)
+WEEKDAY_CORPUS = [
+    ("Thứ Hai", 0),
+    ("thứ hai", 0),
+    ("Thứ 2", 0),
+    ("Thứ Bảy", 5),
+    ("Thứ 7", 5),
+    ("Chủ Nhật", 6),
+    ("Chủ nhật", 6),
+    ("CN", 6),
+    ("Monday", 0),
+    ("Sunday", 6),
+    ("Thứ Hai (Quốc Khánh)", 0),
+    ("Ngày lễ", None),
+    ("Thứ Tám", None),
+    ("", None),
+]
+
+
+class ParseHoursTextTest(unittest.TestCase):
+    def test_corpus(self):
+        for text, expected in CORPUS:
+            with self.subTest(text=text):
+                self.assertEqual(parse_hours_text(text), expected)
+
+    def test_past_midnight_close_is_after_1440(self):
+        self.assertEqual(parse_hours_text("22:00–03:00"), [(1320, 1620)])
+
+
+class WeekdayIndexTest(unittest.TestCase):
+    def test_corpus(self):
+        for label, expected in WEEKDAY_CORPUS:
+            with self.subTest(label=label):
+                self.assertEqual(weekday_index(label), expected)
+
+
+class WeeklyOpenIntervalsTest(unittest.TestCase):
+    def test_corpus(self):
+        for hours, expected in WEEKLY_CORPUS:
+            with self.subTest(hours=hours):
+                self.assertEqual(weekly_open_intervals(hours), expected)
+
+    def test_open_all_day_every_day_covers_the_week(self):
+        days = ["Thứ Hai", "Thứ Ba", "Thứ Tư", "Thứ Năm", "Thứ Sáu", "Thứ Bảy", "Chủ Nhật"]
+        self.assertEqual(weekly_open_intervals({day: "Mở cửa cả ngày" for day in days}),
+                         [(0, MINUTES_PER_WEEK)])
+
+    def test_past_midnight_spills_into_next_day(self):
+        self.assertEqual(weekly_open_intervals({"Thứ Sáu": "18:00–02:00"}), [(6840, 7320)])
+
+
+if __name__ == "__main__":
+    unittest.main()
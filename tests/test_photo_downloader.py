@@ -0,0 +1,140 @@
+"""
+PhotoDownloader với ảnh phục vụ bởi http.server trên localhost
+Chạy từ thư mục gốc: python -m pytest tests (hoặc python -m unittest discover -s tests)
+
+Server đóng vai HTTP proxy nên request tới lh3.googleusercontent.com đi qua nó mà không cần
+DNS; request line chứa URL đầy đủ, nên kiểm tra được hậu tố =s<size> sau khi rewrite.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from photo_downloader import PhotoDownloader, PhotoStore, resize_url
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"fake image bytes"
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        host = self.headers.get("Host")
+        with server.lock:
+            server.requests.append(self.path)
+            server.attempts[self.path] += 1
+            attempt = server.attempts[self.path]
+            server.in_flight[host] += 1
+            server.max_in_flight[host] = max(server.max_in_flight[host], server.in_flight[host])
+        try:
+            time.sleep(server.delay)
+            if "/missing" in self.path:
+                status = 404
+            elif "/flaky" in self.path and attempt <= server.failures:
+                status = 503
+            else:
+                status = 200
+            body = PNG if status == 200 else b"error"
+            self.send_response(status)
+            self.send_header("Content-Type", "image/png" if status == 200 else "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight[host] -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PhotoDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.attempts = Counter()
+        self.server.in_flight = Counter()
+        self.server.max_in_flight = Counter()
+        self.server.delay = 0.0
+        self.server.failures = 2
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.proxy = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.downloader = PhotoDownloader(PhotoStore(self.store_dir.name), per_host_limit=2, retries=3,
+                                          backoff_seconds=0.01, size=64, timeout=5)
+        self.downloader.session.trust_env = False
+        self.downloader.session.proxies = {"http": self.proxy}
+
+    def tearDown(self):
+        self.downloader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.store_dir.cleanup()
+
+    def test_resize_url(self):
+        base = "https://lh3.googleusercontent.com/p/AF1Qip"
+        self.assertEqual(resize_url(base + "=w600-h450-p-k-no", 1024), base + "=s1024")
+        self.assertEqual(resize_url(base, 1024), base + "=s1024")
+        self.assertEqual(resize_url(base + "=w600", None), base + "=w600")
+        self.assertEqual(resize_url("https://example.com/a.jpg", 1024), "https://example.com/a.jpg")
+
+    def test_size_suffix_is_rewritten_on_the_wire(self):
+        blob = asyncio.run(self.downloader.fetch("http://lh3.googleusercontent.com/p/photo=w600-h450-p-k-no"))
+        self.assertEqual(self.server.requests, ["http://lh3.googleusercontent.com/p/photo=s64"])
+        self.assertTrue(os.path.exists(blob.path))
+        self.assertTrue(blob.path.endswith(".png"))
+
+    def test_per_host_limit(self):
+        self.server.delay = 0.1
+        reviews = [
+            {"review_id": "a", "photos": [f"http://lh3.googleusercontent.com/p/a{i}" for i in range(4)]},
+            {"review_id": "b", "photos": [f"http://lh5.googleusercontent.com/p/b{i}" for i in range(4)]},
+        ]
+        rows = asyncio.run(self.downloader.download_review_photos(reviews))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(self.server.max_in_flight["lh3.googleusercontent.com"], 2)
+        self.assertEqual(self.server.max_in_flight["lh5.googleusercontent.com"], 2)
+
+    def test_retries_5xx(self):
+        url = "http://lh3.googleusercontent.com/p/flaky"
+        asyncio.run(self.downloader.fetch(url))
+        self.assertEqual(self.server.attempts[url + "=s64"], 3)
+        self.assertEqual(self.downloader.stats["downloaded"], 1)
+
+    def test_gives_up_after_retries(self):
+        self.server.failures = 10
+        url = "http://lh3.googleusercontent.com/p/flaky"
+        with self.assertRaises(requests.HTTPError):
+            asyncio.run(self.downloader.fetch(url))
+        self.assertEqual(self.server.attempts[url + "=s64"], 4)
+
+    def test_does_not_retry_4xx(self):
+        url = "http://lh3.googleusercontent.com/p/missing"
+        rows = asyncio.run(self.downloader.download_review_photos([{"review_id": "r", "photos": [url]}]))
+        self.assertEqual(rows, [])
+        self.assertEqual(self.server.attempts[url + "=s64"], 1)
+        self.assertEqual(self.downloader.stats["failed"], 1)
+
+    def test_identical_content_is_stored_once(self):
+        first = asyncio.run(self.downloader.fetch("http://lh3.googleusercontent.com/p/one"))
+        second = asyncio.run(self.downloader.fetch("http://lh5.googleusercontent.com/p/two"))
+        self.assertFalse(first.existed)
+        self.assertTrue(second.existed)
+        self.assertEqual(first.sha256, second.sha256)
+        self.assertEqual(first.path, second.path)
+        self.assertEqual(self.downloader.stats, {"downloaded": 1, "deduplicated": 1, "failed": 0,
+                                                 "bytes": 2 * len(PNG)})
+        stored = [name for _, _, names in os.walk(self.store_dir.name) for name in names]
+        self.assertEqual(stored, [first.sha256 + ".png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
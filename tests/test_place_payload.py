@@ -0,0 +1,175 @@
+"""
+place_payload: decode APP_INITIALIZATION_STATE và PayloadFetcher với HTML phục vụ bởi http.server
+Chạy từ thư mục gốc: python -m pytest tests (hoặc python -m unittest discover -s tests)
+
+fixtures/place_app_state.html là trang place đã cắt gọn: chỉ giữ các vị trí trong PLACE_FIELDS và
+_HOURS_PATH, cùng một chuỗi ")]}'" không phải place đứng trước để kiểm tra find_place_array bỏ qua nó.
+Server đóng vai HTTP proxy giống test_photo_downloader.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from place_payload import (PayloadFetcher, decode_place, extract_app_state, find_place_array,
+                           missing_fields)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "place_app_state.html")
+PLACE_URL = "http://www.google.com/maps/place/Ph%E1%BB%9F+B%C3%A1t+%C4%90%C3%A0n/data=!3d21.0172!4d105.8486"
+
+with open(FIXTURE, encoding="utf-8") as f:
+    HTML = f.read()
+
+
+def _without(html: str, *paths) -> str:
+    """Fixture với các vị trí trong mảng place bị đặt thành null"""
+    state = extract_app_state(html)
+    place = find_place_array(state)
+    for path in paths:
+        target = place
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = None
+    for entry in state:
+        if isinstance(entry, list) and isinstance(entry[-1], str) and '"Phở Bát Đàn"' in entry[-1]:
+            entry[-1] = ")]}'\n" + json.dumps([None] * 6 + [place], ensure_ascii=False)
+    return "<script>window.APP_INITIALIZATION_STATE=" + json.dumps(state, ensure_ascii=False) + ";</script>"
+
+
+class _PlaceHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+        if "/sorry/" in self.path:
+            status, body = 200, b"unusual traffic"
+        elif server.responses:
+            status, body = server.responses.pop(0)
+        else:
+            status, body = 200, server.html.encode()
+        if status == 302:
+            self.send_response(302)
+            self.send_header("Location", "http://www.google.com/sorry/index?continue=" + self.path)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DecodePlaceTest(unittest.TestCase):
+    def test_fields(self):
+        fields = decode_place(HTML)
+        self.assertEqual(fields["name"], "Phở Bát Đàn")
+        self.assertEqual(fields["rating"], 4.5)
+        self.assertEqual(fields["review_count"], 1234)
+        self.assertEqual(fields["address"], "49 Bát Đàn, Cửa Đông, Hoàn Kiếm, Hà Nội")
+        self.assertEqual(fields["website"], "https://phobathin.example.vn/")
+        self.assertEqual(fields["phone"], "024 3828 5036")
+        self.assertEqual((fields["lat"], fields["lng"]), (21.0171, 105.8485))
+
+    def test_hours_keep_parseable_weekdays_only(self):
+        self.assertEqual(decode_place(HTML)["business_hours"], {
+            "Thứ Hai": "06:00–10:00, 17:00–22:00",
+            "Thứ Ba": "06:00–22:00",
+            "Chủ Nhật": "Đóng cửa",
+        })
+
+    def test_skips_non_place_payloads(self):
+        place = find_place_array(extract_app_state(HTML))
+        self.assertEqual(place[11], "Phở Bát Đàn")
+
+    def test_no_payload(self):
+        self.assertIsNone(decode_place("<html><body>Google Maps</body></html>"))
+        self.assertIsNone(decode_place("<script>window.APP_INITIALIZATION_STATE=[[null,\"vi\"]];</script>"))
+        self.assertIsNone(decode_place("<script>window.APP_INITIALIZATION_STATE=[oops;</script>"))
+
+    def test_invalid_values_become_none(self):
+        fields = decode_place(_without(HTML, (9, 2), (39,), (178, 0, 0)))
+        self.assertIsNone(fields["address"])
+        self.assertIsNone(fields["phone"])
+        self.assertEqual((fields["lat"], fields["lng"]), (None, None))
+
+
+class MissingFieldsTest(unittest.TestCase):
+    def test_complete(self):
+        self.assertEqual(missing_fields(decode_place(HTML), ("overview", "hours")), [])
+
+    def test_reports_fields_per_stage(self):
+        fields = decode_place(_without(HTML, (4, 8), (39,), (34,)))
+        self.assertEqual(missing_fields(fields, ("overview",)), ["address", "review_count"])
+        self.assertEqual(missing_fields(fields, ("hours",)), ["business_hours"])
+        self.assertEqual(missing_fields(fields, ("reviews",)), [])
+
+
+class PayloadFetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _PlaceHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.responses = []
+        self.server.html = HTML
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.fetcher = PayloadFetcher(concurrency=1, min_interval=0, timeout=5)
+        self.fetcher.session.trust_env = False
+        self.fetcher.session.proxies = {"http": f"http://127.0.0.1:{self.server.server_address[1]}"}
+
+    def tearDown(self):
+        self.fetcher.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, stages=("overview",)):
+        return asyncio.run(self.fetcher.fetch(PLACE_URL, stages=stages))
+
+    def test_ok_prefers_url_coordinates(self):
+        url, fields, reason, _ = self.fetch(("overview", "hours"))
+        self.assertEqual(url, PLACE_URL)
+        self.assertIsNone(reason)
+        self.assertEqual(fields["name"], "Phở Bát Đàn")
+        self.assertEqual((fields["lat"], fields["lng"]), (21.0172, 105.8486))
+        self.assertEqual(self.fetcher.stats, {"ok": 1})
+
+    def test_missing_fields_fall_back(self):
+        self.server.html = _without(HTML, (4, 7), (34,))
+        self.assertEqual(self.fetch(("overview",))[1:3], (None, "missing rating"))
+        self.assertEqual(self.fetch(("overview", "hours"))[1:3], (None, "missing rating, business_hours"))
+        self.assertEqual(self.fetcher.stats, {"missing_fields": 2})
+
+    def test_no_payload_and_http_errors(self):
+        self.server.responses = [(200, b"<html></html>"), (404, b"not found")]
+        self.assertEqual(self.fetch()[2], "no_payload")
+        self.assertEqual(self.fetch()[2], "http_404")
+        self.assertEqual(self.fetcher.stats, {"no_payload": 1, "http_404": 1})
+
+    def test_block_counter_resets_on_success(self):
+        self.server.responses = [(429, b""), (429, b""), (200, HTML.encode()), (429, b"")]
+        self.assertEqual([self.fetch()[2] for _ in range(4)], ["blocked", "blocked", None, "blocked"])
+        self.assertFalse(self.fetcher.disabled)
+
+    def test_disabled_after_consecutive_blocks(self):
+        self.server.responses = [(429, b""), (302, b""), (429, b"")]
+        with self.assertLogs("crawler.fast_path", "WARNING"):
+            reasons = [self.fetch()[2] for _ in range(3)]
+        self.assertEqual(reasons, ["blocked", "blocked", "blocked"])
+        self.assertTrue(self.fetcher.disabled)
+        self.assertTrue(any(path.startswith("http://www.google.com/sorry/") for path in self.server.requests))
+
+        sent = len(self.server.requests)
+        self.assertEqual(self.fetch(), (PLACE_URL, None, "disabled", 0.0))
+        self.assertEqual(len(self.server.requests), sent)
+        self.assertEqual(self.fetcher.stats, {"blocked": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,26 +1,41 @@
 #!/usr/bin/env python3
 """
 Simple web server để Render có thể health check
+/live: process còn sống; /ready: database, schema và Chromium đã sẵn sàng
+/metrics: độ trễ event loop và các call site chặn loop (Prometheus text, khi LOOP_MONITOR=1)
 """
+# Import đầu tiên để mốc thời gian khởi động chính xác
+from service_state import state
+
+import json
 import os
 import threading
-import time
 from http.server import HTTPServer, BaseHTTPRequestHandler
-import subprocess
-import sys
+
+from crawl_logging import setup_logging
+from loop_monitor import monitor
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
+    def _send(self, status, content_type, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'OK')
+        if self.path in ('/live', '/health'):
+            self._send(200, 'text/plain', b'OK')
+        elif self.path == '/ready':
+            snapshot = state.snapshot()
+            status = 200 if snapshot['ready'] else 503
+            self._send(status, 'application/json', json.dumps(snapshot).encode())
+        elif self.path == '/metrics':
+            if monitor.enabled:
+                self._send(200, 'text/plain; version=0.0.4', monitor.metrics().encode())
+            else:
+                self._send(404, 'text/plain', b'Loop monitor disabled (LOOP_MONITOR=1)')
         else:
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(b'<h1>Google Maps Crawler</h1><p>Service is running</p>')
+            self._send(200, 'text/html', b'<h1>Google Maps Crawler</h1><p>Service is running</p>')
 
 def run_web_server():
     """Chạy web server trên port được chỉ định"""
@@ -40,6 +55,7 @@ def run_crawler():
         print(f"❌ Crawler error: {e}")
 
 if __name__ == "__main__":
+    setup_logging()
     print("🌟 Google Maps Crawler Web Service")
     print("=" * 50)
     